@@ -0,0 +1,218 @@
+import argparse  # used to read the options given on the command line
+import asyncio  # one event loop serves every connection, slow work is sent to threads and processes
+import gzip  # responses are compressed when the client accepts it
+import hashlib  # used to make the ETags
+import json  # error messages are sent as JSON
+import multiprocessing  # fit processes are spawned, as forking a server with threads running can deadlock them
+import re  # used to check tickers before they reach the price store
+import tempfile  # the stub provider keeps its prices in a throwaway folder
+from concurrent.futures import ProcessPoolExecutor  # fits run in other processes so the event loop never blocks
+from urllib.parse import urlsplit, parse_qs  # splits the path from the query string
+
+import market_data  # loads prices through the shared on-disk store
+from forecasters import FORECASTERS, fit_forecaster  # Prophet or the fast NumPy model, the same ones the app uses
+from memo import MemoCache, data_version  # keeps encoded responses until the prices change
+from singleflight import AsyncSingleFlight  # requests for the same forecast at once share one fit
+from tracing import span  # times each request for the performance panel
+
+# A small HTTP/1.1 server on asyncio streams, so the forecasts can be used without driving the Streamlit pages
+
+TICKER = re.compile(r'^[A-Za-z0-9.^=-]{1,20}$')  # letters, digits and the symbols Yahoo uses ('^FTSE', 'BTC-GBP')
+MAX_YEARS = 5  # the same limit as the prediction page's slider
+ARROW = 'application/vnd.apache.arrow.stream'  # Accept this to get an Arrow IPC stream instead of JSON
+GZIP_MIN_BYTES = 1024  # smaller responses aren't worth compressing
+FORECAST_COLUMNS = ['ds', 'yhat', 'yhat_lower', 'yhat_upper', 'trend']  # what /forecast returns for each day
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           406: 'Not Acceptable', 500: 'Internal Server Error'}
+
+responses = MemoCache(max_bytes=128 * 2 ** 20)  # encoded bodies, keyed on everything that changes them
+in_flight = AsyncSingleFlight()  # bodies being worked out right now, keyed the same way
+
+
+class HTTPError(Exception):  # stops a request with an error status and message
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# Work done away from the event loop
+
+def forecast_frame(mode, ticker, df_train, period):  # runs in a worker process: the forecast for the days after the prices
+    m = fit_forecaster(mode, ticker, df_train)
+    forecast = m.predict(m.make_future_dataframe(periods=period))
+    return forecast.loc[forecast['ds'] > df_train['ds'].iloc[-1], FORECAST_COLUMNS].reset_index(drop=True)
+
+
+def encode(frame, arrow):  # the body for a frame: an Arrow IPC stream, or JSON records with ISO dates
+    if arrow:
+        import pyarrow as pa  # only needed by clients that ask for Arrow
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    return frame.to_json(orient='records', date_format='iso').encode()
+
+
+def etag(*parts):  # weak ETag, the same for the plain and gzipped forms of a response
+    return 'W/"%s"' % hashlib.sha256(repr(parts).encode()).hexdigest()[:20]
+
+
+# Routes
+
+class API:  # answers /prices/{ticker} and /forecast/{ticker}?years=N
+    def __init__(self, pool):
+        self.pool = pool  # process pool the fits run on
+
+    async def load(self, ticker):  # the ticker's prices, loaded on a thread as they may need downloading
+        if not TICKER.match(ticker):
+            raise HTTPError(400, f'not a ticker: {ticker!r}')
+        try:
+            data = await asyncio.to_thread(market_data.load_data, ticker)
+        except ValueError as error:  # the provider found no prices for it
+            raise HTTPError(404, str(error))
+        if data.empty:
+            raise HTTPError(404, f'no prices for {ticker}')
+        return data
+
+    async def prices(self, ticker, query, arrow):
+        data = await self.load(ticker)
+        version = data_version(data)
+
+        async def make():  # encoded on a thread, long histories take a few milliseconds
+            return await asyncio.to_thread(encode, data, arrow)
+        return etag('prices', ticker, version, arrow), ('prices', ticker, version, arrow), make
+
+    async def forecast(self, ticker, query, arrow):
+        try:
+            years = int(query.get('years', ['1'])[0])
+        except ValueError:
+            raise HTTPError(400, 'years must be a whole number')
+        mode = query.get('mode', ['Fast'])[0]
+        if not 1 <= years <= MAX_YEARS or mode not in FORECASTERS:
+            raise HTTPError(400, f'years must be 1 to {MAX_YEARS} and mode one of {", ".join(FORECASTERS)}')
+        data = await self.load(ticker)
+        version = data_version(data)
+        df_train = data[['Date', 'Close']].rename(columns={"Date": "ds", "Close": "y"})
+
+        async def make():  # the fit runs in another process, so other requests are served meanwhile
+            loop = asyncio.get_running_loop()
+            frame = await loop.run_in_executor(self.pool, forecast_frame, mode, ticker, df_train, years * 365)
+            return encode(frame, arrow)
+        return etag('forecast', ticker, years, mode, version, arrow), ('forecast', ticker, years, mode, version, arrow), make
+
+    async def handle(self, method, target, headers):  # (status, headers, body) for one request
+        if method not in ('GET', 'HEAD'):
+            raise HTTPError(405, 'only GET is supported')
+        url = urlsplit(target)
+        parts = url.path.strip('/').split('/')
+        routes = {'prices': self.prices, 'forecast': self.forecast}
+        if len(parts) == 1 and parts[0] == 'health':
+            return 200, {'Content-Type': 'application/json'}, json.dumps({'status': 'ok', **in_flight.summary()}).encode()
+        if len(parts) != 2 or parts[0] not in routes:
+            raise HTTPError(404, 'try /prices/{ticker} or /forecast/{ticker}?years=N')
+        accept = headers.get('accept', '')
+        arrow = ARROW in accept
+        if arrow:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise HTTPError(406, 'Arrow responses need pyarrow installed')
+        tag, key, make = await routes[parts[0]](parts[1], parse_qs(url.query), arrow)
+        response_headers = {'Content-Type': ARROW if arrow else 'application/json', 'ETag': tag,
+                            'Cache-Control': 'no-cache', 'Vary': 'Accept, Accept-Encoding'}
+        if tag in [value.strip() for value in headers.get('if-none-match', '').split(',')]:
+            return 304, response_headers, b''  # the client's copy is still right, nothing is worked out again
+        gzipped = 'gzip' in headers.get('accept-encoding', '')
+        body = responses.get(key + (gzipped,))
+        if body is None:
+            body = responses.get(key)
+            if body is None:
+                body = responses.put(key, await in_flight.do(key, make))
+            if gzipped and len(body) >= GZIP_MIN_BYTES:
+                body = responses.put(key + (gzipped,), await asyncio.to_thread(gzip.compress, body, 5))
+            else:
+                gzipped = False
+        if gzipped:
+            response_headers['Content-Encoding'] = 'gzip'
+        return 200, response_headers, body
+
+
+# HTTP
+
+async def read_request(reader):  # (method, target, headers) of the next request, None when the client has gone
+    line = await reader.readline()
+    if not line:
+        return None
+    method, target, _ = line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return method, target, headers
+
+
+def write_response(writer, status, headers, body, head=False):
+    lines = [f'HTTP/1.1 {status} {REASONS[status]}', f'Content-Length: {len(body)}']
+    lines += [f'{name}: {value}' for name, value in headers.items()]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (b'' if head else body))
+
+
+async def serve_connection(api, reader, writer):  # answers requests on one connection until it closes
+    try:
+        while True:
+            request = await read_request(reader)
+            if request is None:
+                break
+            method, target, headers = request
+            with span('api.' + urlsplit(target).path.strip('/').split('/')[0]):
+                try:
+                    status, response_headers, body = await api.handle(method, target, headers)
+                except HTTPError as error:
+                    status, response_headers = error.status, {'Content-Type': 'application/json'}
+                    body = json.dumps({'error': str(error)}).encode()
+                except Exception as error:  # one bad request mustn't stop the server
+                    status, response_headers = 500, {'Content-Type': 'application/json'}
+                    body = json.dumps({'error': repr(error)}).encode()
+            write_response(writer, status, response_headers, body, head=method == 'HEAD')
+            await writer.drain()
+            if headers.get('connection', '').lower() == 'close':
+                break
+    except (ConnectionError, ValueError):  # the client went away or sent something that isn't HTTP
+        pass
+    finally:
+        writer.close()
+
+
+async def start(host='127.0.0.1', port=8000, workers=None, pool=None):  # starts serving, returns the asyncio server
+    if pool is None:  # workers=None uses one process per core
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    api = API(pool)
+    return await asyncio.start_server(lambda reader, writer: serve_connection(api, reader, writer), host, port)
+
+
+def use_stub_prices(root=None):  # serves made-up prices from a throwaway store, for load testing without the network
+    from price_store import PriceStore, SyntheticProvider
+    market_data.price_store = PriceStore(root or tempfile.mkdtemp(prefix='price_store_'), SyntheticProvider())
+
+
+async def main(host, port, workers):
+    server = await start(host, port, workers)
+    print(f'serving on http://{host}:{port}', flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':  # python -m api [--port 8000] [--workers N] [--stub]
+    parser = argparse.ArgumentParser(description='JSON/Arrow API for prices and forecasts')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=None, help='processes for fitting, one per core by default')
+    parser.add_argument('--stub', action='store_true', help='serve made-up prices instead of downloading them')
+    args = parser.parse_args()
+    if args.stub:
+        use_stub_prices()
+    asyncio.run(main(args.host, args.port, args.workers))
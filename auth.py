@@ -0,0 +1,130 @@
+import hashlib  # imports the library hashlib to hash the passwords for added security
+import hmac  # compares hashes in constant time
+import os  # used for random salts and to size the verification pool
+from concurrent.futures import ThreadPoolExecutor  # checks passwords away from the page's thread
+
+from db import get_connection, get_user, update_password  # talks to the database
+from tracing import span, traced  # times logins for the performance panel
+
+# Kept apart from the pages so logging in never has to load the forecasting libraries
+
+
+# Security
+
+def make_hashes(password):  # function to hash passwords from new user pages (old unsalted format)
+    return hashlib.sha256(str.encode(password)).hexdigest()
+
+
+def check_hashes(password, hashed_text):  # function to check whether the hashed passwords match with the database
+    if make_hashes(password) == hashed_text:
+        return hashed_text
+    return False
+
+
+# Hashers: each one turns a password into 'name$parameters$salt$hash' so the settings are stored with every user
+
+class SHA256Hasher:  # the original unsalted SHA-256, only kept so old accounts can still log in
+    name = 'sha256'
+
+    def encode(self, password):
+        return make_hashes(password)
+
+    def verify(self, password, encoded):
+        return hmac.compare_digest(make_hashes(password), encoded)
+
+    def is_current(self, encoded):  # old hashes are always replaced at the next login
+        return False
+
+
+class PBKDF2Hasher:  # salted PBKDF2-HMAC-SHA256, cost set by the number of iterations
+    name = 'pbkdf2_sha256'
+
+    def __init__(self, iterations=600_000):
+        self.iterations = iterations
+
+    def _hash(self, password, salt, iterations):
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+
+    def encode(self, password):
+        salt = os.urandom(16)
+        return f'{self.name}${self.iterations}${salt.hex()}${self._hash(password, salt, self.iterations).hex()}'
+
+    def verify(self, password, encoded):
+        _, iterations, salt, expected = encoded.split('$')
+        return hmac.compare_digest(self._hash(password, bytes.fromhex(salt), int(iterations)).hex(), expected)
+
+    def is_current(self, encoded):
+        return encoded.split('$')[1] == str(self.iterations)
+
+
+class ScryptHasher:  # salted scrypt, memory-hard so guessing passwords on a GPU is expensive
+    name = 'scrypt'
+
+    def __init__(self, n=2 ** 14, r=8, p=1):
+        self.n, self.r, self.p = n, r, p  # cost: CPU/memory, block size, parallelism
+
+    def _hash(self, password, salt, n, r, p):
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + 2 ** 20)
+
+    def encode(self, password):
+        salt = os.urandom(16)
+        digest = self._hash(password, salt, self.n, self.r, self.p)
+        return f'{self.name}${self.n}${self.r}${self.p}${salt.hex()}${digest.hex()}'
+
+    def verify(self, password, encoded):
+        _, n, r, p, salt, expected = encoded.split('$')
+        digest = self._hash(password, bytes.fromhex(salt), int(n), int(r), int(p))
+        return hmac.compare_digest(digest.hex(), expected)
+
+    def is_current(self, encoded):
+        return encoded.split('$')[1:4] == [str(self.n), str(self.r), str(self.p)]
+
+
+HASHERS = {hasher.name: hasher for hasher in (SHA256Hasher(), PBKDF2Hasher(), ScryptHasher())}
+DEFAULT_HASHER = HASHERS['scrypt']  # used for new passwords, about 60 ms per hash on one core
+
+ADMINS = set(filter(None, os.environ.get('ADMIN_USERS', '').split(',')))  # usernames that see the admin panels
+
+# bounded pool for checking passwords, so a burst of logins can't use more than one slow hash per core
+_verify_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='verify-password')
+
+
+def _hasher_for(encoded):  # the hasher that made a stored hash
+    return HASHERS[encoded.split('$', 1)[0]] if '$' in encoded else HASHERS['sha256']
+
+
+def hash_password(password, hasher=None):  # salted hash of a new password, with its settings stored alongside
+    return (hasher or DEFAULT_HASHER).encode(password)
+
+
+def verify_password(password, encoded):  # whether the password matches the stored hash
+    return _hasher_for(encoded).verify(password, encoded)
+
+
+def needs_rehash(encoded, hasher=None):  # whether the stored hash uses an old format or old settings
+    hasher = hasher or DEFAULT_HASHER
+    return _hasher_for(encoded) is not hasher or not hasher.is_current(encoded)
+
+
+def verify_async(password, encoded):  # checks the password on the verification pool, returns a Future
+    return _verify_pool.submit(verify_password, password, encoded)
+
+
+def is_admin(username):  # whether the user can see the admin panels
+    return username in ADMINS
+
+
+@traced('auth.authenticate')
+def authenticate(username, password, conn=None, c=None):  # the user's row if the password is right, otherwise None
+    conn = conn or get_connection()  # this session's connection unless one is given (e.g. by the tests)
+    c = c or conn.cursor()
+    user = get_user(username, c)
+    if user is None:
+        return None
+    with span('auth.verify_password'):
+        if not verify_async(password, user[1]).result():
+            return None
+    if needs_rehash(user[1]):  # the password is known to be right, so it can be moved to the current hasher
+        update_password(username, hash_password(password), c)
+        conn.commit()
+    return user
@@ -0,0 +1,144 @@
+import argparse  # used to read the options given on the command line
+import time  # used to time each fit and prediction
+from concurrent.futures import ProcessPoolExecutor, as_completed  # spreads the cutoffs over every core
+
+import numpy as np  # used for the error measures
+import pandas as pd  # the results are returned as a DataFrame
+
+from forecasters import FORECASTERS, FastForecaster  # Prophet or the fast NumPy model, the same ones the app uses
+from memo import data_version  # fingerprint of the prices, so cached results are redone if the prices change
+
+HORIZON_DAYS = 30  # how far ahead each cutoff forecasts
+INITIAL_DAYS = 3 * 365  # the first cutoff needs at least this much history to train on
+RESULT_COLUMNS = ['cutoff', 'mae', 'mape', 'coverage', 'fit_seconds', 'predict_seconds', 'points']
+
+
+# DB Functions
+
+def create_backtesttable(c):  # function creates a table for the results of each cutoff if it doesn't exist
+    c.execute('CREATE TABLE IF NOT EXISTS backtestresults(ticker TEXT NOT NULL, mode TEXT NOT NULL, '
+              'horizon_days INTEGER NOT NULL, cutoff TEXT NOT NULL, version TEXT NOT NULL, mae REAL, mape REAL, '
+              'coverage REAL, fit_seconds REAL, predict_seconds REAL, points INTEGER, '
+              'PRIMARY KEY (ticker, mode, horizon_days, cutoff, version))')
+
+
+def cached_result(c, ticker, mode, horizon_days, cutoff, version):  # a cutoff's saved result, or None if it hasn't run
+    c.execute('SELECT cutoff, mae, mape, coverage, fit_seconds, predict_seconds, points FROM backtestresults '
+              'WHERE ticker = ? AND mode = ? AND horizon_days = ? AND cutoff = ? AND version = ?',
+              (ticker, mode, horizon_days, cutoff, version))
+    return c.fetchone()
+
+
+def save_result(c, ticker, mode, horizon_days, version, row):  # stores one cutoff's result
+    c.execute('INSERT OR REPLACE INTO backtestresults(ticker,mode,horizon_days,cutoff,version,mae,mape,coverage,'
+              'fit_seconds,predict_seconds,points) VALUES (?,?,?,?,?,?,?,?,?,?,?)',
+              (ticker, mode, horizon_days, row[0], version, *row[1:]))
+
+
+# Backtest
+
+def _new_prophet():  # an untrained Prophet model with the app's settings
+    from fbprophet import Prophet  # the library is used to produce the forecasted data
+    return Prophet()
+
+
+# each cutoff trains a new model, not through the app's model cache, so the fit times are full fits and
+# the backtest doesn't fill the cache or move its warm-start lineage back in time
+NEW_MODELS = {'Prophet': _new_prophet, 'Fast': FastForecaster}
+
+
+def cutoffs(dates, horizon_days=HORIZON_DAYS, period_days=None, initial_days=INITIAL_DAYS, count=None):
+    # dates to train up to, every 'period_days' back from the last one that still has 'horizon_days' to check against
+    dates = pd.to_datetime(pd.Series(dates)).sort_values().reset_index(drop=True)
+    period = pd.Timedelta(days=period_days or horizon_days)
+    cutoff = dates.iloc[-1] - pd.Timedelta(days=horizon_days)
+    found = []
+    while cutoff - dates.iloc[0] >= pd.Timedelta(days=initial_days) and (count is None or len(found) < count):
+        found.append(dates[dates <= cutoff].iloc[-1])  # the last day that actually traded
+        cutoff -= period
+    return sorted(set(found))
+
+
+def evaluate_cutoff(mode, ticker, df_train, df_test):  # trains up to the cutoff and scores the forecast after it
+    m = NEW_MODELS[mode]()
+    began = time.perf_counter()
+    m.fit(df_train)
+    fitted = time.perf_counter()
+    forecast = m.predict(df_test[['ds']])  # only the days there are real prices for
+    predicted = time.perf_counter()
+    y, yhat = df_test['y'].to_numpy(dtype=float), forecast['yhat'].to_numpy(dtype=float)
+    inside = (y >= forecast['yhat_lower'].to_numpy()) & (y <= forecast['yhat_upper'].to_numpy())
+    return (float(np.mean(np.abs(y - yhat))), float(np.mean(np.abs((y - yhat) / y)) * 100), float(inside.mean()),
+            fitted - began, predicted - fitted, len(y))
+
+
+def _split(data, cutoff, horizon_days):  # training prices up to the cutoff and the prices in the horizon after it
+    prices = data[['Date', 'Close']].rename(columns={"Date": "ds", "Close": "y"})
+    ds = pd.to_datetime(prices['ds'])
+    train = prices[ds <= cutoff]
+    test = prices[(ds > cutoff) & (ds <= cutoff + pd.Timedelta(days=horizon_days))]
+    return train, test
+
+
+def backtest(ticker, data, mode='Fast', horizon_days=HORIZON_DAYS, period_days=None, initial_days=INITIAL_DAYS,
+             count=None, conn=None, workers=None):  # one row per cutoff with the errors and the time taken
+    rows, todo = {}, []
+    c = conn.cursor() if conn is not None else None
+    if c is not None:
+        create_backtesttable(c)
+    for cutoff in cutoffs(data['Date'], horizon_days, period_days, initial_days, count):
+        # the fingerprint covers every price the cutoff uses, so newer prices after it keep the cached result
+        version = data_version(data[pd.to_datetime(data['Date']) <= cutoff + pd.Timedelta(days=horizon_days)])
+        cached = cached_result(c, ticker, mode, horizon_days, str(cutoff.date()), version) if c else None
+        if cached is not None:
+            rows[cutoff] = cached
+        else:
+            todo.append((cutoff, version))
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:  # workers=None uses one process per core
+            futures = {pool.submit(evaluate_cutoff, mode, ticker, *_split(data, cutoff, horizon_days)): (cutoff, version)
+                       for cutoff, version in todo}
+            for future in as_completed(futures):
+                cutoff, version = futures[future]
+                rows[cutoff] = (str(cutoff.date()), *future.result())
+                if c is not None:
+                    save_result(c, ticker, mode, horizon_days, version, rows[cutoff])
+        if conn is not None:
+            conn.commit()
+    results = pd.DataFrame([rows[cutoff] for cutoff in sorted(rows)], columns=RESULT_COLUMNS)
+    results.insert(0, 'ticker', ticker)
+    return results
+
+
+def summary(results):  # average errors and timings over every cutoff, one row per ticker
+    return results.groupby('ticker').agg(cutoffs=('cutoff', 'count'), mae=('mae', 'mean'), mape=('mape', 'mean'),
+                                         coverage=('coverage', 'mean'), fit_seconds=('fit_seconds', 'mean'),
+                                         predict_seconds=('predict_seconds', 'mean'))
+
+
+if __name__ == '__main__':  # python -m backtest AAPL NKE [--mode Fast] [--horizon 30] [--count 12] [--fixtures DIR]
+    from db import connect  # results are cached in data.db
+    from market_data import START, price_store, today  # prices come from the on-disk store
+
+    parser = argparse.ArgumentParser(description='Rolling-origin backtest of the forecasts')
+    parser.add_argument('tickers', nargs='+')
+    parser.add_argument('--mode', choices=list(FORECASTERS), default='Fast', help='forecasting mode to test')
+    parser.add_argument('--horizon', type=int, default=HORIZON_DAYS, help='days ahead each cutoff forecasts')
+    parser.add_argument('--period', type=int, default=None, help='days between cutoffs, the horizon by default')
+    parser.add_argument('--count', type=int, default=12, help='number of cutoffs, most recent first')
+    parser.add_argument('--workers', type=int, default=None, help='processes to run, one per core by default')
+    parser.add_argument('--fixtures', help='folder of <ticker>.csv prices to use instead of downloading')
+    args = parser.parse_args()
+    if args.fixtures:  # runs offline on recorded prices, named as the recordings are, e.g. '%5EFTSE.csv' for '^FTSE'
+        from price_store import RecordedProvider
+        recorded = RecordedProvider(args.fixtures)
+        load = lambda ticker: recorded.fetch(ticker, START, today())  # noqa: E731
+        missing = [ticker for ticker in args.tickers if load(ticker).empty]
+        if missing:
+            parser.error(f'no recorded prices for {", ".join(missing)} in {args.fixtures}')
+    else:
+        load = lambda ticker: price_store.load(ticker, START, today())  # noqa: E731
+    conn = connect()
+    results = pd.concat([backtest(ticker, load(ticker), args.mode, args.horizon, args.period, count=args.count,
+                                  conn=conn, workers=args.workers) for ticker in args.tickers])
+    print(summary(results).round(4).to_string())
@@ -0,0 +1,98 @@
+import asyncio  # the clients are asyncio connections, many at once
+import socket  # used to find a free port for the server
+import subprocess  # the API runs in its own process, as it would in production
+import sys  # used to start the server with the same Python
+import time  # used to time each request
+
+import numpy as np  # used to work out the latency percentiles
+
+from api import ARROW  # the Accept header for Arrow responses
+
+TICKERS = [f'SYN{i}' for i in range(16)]  # made-up tickers, the stub provider gives each its own random walk
+
+
+async def get(port, path, headers, connections):  # (status, headers, body size) of one GET on a kept-alive connection
+    if not connections:
+        connections.append(await asyncio.open_connection('127.0.0.1', port))
+    reader, writer = connections[0]
+    lines = [f'GET {path} HTTP/1.1', 'Host: localhost'] + [f'{name}: {value}' for name, value in headers.items()]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+    status = int((await reader.readline()).split()[1])
+    response_headers = {}
+    while (line := await reader.readline()) != b'\r\n':
+        name, _, value = line.decode().partition(':')
+        response_headers[name.lower()] = value.strip()
+    body = await reader.readexactly(int(response_headers['content-length']))
+    return status, response_headers, len(body)
+
+
+async def load(port, paths, clients, headers=None, etags=None):  # sends every path over 'clients' connections
+    queue = list(reversed(paths))
+    latencies, sizes, statuses = [], [], []
+
+    async def client():
+        connections = []
+        while queue:
+            path = queue.pop()
+            sent = dict(headers or {}, **({'If-None-Match': etags[path]} if etags else {}))
+            began = time.perf_counter()
+            status, response_headers, size = await get(port, path, sent, connections)
+            latencies.append(time.perf_counter() - began)
+            sizes.append(size)
+            statuses.append(status)
+            if etags is not None and 'etag' in response_headers:
+                etags.setdefault(path, response_headers['etag'])
+        for _, writer in connections:
+            writer.close()
+
+    began = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return time.perf_counter() - began, latencies, sizes, statuses
+
+
+def report(name, seconds, latencies, sizes, statuses):
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    codes = ', '.join(f'{code} x{statuses.count(code)}' for code in sorted(set(statuses)))
+    print(f'{name:<30} {len(latencies) / seconds:>8.0f} req/s  p50 {p50:>7.2f} ms  p95 {p95:>7.2f} ms  '
+          f'p99 {p99:>7.2f} ms  {np.mean(sizes) / 1024:>7.1f} KiB  ({codes})')
+
+
+async def run(port, clients, requests):
+    forecasts = [f'/forecast/{ticker}?years=1' for ticker in TICKERS]
+    prices = [f'/prices/{TICKERS[i % len(TICKERS)]}' for i in range(requests)]
+    await load(port, prices[:len(TICKERS)], clients)  # fills the server's price store first
+    await load(port, [f'/forecast/WARM{i}' for i in range(8)], clients)  # starts the fit processes
+
+    # cold fits run in the process pool, while /health is polled to show the event loop still answers
+    health = asyncio.ensure_future(load(port, ['/health'] * 200, 1))
+    report('forecast, cold fits', *await load(port, forecasts, clients))
+    report('  /health during the fits', *await health)
+
+    report('prices, JSON', *await load(port, prices, clients))
+    report('prices, JSON + gzip', *await load(port, prices, clients, {'Accept-Encoding': 'gzip'}))
+    report('prices, Arrow', *await load(port, prices, clients, {'Accept': ARROW}))
+    report('prices, Arrow + gzip', *await load(port, prices, clients, {'Accept': ARROW, 'Accept-Encoding': 'gzip'}))
+    repeated = [forecasts[i % len(forecasts)] for i in range(requests)]
+    report('forecast, cached', *await load(port, repeated, clients, {'Accept-Encoding': 'gzip'}))
+    etags = {}
+    await load(port, forecasts, clients, etags=etags)
+    report('forecast, If-None-Match (304)', *await load(port, repeated, clients, etags=etags))
+
+
+def main(clients=32, requests=2000, workers=4):
+    with socket.socket() as s:  # a free port for the server
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    server = subprocess.Popen([sys.executable, '-m', 'api', '--stub', '--port', str(port), '--workers', str(workers)],
+                              stdout=subprocess.PIPE, text=True)
+    try:
+        server.stdout.readline()  # 'serving on ...' once it is listening
+        print(f'{clients} clients, {requests} requests per run, {workers} fit processes, stub prices')
+        asyncio.run(run(port, clients, requests))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':  # python -m benchmarks.bench_api
+    main()
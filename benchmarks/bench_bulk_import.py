@@ -0,0 +1,68 @@
+import json  # the import's counts come back from the child process as JSON
+import os  # used to build file paths and report the file sizes
+import subprocess  # each import runs in its own process so its peak memory is its own
+import sys  # used to start the child process with the same Python
+import tempfile  # the dumps and the store are written to a throwaway folder
+import time  # used to time writing the dumps
+
+import numpy as np  # used to make up the prices
+import pandas as pd  # used to write the dumps
+
+CHILD = '''
+import json, sys
+from bulk_import import bulk_import
+from price_store import PriceStore
+stats = bulk_import([sys.argv[1]], PriceStore(sys.argv[2]), chunk_rows=int(sys.argv[3]))
+print(json.dumps(stats))
+'''
+
+
+def write_dump(path, tickers, days, parquet=False):  # a vendor-style file, written one ticker at a time
+    dates = pd.bdate_range('1990-01-01', periods=days).strftime('%Y-%m-%d')
+    rng = np.random.default_rng(0)
+    writer = None
+    for i in range(tickers):
+        close = 50 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+        frame = pd.DataFrame({'symbol': f'T{i:05d}', 'date': dates, 'open': close, 'high': close * 1.01,
+                              'low': close * 0.99, 'close': close, 'adj_close': close,
+                              'volume': rng.integers(0, 10 ** 6, days)})
+        if parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            writer = writer or pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+        else:
+            frame.to_csv(path, mode='a', header=i == 0, index=False, float_format='%.4f')
+    if writer is not None:
+        writer.close()
+
+
+def run(path, chunk_rows):
+    store = tempfile.mkdtemp()
+    output = subprocess.run([sys.executable, '-c', CHILD, path, store, str(chunk_rows)], capture_output=True,
+                            text=True, check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return json.loads(output.stdout)
+
+
+def report(path):  # imports the file with each chunk size
+    for chunk_rows in (50_000, 250_000, 1_000_000):
+        stats = run(path, chunk_rows)
+        print(f'  chunks of {chunk_rows:>9,}: {stats["rows_per_s"]:>10,.0f} rows/s  '
+              f'{stats["seconds"]:>6.1f}s  peak memory {stats["peak_mb"]:>5.0f} MB')
+
+
+def main(sizes=(500, 2000), days=2500):  # ten years of daily bars for each number of tickers
+    folder = tempfile.mkdtemp()
+    for tickers in sizes:  # peak memory should follow the chunk size, not the size of the file
+        for name, parquet in ((f'dump{tickers}.csv', False), (f'dump{tickers}.parquet', True)):
+            path = os.path.join(folder, name)
+            began = time.perf_counter()
+            write_dump(path, tickers, days, parquet)
+            print(f'{name}: {tickers * days:,} rows, {os.path.getsize(path) / 2 ** 20:.0f} MiB '
+                  f'(written in {time.perf_counter() - began:.1f}s)')
+            report(path)
+
+
+if __name__ == '__main__':  # python -m benchmarks.bench_bulk_import
+    main()
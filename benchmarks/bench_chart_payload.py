@@ -0,0 +1,60 @@
+import time  # used to time building and serialising each chart
+
+import numpy as np  # used to make the synthetic prices
+import pandas as pd  # the prices are held in a DataFrame like load_data() returns
+from plotly import graph_objs as go  # the library is used to plot the graph
+
+from downsample import thin, downsample_figure
+from forecasters import FastForecaster, plot_forecast
+
+
+def make_prices(days, seed=0):  # a crypto-style history with a price for every calendar day
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, days)))
+    return pd.DataFrame({'Date': pd.date_range('2015-01-01', periods=days), 'Open': close * 0.99, 'Close': close})
+
+
+def raw_chart(data):  # how plot_raw_data() used to draw every bar
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=data['Date'], y=data['Open'], name="stock_open"))
+    fig.add_trace(go.Scatter(x=data['Date'], y=data['Close'], name="stock_close"))
+    return fig
+
+
+def thinned_chart(data):  # how plot_raw_data() draws them now
+    fig = go.Figure()
+    x, y = thin(data['Date'], data['Open'], spikes=True)
+    fig.add_trace(go.Scattergl(x=x, y=y, name="stock_open"))
+    x, y = thin(data['Date'], data['Close'], spikes=True)
+    fig.add_trace(go.Scattergl(x=x, y=y, name="stock_close"))
+    return fig
+
+
+def forecast_chart(data, thinned):  # the forecast plot for five years ahead
+    df_train = data[['Date', 'Close']].rename(columns={"Date": "ds", "Close": "y"})
+    m = FastForecaster().fit(df_train)
+    fig = plot_forecast(m, m.predict(m.make_future_dataframe(periods=5 * 365)))
+    return downsample_figure(fig) if thinned else fig
+
+
+def measure(build):  # payload size and time to build and serialise the chart, like st.plotly_chart does
+    began = time.perf_counter()
+    payload = build().to_json()
+    return len(payload), (time.perf_counter() - began) * 1000
+
+
+def main():
+    measure(lambda: raw_chart(make_prices(10)))  # the first chart pays for loading plotly's validators
+    print(f'{"chart":<22} {"days":>7} {"before KB":>10} {"after KB":>9} {"before ms":>10} {"after ms":>9}')
+    for days in (4_000, 20_000, 100_000):
+        data = make_prices(days)
+        for name, before, after in (('raw data', lambda: raw_chart(data), lambda: thinned_chart(data)),
+                                    ('forecast', lambda: forecast_chart(data, False), lambda: forecast_chart(data, True))):
+            before_bytes, before_ms = measure(before)
+            after_bytes, after_ms = measure(after)
+            print(f'{name:<22} {days:>7} {before_bytes / 1024:>10.0f} {after_bytes / 1024:>9.0f} '
+                  f'{before_ms:>10.1f} {after_ms:>9.1f}')
+
+
+if __name__ == '__main__':  # python -m benchmarks.bench_chart_payload
+    main()
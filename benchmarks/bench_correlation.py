@@ -0,0 +1,41 @@
+import time  # used to time each comparison
+import tracemalloc  # used to measure the peak memory of each comparison
+
+import numpy as np  # used to make the synthetic prices
+import pandas as pd  # the prices are held in one aligned DataFrame like load_many() returns
+
+from correlation import compare
+
+
+def make_universe(tickers, days, seed=0):  # random-walk closes sharing a market factor, some with shorter histories
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0, 0.01, (days, 1))
+    steps = market * rng.uniform(-1, 1.5, tickers) + rng.normal(0, 0.015, (days, tickers))
+    closes = 100 * np.exp(np.cumsum(steps, axis=0))
+    starts = rng.integers(0, days // 2, tickers)  # listed part way through
+    closes[np.arange(days)[:, None] < starts] = np.nan
+    return pd.DataFrame(closes, index=pd.bdate_range('2015-01-01', periods=days),
+                        columns=[f'T{i:04d}' for i in range(tickers)])
+
+
+def measure(job):  # seconds and peak megabytes allocated while running job()
+    tracemalloc.start()
+    began = time.perf_counter()
+    job()
+    seconds = time.perf_counter() - began
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / 2 ** 20
+
+
+def main():
+    print(f'{"tickers":>8} {"block":>6} {"matrix":>7} {"seconds":>8} {"peak MB":>8}')
+    for tickers in (500, 2000, 4000):
+        prices = make_universe(tickers, 10 * 252)
+        for block, matrix in ((tickers, False), (512, False), (512, True)):
+            seconds, peak = measure(lambda: compare(prices, k=20, block=block, matrix=matrix))
+            print(f'{tickers:>8} {block:>6} {str(matrix):>7} {seconds:>8.2f} {peak:>8.0f}')
+
+
+if __name__ == '__main__':  # python -m benchmarks.bench_correlation
+    main()
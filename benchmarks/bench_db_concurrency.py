@@ -0,0 +1,47 @@
+import os  # used to build the path of the benchmark database
+import tempfile  # the benchmark runs against its own database file
+import threading  # each simulated session runs in its own thread, like Streamlit
+import time  # used to time each request
+
+import numpy as np  # used to work out the latency percentiles
+
+from auth import make_hashes  # hashes the passwords the same way the app does
+from db import get_connection, create_usertable, insert_user, login_user
+
+
+def session(path, worker, requests, latencies):  # one user session: signs up new users then logs them in
+    conn = get_connection(path)
+    c = conn.cursor()
+    for i in range(requests):
+        username = f'user{worker}-{i}'
+        began = time.perf_counter()
+        insert_user(username, make_hashes(username), username, c)
+        conn.commit()
+        latencies['sign up'].append(time.perf_counter() - began)
+        began = time.perf_counter()
+        assert login_user(username, make_hashes(username), c)
+        latencies['login'].append(time.perf_counter() - began)
+
+
+def main(threads=8, requests=500):
+    path = os.path.join(tempfile.mkdtemp(), 'data.db')
+    create_usertable(get_connection(path).cursor())
+    latencies = {'sign up': [], 'login': []}  # list.append is thread safe, so the threads share these
+
+    began = time.perf_counter()
+    workers = [threading.Thread(target=session, args=(path, worker, requests, latencies)) for worker in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    seconds = time.perf_counter() - began
+
+    print(f'{threads} sessions x {requests} sign ups and logins in {seconds:.2f}s '
+          f'({2 * threads * requests / seconds:.0f} requests/s)')
+    for name, values in latencies.items():
+        p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+        print(f'{name:>8}: p50 {p50:.2f} ms  p95 {p95:.2f} ms  p99 {p99:.2f} ms')
+
+
+if __name__ == '__main__':  # python -m benchmarks.bench_db_concurrency
+    main()
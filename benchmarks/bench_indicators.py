@@ -0,0 +1,43 @@
+import time  # used to time each recompute
+
+import numpy as np  # used to make the synthetic prices
+import pandas as pd  # the prices are held in one aligned DataFrame like load_many() returns
+
+from indicators import IndicatorEngine
+
+
+def make_universe(tickers, days, seed=0):  # random-walk closes for 'tickers' tickers over 'days' trading days
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (days, tickers)), axis=0))
+    closes[rng.random(closes.shape) < 0.01] = np.nan  # a few missing days, like the aligned frame has
+    return pd.DataFrame(closes, index=pd.bdate_range('2015-01-01', periods=days),
+                        columns=[f'T{i:03d}' for i in range(tickers)])
+
+
+def timed(job, repeat=5):  # best time of 'repeat' runs in milliseconds
+    best = float('inf')
+    for _ in range(repeat):
+        began = time.perf_counter()
+        job()
+        best = min(best, time.perf_counter() - began)
+    return best * 1000
+
+
+def main():
+    prices = make_universe(500, 10 * 252)
+    engine = IndicatorEngine()
+    full = timed(lambda: engine.compute(prices))
+    print(f'full recompute, 500 tickers x 10 years: {full:8.1f} ms')
+
+    def append_day():  # the last day again on top of the rest, what the scheduler does each morning
+        engine.compute(prices.iloc[:-1])
+        began = time.perf_counter()
+        engine.append(prices.iloc[-1:])
+        return time.perf_counter() - began
+
+    append = min(append_day() for _ in range(5)) * 1000
+    print(f'append one day:                         {append:8.1f} ms')
+
+
+if __name__ == '__main__':  # python -m benchmarks.bench_indicators
+    main()
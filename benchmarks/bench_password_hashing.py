@@ -0,0 +1,43 @@
+import os  # used to count the cores
+import time  # used to time the logins
+from concurrent.futures import ThreadPoolExecutor  # one thread per core, like the app's verification pool
+
+from auth import SHA256Hasher, PBKDF2Hasher, ScryptHasher
+
+SETTINGS = [SHA256Hasher(), PBKDF2Hasher(100_000), PBKDF2Hasher(300_000), PBKDF2Hasher(600_000),
+            ScryptHasher(2 ** 12), ScryptHasher(2 ** 14), ScryptHasher(2 ** 15), ScryptHasher(2 ** 14, p=2)]
+LATENCY_BUDGET_MS = 250  # longest a login check should take before the page feels slow
+
+
+def logins_per_second(hasher, encoded, seconds, threads):  # how many password checks the pool gets through
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        count = 0
+        while time.perf_counter() < deadline:
+            hasher.verify('correct horse battery staple', encoded)
+            count += 1
+        return count
+
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        total = sum(pool.map(lambda _: worker(), range(threads)))
+    return total / (time.perf_counter() - began)
+
+
+def main(seconds=2.0):
+    cores = os.cpu_count() or 1
+    print(f'{cores} core(s), latency budget {LATENCY_BUDGET_MS} ms')
+    print(f'{"setting":<28} {"verify ms":>10} {"logins/s/core":>14} {"within budget":>14}')
+    for hasher in SETTINGS:
+        encoded = hasher.encode('correct horse battery staple')
+        began = time.perf_counter()
+        hasher.verify('correct horse battery staple', encoded)
+        verify_ms = (time.perf_counter() - began) * 1000
+        rate = logins_per_second(hasher, encoded, seconds, cores) / cores
+        label = encoded.rsplit('$', 2)[0] if '$' in encoded else 'sha256 (unsalted)'
+        print(f'{label:<28} {verify_ms:>10.2f} {rate:>14.1f} {"yes" if verify_ms <= LATENCY_BUDGET_MS else "no":>14}')
+
+
+if __name__ == '__main__':  # python -m benchmarks.bench_password_hashing
+    main()
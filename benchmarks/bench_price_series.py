@@ -0,0 +1,52 @@
+import gc  # cleared between runs so each measurement starts from the same point
+import tempfile  # the benchmark fills its own price store
+import time  # used to time the loads
+import tracemalloc  # measures the memory the cached prices hold
+
+from market_data import FORECAST_STOCKS, ANALYTICS_STOCKS  # the app's tickers
+from price_store import PriceStore, SyntheticProvider, PRICE_FIELDS
+
+START, END = '2015-01-01', '2025-01-01'  # ten years of daily bars, like load_data() gives
+
+
+def held(load, tickers):  # (bytes held by keeping every ticker's prices in memory, seconds to load them)
+    gc.collect()
+    tracemalloc.start()
+    began = time.perf_counter()
+    cached = {ticker: load(ticker) for ticker in tickers}
+    seconds = time.perf_counter() - began
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del cached
+    return size, seconds
+
+
+def touch(series, fields):  # a series with some of its other fields asked for, as the pages do
+    for field in fields:
+        series[field]
+    return series
+
+
+def main(tickers=500):
+    universe = list(dict.fromkeys(FORECAST_STOCKS + ANALYTICS_STOCKS)) + [f'SYN{i}' for i in range(tickers)]
+    store = PriceStore(tempfile.mkdtemp(), SyntheticProvider())
+    for ticker in universe:  # fills the store first, so only reading it is measured
+        store.update(ticker, START, END)
+
+    ways = {
+        'DataFrame (load_data)': lambda ticker: store.load(ticker, START, END),
+        'PriceSeries, Close only': lambda ticker: store.load_series(ticker, START, END),
+        'PriceSeries, + Open (charts)': lambda ticker: touch(store.load_series(ticker, START, END), ['Open']),
+        'PriceSeries, every field': lambda ticker: touch(store.load_series(ticker, START, END), PRICE_FIELDS),
+    }
+    print(f'{len(universe)} tickers, {START} to {END}')
+    baseline = None
+    for name, load in ways.items():
+        size, seconds = held(load, universe)
+        baseline = baseline or size
+        print(f'{name:<30} {size / 2 ** 20:>8.1f} MiB  {size / len(universe) / 1024:>7.1f} KiB/ticker  '
+              f'{baseline / size:>5.1f}x smaller  loaded in {seconds:.2f}s')
+
+
+if __name__ == '__main__':  # python -m benchmarks.bench_price_series
+    main()
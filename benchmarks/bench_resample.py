@@ -0,0 +1,94 @@
+import json  # each run's numbers come back from the child process as JSON
+import os  # used to find the repository folder for the child process
+import subprocess  # each run is its own process, starting from nothing in memory
+import sys  # used to start the child process with the same Python
+import tempfile  # the minute bars are written to a throwaway price store
+
+import numpy as np  # used to make up the minute bars
+from numpy.lib.format import open_memmap  # writes the minute bars a chunk at a time, however many there are
+
+from price_store import BAR_DTYPE, PriceStore
+
+CHUNK = 1_000_000  # minute bars made at a time
+CHILD = '''
+import json, sys, time, tracemalloc
+import numpy as np, pandas as pd
+from price_store import PriceStore, _to_frame
+from resample import rollup
+store, how, rule, rows = PriceStore(sys.argv[1]), sys.argv[2], sys.argv[3], int(sys.argv[4])
+tracemalloc.start()  # memory the run allocates, not the memory-mapped file pages the system can drop again
+began = time.perf_counter()
+if how == 'pandas':  # the whole history in memory, the way it would be done with a DataFrame
+    frame = _to_frame(store.read('SYN@1m')[:rows]).set_index('Date')
+    bars = frame.resample(rule.replace('m', 'min')).agg({'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last',
+                                                          'Adj Close': 'last', 'Volume': 'sum'}).dropna()
+else:
+    bars = rollup(store, 'SYN', rule)
+seconds = time.perf_counter() - began
+print(json.dumps({'seconds': seconds, 'bars': len(bars), 'peak_mb': tracemalloc.get_traced_memory()[1] / 2 ** 20}))
+'''
+
+
+def write_minutes(store, rows, start='1990-01-01'):  # 'SYN@1m': a random walk of one bar a minute
+    rng = np.random.default_rng(0)
+    os.makedirs(store.root, exist_ok=True)
+    bars = open_memmap(store._path('SYN@1m', '.npy'), mode='w+', dtype=BAR_DTYPE, shape=(rows,))
+    last = 100.0
+    for lo in range(0, rows, CHUNK):
+        n = min(CHUNK, rows - lo)
+        close = last * np.exp(np.cumsum(rng.normal(0, 0.0005, n)))
+        open_ = np.append(last, close[:-1])
+        chunk = bars[lo:lo + n]
+        chunk['Date'] = np.datetime64(start, 's') + 60 * np.arange(lo, lo + n)
+        chunk['Open'], chunk['Close'], chunk['Adj Close'] = open_, close, close
+        chunk['High'], chunk['Low'] = np.maximum(open_, close) * 1.0002, np.minimum(open_, close) * 0.9998
+        chunk['Volume'] = rng.integers(0, 1000, n)
+        last = close[-1]
+    bars.flush()
+    del bars
+    end = str((np.datetime64(start, 'm') + rows).astype('datetime64[m]'))
+    with open(store._path('SYN@1m', '.json'), 'w') as f:
+        json.dump({'start': start, 'fetched_through': end}, f)
+
+
+def child(root, how, rule, rows=0):
+    output = subprocess.run([sys.executable, '-c', CHILD, root, how, rule, str(rows)], capture_output=True, text=True,
+                            check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return json.loads(output.stdout)
+
+
+def append_minutes(store, count):  # the next 'count' minutes arrive, as an intraday load would add them
+    stored = store.read('SYN@1m')
+    new = np.array(stored[-count:])
+    new['Date'] += np.timedelta64(60 * count, 's')
+    meta = store.read_meta('SYN@1m')
+    meta['fetched_through'] = str((new['Date'][-1] + np.timedelta64(60, 's')).astype('datetime64[m]'))
+    store.write('SYN@1m', np.concatenate([stored, new]), meta)
+
+
+def main(rows=20_000_000, compare_rows=5_000_000):
+    store = PriceStore(tempfile.mkdtemp())
+    write_minutes(store, rows)
+    print(f'{rows:,} minute bars ({rows * BAR_DTYPE.itemsize / 2 ** 20:,.0f} MiB on disk)')
+    for rule in ('5m', '1h', '1d'):  # the first roll-up reads every minute a chunk at a time
+        stats = child(store.root, 'rollup', rule)
+        print(f'  roll-up to {rule:>3}: {stats["bars"]:>10,} bars  {rows / stats["seconds"] / 1e6:>6.1f}M rows/s  '
+              f'{stats["seconds"]:>6.2f}s  peak memory {stats["peak_mb"]:>5.0f} MB')
+
+    print('new minutes arriving, rolled up to 1h:')
+    for count in (1, 60, 1440):  # later roll-ups only read the minutes added since
+        append_minutes(store, count)
+        stats = child(store.root, 'rollup', '1h')
+        print(f'  {count:>5} new minutes: {stats["seconds"] * 1000:>8.1f} ms  peak memory {stats["peak_mb"]:>5.0f} MB')
+
+    print(f'first {compare_rows:,} minutes to 1h from scratch:')
+    compare = PriceStore(tempfile.mkdtemp())
+    write_minutes(compare, compare_rows)
+    for how in ('rollup', 'pandas'):
+        stats = child(compare.root if how == 'rollup' else store.root, how, '1h', compare_rows)
+        print(f'  {how:<7} {compare_rows / stats["seconds"] / 1e6:>6.1f}M rows/s  {stats["seconds"]:>6.2f}s  '
+              f'peak memory {stats["peak_mb"]:>5.0f} MB')
+
+
+if __name__ == '__main__':  # python -m benchmarks.bench_resample
+    main()
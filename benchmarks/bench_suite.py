@@ -0,0 +1,114 @@
+import itertools  # gives every benchmarked sign-up its own username
+import os  # used to find the recorded prices
+import sqlite3  # the login and sign-up benchmarks use a fresh database
+
+import pytest  # run with: python -m pytest benchmarks/bench_suite.py --benchmark-json=benchmarks/baseline.json
+
+pytest.importorskip('pytest_benchmark')  # the suite needs the pytest-benchmark plugin
+
+import market_data  # noqa: E402
+from auth import authenticate, hash_password  # noqa: E402
+from db import create_usertable, insert_user  # noqa: E402
+from downsample import downsample_figure  # noqa: E402
+from forecasters import FastForecaster, plot_forecast  # noqa: E402
+from memo import figure_payload  # noqa: E402
+from price_store import PriceStore, RecordedProvider, SyntheticProvider  # noqa: E402
+
+# Every benchmark runs offline on the recorded prices, or on synthetic ones, so runs can be compared with each other
+FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'fixtures', 'prices')
+START, END = '2019-01-01', '2024-01-01'  # the span the recorded prices cover
+HORIZON_DAYS = 365  # one year ahead, the default on the prediction page
+
+
+@pytest.fixture
+def recorded(tmp_path):  # a store that has already read the recorded prices into its memory-mapped files
+    store = PriceStore(str(tmp_path / 'warm'), RecordedProvider(FIXTURES))
+    store.load('AAPL', START, END)
+    return store
+
+
+@pytest.fixture
+def df_train(recorded):  # AAPL's prices in the shape the forecasters are trained on
+    data = recorded.load('AAPL', START, END)
+    return data[['Date', 'Close']].rename(columns={"Date": "ds", "Close": "y"})
+
+
+# Data load
+
+def test_load_cold(benchmark, tmp_path):  # first load of a ticker: read from the provider and write the store
+    provider = RecordedProvider(FIXTURES)
+    stores = (PriceStore(str(tmp_path / str(i)), provider) for i in itertools.count())
+    benchmark.pedantic(lambda store: store.load('AAPL', START, END), setup=lambda: ((next(stores),), {}),
+                       rounds=20)
+
+
+def test_load_warm(benchmark, recorded):  # later loads: memory-mapped from the store, nothing fetched
+    data = benchmark(recorded.load, 'AAPL', START, END)
+    assert len(data) > 1000
+
+
+def test_load_many_warm(benchmark, monkeypatch, tmp_path):  # every Analytics ticker at once from a warm store
+    monkeypatch.setattr(market_data, 'price_store', PriceStore(str(tmp_path), SyntheticProvider()))
+    monkeypatch.setattr(market_data, 'today', lambda: END)
+    market_data.warm(market_data.ANALYTICS_STOCKS)
+    prices, errors = benchmark(market_data.load_many, market_data.ANALYTICS_STOCKS, 'Close')
+    assert not errors
+
+
+# Forecasting
+
+def test_fast_fit(benchmark, df_train):
+    benchmark(FastForecaster().fit, df_train)
+
+
+def test_fast_predict(benchmark, df_train):
+    m = FastForecaster().fit(df_train)
+    future = m.make_future_dataframe(periods=HORIZON_DAYS)
+    benchmark(m.predict, future)
+
+
+def test_prophet_fit(benchmark, df_train):
+    from fbprophet import Prophet  # fails rather than skips without the library, so a run can't quietly lose it
+    benchmark.pedantic(lambda: Prophet().fit(df_train), rounds=3)  # seconds per fit, so only a few rounds
+
+
+def test_prophet_predict(benchmark, df_train):
+    from fbprophet import Prophet
+    m = Prophet().fit(df_train)
+    future = m.make_future_dataframe(periods=HORIZON_DAYS)
+    benchmark.pedantic(m.predict, args=(future,), rounds=5)
+
+
+# Plots
+
+def test_forecast_plot(benchmark, df_train):  # building, thinning and serialising the forecast chart
+    m = FastForecaster().fit(df_train)
+    forecast = m.predict(m.make_future_dataframe(periods=HORIZON_DAYS))
+    benchmark(lambda: figure_payload(downsample_figure(plot_forecast(m, forecast))))
+
+
+# Login and sign-up
+
+@pytest.fixture
+def conn():  # a fresh database with one user, 'bench', whose password is 'pw'
+    conn = sqlite3.connect(':memory:')
+    c = conn.cursor()
+    create_usertable(c)
+    insert_user('bench', hash_password('pw'), 'Bench Mark', c)
+    conn.commit()
+    return conn
+
+
+def test_sign_up(benchmark, conn):  # hashing the password and adding the user, as add_userdata() does
+    names = itertools.count()
+
+    def sign_up():
+        n = next(names)
+        insert_user(f'user{n}', hash_password('pw'), f'User {n}', conn.cursor())
+        conn.commit()
+
+    benchmark(sign_up)
+
+
+def test_login(benchmark, conn):  # looking the user up and checking the password, as the login page does
+    assert benchmark(authenticate, 'bench', 'pw', conn) is not None
@@ -0,0 +1,58 @@
+import sqlite3  # the login lookup runs against an in-memory database
+import time  # used to time each workload
+
+import tracing
+from db import create_usertable, get_user, insert_user
+from forecasters import FastForecaster, plot_forecast
+from price_store import SyntheticProvider
+
+
+def timed(job, repeat, rounds=7):  # best seconds per call with tracing off and on, alternating so both see the same machine
+    job()
+    best = {False: float('inf'), True: float('inf')}
+    for _ in range(rounds):
+        for enabled in (False, True):
+            tracing.tracer.enabled = enabled
+            began = time.perf_counter()
+            for _ in range(repeat):
+                job()
+            best[enabled] = min(best[enabled], (time.perf_counter() - began) / repeat)
+    return best[False], best[True]
+
+
+def page():  # the stages of the prediction page in Fast mode, each inside its own span like the app
+    with tracing.span('page'):
+        with tracing.span('load_data'):
+            data = SyntheticProvider().fetch('AAPL', '2015-01-01', '2025-01-01')
+        df_train = data[['Date', 'Close']].rename(columns={"Date": "ds", "Close": "y"})
+        with tracing.span('fit'):
+            m = FastForecaster().fit(df_train)
+        with tracing.span('predict'):
+            forecast = m.predict(m.make_future_dataframe(periods=365))
+        with tracing.span('plot_forecast'):
+            plot_forecast(m, forecast).to_json()
+
+
+def main():
+    conn = sqlite3.connect(':memory:')
+    c = conn.cursor()
+    create_usertable(c)
+    insert_user('bench', 'hash', 'Bench Mark', c)
+
+    def empty_span():
+        with tracing.span('empty'):
+            pass
+
+    print(f'{"workload":<22} {"off us":>10} {"on us":>10} {"overhead":>9}')
+    results = {}
+    for name, job, repeat in (('empty span', empty_span, 100_000), ('db.get_user', lambda: get_user('bench', c), 20_000),
+                              ('prediction page', page, 3)):
+        off, on = results[name] = timed(job, repeat)
+        print(f'{name:<22} {off * 1e6:>10.2f} {on * 1e6:>10.2f} {(on - off) / off:>+9.2%}')
+    # a whole page is too noisy to measure a few microseconds on, so also work it out from the cost of one span
+    span_cost = results['empty span'][1] - results['empty span'][0]
+    print(f'estimated page overhead: 5 spans x {span_cost * 1e6:.2f} us = {5 * span_cost / results["prediction page"][0]:.3%}')
+
+
+if __name__ == '__main__':  # python -m benchmarks.bench_tracing
+    main()
@@ -0,0 +1,51 @@
+import os  # used to build the path of the benchmark database
+import tempfile  # the benchmark runs against its own database file
+import time  # used to time each request
+
+from auth import make_hashes  # hashes the passwords the same way the app does
+from db import connect, create_usertable, get_user, insert_user, view_all_users
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)  # number of users in the table when each round is timed
+ROUNDS = 1000  # sign ups and logins timed at each size
+
+
+def fill(conn, start, stop):  # adds synthetic users start..stop-1 in one transaction
+    with conn:
+        conn.executemany('INSERT INTO userstable(username,password,name) VALUES (?,?,?)',
+                         ((f'user{i}', f'hash{i}', f'name{i}') for i in range(start, stop)))
+
+
+def per_request_us(func, count):  # average microseconds for one call
+    began = time.perf_counter()
+    for i in range(count):
+        func(i)
+    return (time.perf_counter() - began) / count * 1e6
+
+
+def main():
+    conn = connect(os.path.join(tempfile.mkdtemp(), 'data.db'))
+    c = conn.cursor()
+    create_usertable(c)
+    print(f'{"users":>10} {"sign up us":>11} {"login us":>9} {"full scan ms":>13}')
+    filled = 0
+    for size in SIZES:
+        fill(conn, filled, size)
+        filled = size
+
+        def sign_up(i):  # a new user each time, committed like the app does
+            insert_user(f'new{size}-{i}', make_hashes(f'new{size}-{i}'), f'new name{size}-{i}', c)
+            conn.commit()
+
+        def login(i):  # looks up an existing user spread across the table
+            get_user(f'user{(i * 7919) % size}', c)
+
+        sign_up_us = per_request_us(sign_up, ROUNDS)
+        login_us = per_request_us(login, ROUNDS)
+        began = time.perf_counter()
+        any(row[0] == 'missing' for row in view_all_users(c))  # what every sign up and login used to cost
+        scan_ms = (time.perf_counter() - began) * 1000
+        print(f'{size:>10} {sign_up_us:>11.1f} {login_us:>9.1f} {scan_ms:>13.1f}')
+
+
+if __name__ == '__main__':  # python -m benchmarks.bench_user_lookup
+    main()
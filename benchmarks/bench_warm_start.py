@@ -0,0 +1,39 @@
+import tempfile  # each run gets its own empty model cache
+import time  # used to time the fits
+
+import numpy as np  # used to make the synthetic prices
+import pandas as pd  # the prices are given to Prophet as a DataFrame
+
+from model_cache import ModelCache  # the cache that does the warm-started refits
+
+
+def make_prices(days, seed=0):  # ten years of random-walk closing prices
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'ds': pd.date_range('2015-01-01', periods=days), 'y': 100 + rng.normal(size=days).cumsum()})
+
+
+def timed_fit(cache, df_train, incremental):
+    began = time.perf_counter()
+    m = cache.get_or_fit('BENCH', df_train, incremental=incremental)
+    return time.perf_counter() - began, m
+
+
+def main(days=3650, refreshes=5, horizon=365):
+    df_train = make_prices(days + refreshes)
+    warm_cache = ModelCache(tempfile.mkdtemp(), capacity=2)
+    cold_cache = ModelCache(tempfile.mkdtemp(), capacity=2)
+    warm_cache.get_or_fit('BENCH', df_train.head(days))  # yesterday's model
+
+    print(f'{"new bars":>8} {"cold s":>8} {"warm s":>8} {"speed-up":>8} {"max drift":>10}')
+    for i in range(1, refreshes + 1):  # one new daily bar arrives each time
+        today = df_train.head(days + i)
+        cold_seconds, cold = timed_fit(cold_cache, today, incremental=False)
+        warm_seconds, warm = timed_fit(warm_cache, today, incremental=True)
+        future = cold.make_future_dataframe(periods=horizon)
+        drift = np.abs(cold.predict(future)['yhat'].to_numpy() - warm.predict(future)['yhat'].to_numpy()).max()
+        print(f'{i:>8} {cold_seconds:>8.3f} {warm_seconds:>8.3f} {cold_seconds / warm_seconds:>7.1f}x {drift:>10.4f}')
+    print(f'warm fits: {warm_cache.stats["warm_fits"]} of {refreshes}')
+
+
+if __name__ == '__main__':  # python -m benchmarks.bench_warm_start
+    main()
@@ -0,0 +1,40 @@
+import argparse  # used to read the options given on the command line
+import json  # pytest-benchmark writes its results as JSON
+import sys  # the exit code tells CI whether anything got slower
+
+THRESHOLD = 0.20  # a benchmark more than 20% slower than the baseline is a regression
+
+
+def load(path, stat):  # dictionary of benchmark name -> the chosen statistic in seconds
+    with open(path) as f:
+        results = json.load(f)
+    return {bench['name']: bench['stats'][stat] for bench in results['benchmarks']}
+
+
+def compare(baseline, latest):  # (name, before, after, change) for every benchmark in both runs
+    return [(name, baseline[name], latest[name], latest[name] / baseline[name] - 1)
+            for name in sorted(baseline) if name in latest]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Flag benchmarks that got slower than the baseline')
+    parser.add_argument('baseline', help='JSON from --benchmark-json, e.g. benchmarks/baseline.json')
+    parser.add_argument('latest', help='JSON from the run to check')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='allowed slowdown, 0.2 is 20%%')
+    parser.add_argument('--stat', default='median', help='statistic to compare: min, median or mean')
+    args = parser.parse_args()
+
+    baseline, latest = load(args.baseline, args.stat), load(args.latest, args.stat)
+    regressions = 0
+    print(f'{"benchmark":<24} {"baseline ms":>12} {"latest ms":>10} {"change":>8}')
+    for name, before, after, change in compare(baseline, latest):
+        slower = change > args.threshold
+        regressions += slower
+        print(f'{name:<24} {before * 1000:>12.3f} {after * 1000:>10.3f} {change:>+8.1%}{"  REGRESSION" if slower else ""}')
+    for name in sorted(set(baseline) ^ set(latest)):
+        print(f'{name:<24} only in {"the baseline" if name in baseline else "the latest run"}')
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':  # python -m benchmarks.compare benchmarks/baseline.json latest.json --threshold 0.2
+    main()
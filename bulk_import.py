@@ -0,0 +1,163 @@
+import argparse  # used to read the options given on the command line
+import glob  # the files to import can be given as patterns, e.g. 'dumps/*.csv.gz'
+import os  # used to build file paths and remove the spill files
+import shutil  # removes the spill folder once every ticker is written
+import tempfile  # each import spills to its own folder inside the store
+import time  # used to work out the rows per second
+
+import numpy as np  # the bars are sorted and de-duplicated as NumPy arrays
+import pandas as pd  # the files are read a chunk at a time with pandas / pyarrow
+
+from market_data import START  # the store then counts as holding everything from here on
+from price_store import BAR_DTYPE, DAILY, PRICE_FIELDS, PriceStore, series_key, _to_records
+
+try:
+    import resource  # peak memory of the import, reported at the end where the system has it
+except ImportError:  # Windows
+    resource = None
+
+# Seeds the price store from end-of-day dumps on disk instead of downloading each ticker. Files are read a chunk
+# at a time and each chunk's bars are appended to one spill file per ticker, so memory depends on the chunk size
+# and not on how big the files are. Each ticker is then sorted and de-duplicated straight from its memory-mapped
+# spill file, which needs 16 bytes a bar, into the same .npy files the app reads with load_data()/load_series().
+# Minute dumps are imported with interval='1m', into the '<ticker>@1m' files the intraday charts roll up from.
+
+CHUNK_ROWS = 250_000  # rows read from a file at a time
+COLUMNS = {'symbol': 'Ticker', 'ticker': 'Ticker', 'date': 'Date', 'datetime': 'Date', 'timestamp': 'Date',
+           'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'adj close': 'Adj Close',
+           'adj_close': 'Adj Close', 'adjclose': 'Adj Close', 'adjusted_close': 'Adj Close', 'volume': 'Volume'}
+
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS):  # the rows of a CSV (optionally compressed) or Parquet file, a chunk at a time
+    if path.endswith('.parquet') or path.endswith('.pq'):
+        import pyarrow.parquet as pq  # only needed for Parquet files
+        # without pre_buffer=False pyarrow keeps every column chunk it has read, so memory grows with the file
+        for batch in pq.ParquetFile(path, pre_buffer=False).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+def normalise(frame, ticker=None):  # renames the vendor's columns to the store's, 'ticker' for single-ticker files
+    frame = frame.rename(columns=lambda name: COLUMNS.get(str(name).strip().lower(), name))
+    if ticker is not None:
+        frame['Ticker'] = ticker
+    missing = {'Ticker', 'Date', 'Close'} - set(frame.columns)
+    if missing:
+        raise ValueError(f'missing columns: {", ".join(sorted(missing))}')
+    return frame
+
+
+def validate(frame):  # the bars that make sense: a date, positive prices, the high above and the low below the rest
+    frame = frame.copy()
+    # times with an offset are kept as naive UTC, the same as downloaded intraday prices
+    frame['Date'] = pd.to_datetime(frame['Date'], errors='coerce', utc=True).dt.tz_localize(None)
+    for field in PRICE_FIELDS:
+        if field in frame.columns:
+            frame[field] = pd.to_numeric(frame[field], errors='coerce')
+    close = frame['Close']
+    for field in ('Open', 'High', 'Low', 'Adj Close'):  # dumps with only a close give flat bars
+        frame[field] = frame[field].fillna(close) if field in frame.columns else close
+    frame['Volume'] = frame['Volume'].fillna(0) if 'Volume' in frame.columns else 0
+    prices = frame[['Open', 'High', 'Low', 'Close']]
+    good = (frame['Ticker'].notna() & frame['Date'].notna() & (prices > 0).all(axis=1) & (frame['Volume'] >= 0)
+            & (frame['High'] >= prices.max(axis=1) * (1 - 1e-9)) & (frame['Low'] <= prices.min(axis=1) * (1 + 1e-9)))
+    return frame[good], int((~good).sum())
+
+
+class BulkImporter:  # streams chunks of bars into per-ticker spill files, then writes each ticker to the store
+    def __init__(self, store, start=START, interval=DAILY):
+        self.store = store
+        self.start = start  # recorded as the start of what the store holds, so loads don't download it all again
+        self.interval = interval  # bar size of the files, '1d' or e.g. '1m' for minute bars
+        self.spill = None  # folder of numbered .bars files, one per ticker, made on the first chunk
+        self.spilled = {}  # ticker -> spill file path
+        # rows read, rows failing validation, bars replaced by a later one for the same time (in the files or the store),
+        # bars written and tickers written
+        self.stats = {'rows': 0, 'invalid': 0, 'duplicates': 0, 'written': 0, 'tickers': 0}
+
+    def _spill_path(self, ticker):  # the ticker's spill file, started with the bars the store already has
+        path = self.spilled.get(ticker)
+        if path is None:
+            if self.spill is None:
+                os.makedirs(self.store.root, exist_ok=True)
+                self.spill = tempfile.mkdtemp(prefix='.import-', dir=self.store.root)
+            path = self.spilled[ticker] = os.path.join(self.spill, '%d.bars' % len(self.spilled))
+            stored = self.store.read(series_key(ticker, self.interval))
+            with open(path, 'wb') as f:  # written before the file's bars, so the file wins where they overlap
+                for lo in range(0, len(stored), CHUNK_ROWS):
+                    f.write(np.ascontiguousarray(stored[lo:lo + CHUNK_ROWS]).tobytes())
+        return path
+
+    def add(self, frame, ticker=None):  # validates one chunk and appends its bars to each ticker's spill file
+        frame = normalise(frame, ticker)
+        self.stats['rows'] += len(frame)
+        frame, invalid = validate(frame)
+        self.stats['invalid'] += invalid
+        records = _to_records(frame)  # the whole chunk is converted at once, then split up by ticker
+        codes, names = pd.factorize(frame['Ticker'])
+        order = np.argsort(codes, kind='stable')  # keeps each ticker's rows in the order they were given
+        edges = np.searchsorted(codes[order], np.arange(len(names) + 1))
+        for i, name in enumerate(names):
+            with open(self._spill_path(str(name)), 'ab') as f:
+                f.write(records[order[edges[i]:edges[i + 1]]].tobytes())
+
+    def finish(self):  # sorts and de-duplicates each ticker's bars and swaps them into the store
+        try:
+            for ticker, path in self.spilled.items():
+                if not os.path.getsize(path):
+                    continue
+                bars = np.memmap(path, dtype=BAR_DTYPE, mode='r')
+                order = np.argsort(bars['Date'], kind='stable')  # equal dates stay in the order they arrived
+                dates = bars['Date'][order]
+                last = np.append(dates[1:] != dates[:-1], True)  # the last bar given for each date is kept
+                order = order[last]
+                self.stats['duplicates'] += len(bars) - len(order)
+                first = str(dates[0].astype('datetime64[D]'))
+                if self.interval == DAILY:
+                    through = str((dates[-1] + np.timedelta64(1, 'D')).astype('datetime64[D]'))
+                else:  # intraday loads ask for bars up to the minute
+                    through = str((dates[-1] + np.timedelta64(1, 'm')).astype('datetime64[m]'))
+                key = series_key(ticker, self.interval)
+                stored = self.store.read_meta(key)
+                if stored is not None:  # an older dump doesn't undo the days already downloaded after it
+                    through = max(through, stored['fetched_through'])
+                meta = {'start': min(self.start, first), 'fetched_through': through}
+                self.store.write(key, bars, meta, order)
+                self.stats['written'] += len(order)
+                self.stats['tickers'] += 1
+                del bars
+        finally:
+            if self.spill is not None:
+                shutil.rmtree(self.spill, ignore_errors=True)
+        return self.stats
+
+
+def bulk_import(paths, store=None, ticker=None, chunk_rows=CHUNK_ROWS, start=START, interval=DAILY):  # imports files, returns the counts
+    store = store or PriceStore()
+    importer = BulkImporter(store, start, interval)
+    began = time.perf_counter()
+    for path in paths:
+        for chunk in read_chunks(path, chunk_rows):
+            importer.add(chunk, ticker)
+    stats = importer.finish()
+    stats['seconds'] = time.perf_counter() - began
+    stats['rows_per_s'] = stats['rows'] / stats['seconds'] if stats['seconds'] else 0.0
+    stats['peak_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else float('nan')  # KB on Linux
+    return stats
+
+
+if __name__ == '__main__':  # python -m bulk_import 'dumps/*.csv.gz' [--store price_store] [--ticker AAPL]
+    parser = argparse.ArgumentParser(description='Seed the price store from CSV or Parquet dumps')
+    parser.add_argument('files', nargs='+', help='files or patterns; CSV (also .gz/.zip) or Parquet')
+    parser.add_argument('--store', default='price_store', help='price store folder to write to')
+    parser.add_argument('--ticker', help='the ticker of every row, for files without a ticker column')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='rows read at a time')
+    parser.add_argument('--start', default=START, help='date the imported history counts as starting from')
+    parser.add_argument('--interval', default=DAILY, help="bar size of the files, e.g. '1m' for minute bars")
+    args = parser.parse_args()
+    paths = sorted(path for pattern in args.files for path in (glob.glob(pattern) or [pattern]))
+    stats = bulk_import(paths, PriceStore(args.store), args.ticker, args.chunk_rows, args.start, args.interval)
+    print(f'{stats["rows"]:,} rows from {len(paths)} files in {stats["seconds"]:.1f}s ({stats["rows_per_s"]:,.0f} rows/s): '
+          f'{stats["written"]:,} bars for {stats["tickers"]} tickers, {stats["invalid"]:,} invalid, '
+          f'{stats["duplicates"]:,} duplicates, peak memory {stats["peak_mb"]:.0f} MB')
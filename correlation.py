@@ -0,0 +1,106 @@
+from collections import namedtuple  # the result of a comparison is a small record
+
+import numpy as np  # each block of the matrix is a handful of matrix products
+import pandas as pd  # the prices arrive as one DataFrame with a column per ticker
+
+from indicators import returns  # daily returns measured from the last day each ticker traded
+
+BLOCK = 512  # tickers per block, a block of the matrix takes BLOCK x BLOCK x 8 bytes for each of six sums
+MIN_OVERLAP = 20  # pairs that traded on fewer common days than this aren't given a correlation
+
+Correlations = namedtuple('Correlations', 'matrix most least')  # matrix is None when only the top pairs are wanted
+PAIR_COLUMNS = ['ticker_1', 'ticker_2', 'corr', 'days']  # columns of the most / least correlated pair tables
+
+
+def calendars(prices):  # the distinct sets of days tickers trade on, and which one each ticker follows
+    present = prices.notna().to_numpy()
+    listed = np.maximum.accumulate(present, axis=0) & np.maximum.accumulate(present[::-1], axis=0)[::-1]
+    # days before a ticker was listed or after it was delisted say nothing about its calendar, so they count as
+    # trading days and a stock listed late still shares the calendar of the rest of its market
+    traded = present | ~listed
+    groups, first, which = {}, [], np.empty(len(prices.columns), dtype=int)  # calendar -> its number, first ticker of each
+    for ticker, days in enumerate(np.packbits(traded, axis=0).T):  # each ticker's days as a few hundred bytes
+        which[ticker] = groups.setdefault(days.tobytes(), len(groups))
+        if which[ticker] == len(first):
+            first.append(ticker)
+    return traded[:, first].T, which
+
+
+def _blocks(n, block, start=0):  # (start, end) of each slice of 'block' tickers from 'start' up to 'n'
+    return [(lo, min(lo + block, n)) for lo in range(start, n, block)]
+
+
+def _returns_on(prices, rows, columns):  # the tickers' returns measured only from one of the given days to the next
+    daily = returns(prices.iloc[rows, columns])
+    return np.nan_to_num(daily.to_numpy(dtype=float)), daily.notna().to_numpy(dtype=float)
+
+
+def _block_corr(x, present, squares, a, b, min_overlap):  # correlation of tickers a[0]:a[1] with b[0]:b[1]
+    xa, xb = x[:, a[0]:a[1]], x[:, b[0]:b[1]]
+    ma, mb = present[:, a[0]:a[1]], present[:, b[0]:b[1]]
+    # every sum only counts the days both tickers of a pair have a return, e.g. after listing
+    days = ma.T @ mb
+    sum_a, sum_b = xa.T @ mb, ma.T @ xb
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = xa.T @ xb - sum_a * sum_b / days
+        var_a = squares[:, a[0]:a[1]].T @ mb - sum_a ** 2 / days
+        var_b = ma.T @ squares[:, b[0]:b[1]] - sum_b ** 2 / days
+        corr = np.clip(cov / np.sqrt(var_a * var_b), -1, 1)
+    corr[days < min_overlap] = np.nan
+    return corr, days
+
+
+def _keep(best, values, rows, cols, days, k, largest):  # merges a block's candidates into the k best pairs so far
+    values = np.concatenate([best[0], values])
+    rows, cols, days = (np.concatenate([old, new]) for old, new in zip(best[1:], (rows, cols, days)))
+    if len(values) > k:
+        order = np.argpartition(-values if largest else values, k - 1)[:k]
+        values, rows, cols, days = values[order], rows[order], cols[order], days[order]
+    return values, rows, cols, days
+
+
+def _pair_table(best, tickers, largest):  # the k best pairs as a table, strongest first
+    values, rows, cols, days = best
+    order = np.argsort(-values if largest else values, kind='stable')
+    return pd.DataFrame({'ticker_1': tickers[rows[order]], 'ticker_2': tickers[cols[order]],
+                         'corr': values[order], 'days': days[order].astype(int)}, columns=PAIR_COLUMNS)
+
+
+def compare(prices, k=10, block=BLOCK, min_overlap=MIN_OVERLAP, matrix=True):  # correlation matrix and top-k pairs
+    # each pair is measured on the days both tickers traded, so crypto's Sunday to Monday return is never paired
+    # with a stock's Friday to Monday one; tickers are grouped by calendar so each group is still a few matrix products
+    tickers = prices.columns.to_numpy()
+    days, which = calendars(prices)
+    full = np.full((len(tickers), len(tickers)), np.nan) if matrix else None  # only kept if asked for
+    empty = (np.empty(0), np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0))
+    most, least = empty, empty
+    for g in range(len(days)):
+        for h in range(g, len(days)):
+            first, second = np.flatnonzero(which == g), np.flatnonzero(which == h)
+            columns = first if g == h else np.concatenate([first, second])  # the tickers of both calendars
+            x, present = _returns_on(prices, np.flatnonzero(days[g] & days[h]), columns)
+            squares = x * x
+            for a in _blocks(len(first), block):
+                for b in _blocks(len(columns), block, start=len(first) if g != h else 0):
+                    if b[0] < a[0]:  # the matrix is symmetric, so only blocks on or above the diagonal are worked out
+                        continue
+                    corr, overlap = _block_corr(x, present, squares, a, b, min_overlap)
+                    rows, cols = columns[a[0]:a[1]], columns[b[0]:b[1]]
+                    if full is not None:
+                        full[np.ix_(rows, cols)] = corr
+                        full[np.ix_(cols, rows)] = corr.T
+                    i, j = np.nonzero(~np.isnan(corr))
+                    i, j = rows[i], cols[j]
+                    pair = i != j if g != h else i < j  # each pair once, and never a ticker with itself
+                    values, overlap = corr[~np.isnan(corr)][pair], overlap[~np.isnan(corr)][pair]
+                    i, j = np.minimum(i[pair], j[pair]), np.maximum(i[pair], j[pair])
+                    most = _keep(most, values, i, j, overlap, k, largest=True)
+                    least = _keep(least, values, i, j, overlap, k, largest=False)
+    if full is not None:
+        full = pd.DataFrame(full, index=prices.columns, columns=prices.columns)
+    return Correlations(full, _pair_table(most, tickers, True), _pair_table(least, tickers, False))
+
+
+def pair_returns(prices, first, second):  # both tickers' returns on the days both traded, for drilling into a pair
+    # only the two tickers' own prices are used, as compare() does, so the numbers agree whatever else is in 'prices'
+    return returns(prices[[first, second]].dropna()).dropna()
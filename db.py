@@ -0,0 +1,134 @@
+import sqlite3  # imports the library sqlite3 for communicating with the database
+import threading  # every Streamlit session runs in its own thread, so each thread gets its own connection
+
+from tracing import traced  # times every query for the performance panel
+
+DB_PATH = 'data.db'  # the database used by the app
+
+# The SQL is kept in constants so sqlite3 reuses the same prepared statement every time it runs
+CREATE_USERTABLE = ('CREATE TABLE IF NOT EXISTS userstable(username TEXT NOT NULL UNIQUE,password TEXT NOT NULL UNIQUE, '
+                    'name TEXT NOT NULL UNIQUE)')
+SELECT_LOGIN = 'SELECT * FROM userstable WHERE username =? AND password = ?'
+SELECT_ALL_USERS = 'SELECT * FROM userstable'
+SELECT_USER = 'SELECT username, password, name FROM userstable WHERE username = ?'  # uses the UNIQUE index
+SELECT_USER_EXISTS = 'SELECT 1 FROM userstable WHERE username = ? LIMIT 1'
+INSERT_USER = 'INSERT INTO userstable(username,password,name) VALUES (?,?,?) ON CONFLICT DO NOTHING'
+UPDATE_PASSWORD = 'UPDATE userstable SET password = ? WHERE username = ?'
+# keyset pagination: each page starts after the last username of the one before, so the index does the skipping
+SELECT_USERS_PAGE = 'SELECT * FROM userstable WHERE username > ? ORDER BY username LIMIT ?'
+SELECT_USERS_PAGE_PREFIX = ('SELECT * FROM userstable WHERE username > ? AND username >= ? AND username < ? '
+                            'ORDER BY username LIMIT ?')
+COUNT_USERS = 'SELECT COUNT(*) FROM userstable'
+COUNT_USERS_PREFIX = 'SELECT COUNT(*) FROM userstable WHERE username >= ? AND username < ?'
+
+PAGE_SIZE = 50  # users shown on each page of the profiles view
+
+_local = threading.local()  # holds this thread's connections, one per database file
+
+
+# DB Management
+
+def connect(path=DB_PATH):  # opens a new connection set up for many readers and one writer at a time
+    conn = sqlite3.connect(path, timeout=10, cached_statements=256)
+    if path != ':memory:':
+        conn.execute('PRAGMA journal_mode=WAL')  # readers no longer wait for a writer to finish
+        conn.execute('PRAGMA synchronous=NORMAL')  # safe with WAL and much faster than FULL
+    return conn
+
+
+def get_connection(path=DB_PATH):  # this thread's connection to the database, opened the first time it is asked for
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    if path not in connections:
+        connections[path] = connect(path)
+    return connections[path]
+
+
+def get_cursor(path=DB_PATH):  # a cursor on this thread's connection
+    return get_connection(path).cursor()
+
+
+# DB Functions
+
+@traced('db.create_usertable')
+def create_usertable(c=None):  # function creates a table for database if it doesn't exist
+    c = c or get_cursor()
+    c.execute(CREATE_USERTABLE)
+
+
+@traced('db.login_user')
+def login_user(username, password, c=None):  # function to login the user to their respective account
+    c = c or get_cursor()
+    c.execute(SELECT_LOGIN, (username, password))
+    data = c.fetchall()
+    return data
+
+
+@traced('db.user_exists')
+def user_exists(username, c=None):  # whether a username is taken, a single index lookup
+    c = c or get_cursor()
+    c.execute(SELECT_USER_EXISTS, (username,))
+    return c.fetchone() is not None
+
+
+@traced('db.get_user')
+def get_user(username, c=None):  # the (username, password, name) row of one user, or None if there isn't one
+    c = c or get_cursor()
+    c.execute(SELECT_USER, (username,))
+    return c.fetchone()
+
+
+@traced('db.insert_user')
+def insert_user(username, password, name, c=None):  # adds a user in one statement, False if the details are taken
+    c = c or get_cursor()
+    c.execute(INSERT_USER, (username, password, name))  # the UNIQUE columns make the check and insert atomic
+    return c.rowcount == 1
+
+
+@traced('db.update_password')
+def update_password(username, password, c=None):  # replaces a user's stored password hash
+    c = c or get_cursor()
+    c.execute(UPDATE_PASSWORD, (password, username))
+
+
+def _prefix_range(prefix):  # usernames starting with 'prefix' are the ones in [prefix, upper)
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+@traced('db.get_users_page')
+def get_users_page(after='', limit=PAGE_SIZE, prefix='', c=None):  # up to 'limit' users after the username 'after'
+    c = c or get_cursor()
+    if prefix:
+        c.execute(SELECT_USERS_PAGE_PREFIX, (after, *_prefix_range(prefix), limit))
+    else:
+        c.execute(SELECT_USERS_PAGE, (after, limit))
+    return c.fetchall()
+
+
+@traced('db.count_users')
+def count_users(prefix='', c=None):  # number of users, or of users whose username starts with 'prefix'
+    c = c or get_cursor()
+    if prefix:
+        c.execute(COUNT_USERS_PREFIX, _prefix_range(prefix))
+    else:
+        c.execute(COUNT_USERS)
+    return c.fetchone()[0]
+
+
+def iter_users(page_size=PAGE_SIZE, prefix='', c=None):  # yields every user one page at a time, never the whole table
+    after = ''
+    while True:
+        page = get_users_page(after, page_size, prefix, c)
+        yield from page
+        if len(page) < page_size:
+            return
+        after = page[-1][0]
+
+
+@traced('db.view_all_users')
+def view_all_users(c=None):  # function used to get all records in the database
+    c = c or get_cursor()
+    c.execute(SELECT_ALL_USERS)
+    data = c.fetchall()
+    return data
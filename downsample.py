@@ -0,0 +1,99 @@
+import hashlib  # traces are matched on a hash of their dates
+
+import numpy as np  # the bucketing is done with NumPy so no Python loop runs over the prices or the buckets
+import pandas as pd  # compares and hashes dates, whatever type they come as
+
+CHART_WIDTH_PX = 1200  # roughly how wide a full-width chart is on screen
+POINTS_PER_PX = 2  # more points than this can't be told apart on screen
+
+
+def points_for_width(width_px=CHART_WIDTH_PX):  # how many points a chart of this width can actually show
+    return int(width_px * POINTS_PER_PX)
+
+
+def points_for_range(x, start, end, width_px=CHART_WIDTH_PX):  # points to keep from all of 'x' so start to end fills the chart
+    # the whole history is still sent for the range slider, just thinned so the part on screen gets a full chart's
+    # worth of points and the rest the same spacing
+    x = pd.to_datetime(np.asarray(x))
+    shown = int(((x >= pd.Timestamp(start)) & (x <= pd.Timestamp(end))).sum())
+    return min(len(x), points_for_width(width_px) * len(x) // max(shown, 1))
+
+
+def _as_numbers(x):  # dates become nanoseconds so the triangle areas can be worked out
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+def _bucket_edges(n, buckets):  # start of each of 'buckets' nearly equal slices of range(n), plus n at the end
+    return np.linspace(0, n, buckets + 1).astype(np.int64)
+
+
+def _pick_largest(area, owner, starts):  # index of the largest area in each bucket
+    biggest = np.maximum.reduceat(area, starts)
+    candidates = np.flatnonzero(area >= biggest[owner])
+    _, first = np.unique(owner[candidates], return_index=True)
+    return candidates[first]
+
+
+def lttb(x, y, n_out, passes=2):  # largest-triangle-three-buckets: indices of the 'n_out' points that keep the line's shape
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x, y = _as_numbers(x), np.asarray(y, dtype=float)
+    inner_x, inner_y = x[1:n - 1], y[1:n - 1]  # first and last points are always kept
+    starts = _bucket_edges(n - 2, n_out - 2)[:-1]
+    counts = np.diff(np.append(starts, n - 2))
+    owner = np.repeat(np.arange(n_out - 2), counts)  # which bucket each point is in
+    # average point of every bucket, the far corner of each bucket's triangles
+    mean_x = np.append(np.add.reduceat(inner_x, starts) / counts, x[-1])
+    mean_y = np.append(np.add.reduceat(inner_y, starts) / counts, y[-1])
+    # classic LTTB anchors each bucket on the point picked in the bucket before, which needs a Python loop;
+    # here every bucket is first anchored on the previous bucket's average, then again on the points that picked,
+    # so all buckets are worked out at once and still keep the peaks and troughs
+    anchor_x, anchor_y = np.append(x[0], mean_x[:-2]), np.append(y[0], mean_y[:-2])
+    for _ in range(passes):
+        ax, ay = anchor_x[owner], anchor_y[owner]
+        area = np.abs((ax - mean_x[owner + 1]) * (inner_y - ay) - (ax - inner_x) * (mean_y[owner + 1] - ay))
+        picked = _pick_largest(area, owner, starts)
+        anchor_x, anchor_y = np.append(x[0], inner_x[picked[:-1]]), np.append(y[0], inner_y[picked[:-1]])
+    return np.concatenate([[0], picked + 1, [n - 1]])
+
+
+def minmax(y, buckets):  # indices of the lowest and highest point in each bucket, so spikes are never lost
+    n = len(y)
+    if 2 * buckets >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    edges = _bucket_edges(n, buckets)
+    owner = np.repeat(np.arange(buckets), np.diff(edges))  # which bucket each point is in
+    # sorting by (bucket, value) puts each bucket's minimum first and maximum last
+    order = np.lexsort((y, owner))
+    lows, highs = order[edges[:-1]], order[edges[1:] - 1]
+    return np.unique(np.concatenate([lows, highs]))
+
+
+def thin(x, y, max_points=None, spikes=False):  # the points of a line worth sending to the browser, gaps (NaN) are dropped first
+    x, y = np.asarray(x), np.asarray(y, dtype=float)
+    present = ~np.isnan(y)
+    x, y = x[present], y[present]
+    max_points = max_points or points_for_width()
+    # prices keep every bucket's low and high so no spike is lost, other lines keep their shape with LTTB
+    keep = minmax(y, max_points // 2) if spikes else lttb(x, y, max_points)
+    return x[keep], y[keep]
+
+
+def downsample_figure(fig, max_points=None):  # thins out every long trace of a plotly figure in place
+    max_points = max_points or points_for_width()
+    chosen = {}  # traces sharing the same dates share the same points, so bands stay lined up
+    for trace in fig.data:
+        if trace.x is None or trace.y is None or len(trace.x) <= max_points:
+            continue
+        x = np.asarray(trace.x)
+        dates = hashlib.sha256(pd.util.hash_array(x).tobytes()).hexdigest()  # the same only for the same dates
+        if dates not in chosen:
+            chosen[dates] = lttb(x, np.asarray(trace.y, dtype=float), max_points)
+        keep = chosen[dates]
+        trace.x, trace.y = x[keep], np.asarray(trace.y)[keep]
+    return fig
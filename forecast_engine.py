@@ -0,0 +1,34 @@
+import time  # used to time each ticker's fit
+from collections import namedtuple  # lightweight record for each ticker's result
+from concurrent.futures import ProcessPoolExecutor, as_completed  # spreads the fits over every core
+
+from market_data import load_series  # loads prices through the shared on-disk store
+
+# what forecast_many() gives back for each ticker, 'error' is None when the forecast worked
+ForecastResult = namedtuple('ForecastResult', ['ticker', 'forecast', 'last_bar', 'seconds', 'error'])
+
+
+def forecast_ticker(ticker, horizon_days):  # trains a model for the ticker and forecasts 'horizon_days' ahead
+    from model_cache import fit_model  # loads Prophet in the worker process, the first time it is needed
+    data = load_series(ticker)  # loads the data
+    df_train = data.to_prophet_frame()  # built the same way as on the prediction page, so it gets the same cache key
+    m = fit_model(ticker, df_train)  # trains the algorithm, the app then finds it in the model cache
+    forecast = m.predict(m.make_future_dataframe(periods=horizon_days))  # forecasting using the data
+    return forecast, data['Date'][-1]
+
+
+def _timed(job, ticker, horizon_days):  # runs in the worker process, never raises so one bad ticker can't stop the rest
+    began = time.perf_counter()
+    try:
+        forecast, last_bar = job(ticker, horizon_days)
+        return ForecastResult(ticker, forecast, last_bar, time.perf_counter() - began, None)
+    except Exception as error:
+        return ForecastResult(ticker, None, None, time.perf_counter() - began, repr(error))
+
+
+def forecast_many(tickers, horizon_days, workers=None, job=forecast_ticker):  # yields each result as soon as it is ready
+    # workers=None uses one process per core, job has to be a module-level function so it can be sent to the workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_timed, job, ticker, horizon_days) for ticker in dict.fromkeys(tickers)]
+        for future in as_completed(futures):
+            yield future.result()
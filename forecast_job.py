@@ -0,0 +1,84 @@
+import argparse  # used to read the tickers given on the command line
+import sys  # used to report failed tickers through the exit code
+from datetime import datetime  # used to timestamp each trained model
+
+import pandas as pd  # the forecasts are read back as a DataFrame
+
+from db import connect  # opens data.db set up for several readers
+from market_data import FORECAST_STOCKS  # stocks / crypto that can be selected for prediction
+from forecast_engine import forecast_many  # trains many tickers at once on a process pool
+
+HORIZON_DAYS = 5 * 365  # the slider goes up to 5 years, so that much is worked out in advance
+FORECAST_COLUMNS = ('ds', 'yhat', 'yhat_lower', 'yhat_upper', 'trend', 'trend_lower', 'trend_upper',
+                    'weekly', 'weekly_lower', 'weekly_upper', 'yearly', 'yearly_lower', 'yearly_upper')  # forecast values and components that are saved
+
+
+# DB Functions
+
+def create_forecasttable(c):  # function creates the tables for precomputed forecasts if they don't exist
+    c.execute('CREATE TABLE IF NOT EXISTS forecaststable(ticker TEXT NOT NULL, ds TEXT NOT NULL, yhat REAL, '
+              'yhat_lower REAL, yhat_upper REAL, trend REAL, trend_lower REAL, trend_upper REAL, weekly REAL, '
+              'weekly_lower REAL, weekly_upper REAL, yearly REAL, yearly_lower REAL, yearly_upper REAL, '
+              'PRIMARY KEY (ticker, ds))')  # the primary key is the index used to slice by date
+    c.execute('CREATE TABLE IF NOT EXISTS forecastruns(ticker TEXT PRIMARY KEY, model_timestamp TEXT NOT NULL, '
+              'last_bar TEXT NOT NULL, horizon_days INTEGER NOT NULL)')  # when each ticker was last trained
+
+
+def save_forecast(conn, ticker, forecast, last_bar, horizon_days=HORIZON_DAYS):  # replaces the stored forecast for a ticker
+    c = conn.cursor()
+    create_forecasttable(c)
+    rows = forecast.reindex(columns=list(FORECAST_COLUMNS)).copy()
+    rows['ds'] = pd.to_datetime(rows['ds']).dt.strftime('%Y-%m-%d')
+    rows = rows.astype(object).where(rows.notna(), None)  # components the model didn't use are stored as NULL
+    with conn:  # one transaction, so the app never sees half a forecast
+        c.execute('DELETE FROM forecaststable WHERE ticker = ?', (ticker,))
+        c.executemany('INSERT INTO forecaststable(ticker,%s) VALUES (?%s)'
+                      % (','.join(FORECAST_COLUMNS), ',?' * len(FORECAST_COLUMNS)),
+                      ((ticker, *row) for row in rows.itertuples(index=False)))
+        c.execute('INSERT OR REPLACE INTO forecastruns(ticker,model_timestamp,last_bar,horizon_days) VALUES (?,?,?,?)',
+                  (ticker, datetime.now().isoformat(timespec='seconds'), pd.Timestamp(last_bar).strftime('%Y-%m-%d'),
+                   horizon_days))
+
+
+def forecast_run(conn, ticker):  # details of the last job run for a ticker, or None if it has never run
+    c = conn.cursor()
+    create_forecasttable(c)
+    c.execute('SELECT model_timestamp, last_bar, horizon_days FROM forecastruns WHERE ticker = ?', (ticker,))
+    row = c.fetchone()
+    if row is None:
+        return None
+    return {'model_timestamp': row[0], 'last_bar': row[1], 'horizon_days': row[2]}
+
+
+def read_forecast(conn, ticker, period, last_bar):  # the stored forecast for the next 'period' days, None if stale
+    run = forecast_run(conn, ticker)
+    last_bar = pd.Timestamp(last_bar).strftime('%Y-%m-%d')
+    if run is None or run['last_bar'] != last_bar or run['horizon_days'] < period:  # newer prices than the model
+        return None
+    end = (pd.Timestamp(last_bar) + pd.Timedelta(days=period)).strftime('%Y-%m-%d')
+    forecast = pd.read_sql_query('SELECT %s FROM forecaststable WHERE ticker = ? AND ds <= ? ORDER BY ds'
+                                 % ','.join(FORECAST_COLUMNS), conn, params=(ticker, end))
+    forecast['ds'] = pd.to_datetime(forecast['ds'])
+    return forecast
+
+
+# Job
+
+def run_job(tickers, conn, workers=None):  # works out and stores the forecast for every ticker
+    failed = []
+    for result in forecast_many(tickers, HORIZON_DAYS, workers):  # tickers are trained side by side
+        if result.error is not None:
+            failed.append(result.ticker)
+            print(f'{result.ticker}: failed after {result.seconds:.1f}s: {result.error}')
+            continue
+        save_forecast(conn, result.ticker, result.forecast, result.last_bar)
+        print(f'{result.ticker}: {len(result.forecast)} rows in {result.seconds:.1f}s')
+    return failed
+
+
+if __name__ == '__main__':  # python forecast_job.py [--workers N] [TICKER ...]
+    parser = argparse.ArgumentParser(description='Precompute forecasts into data.db')
+    parser.add_argument('tickers', nargs='*', default=list(FORECAST_STOCKS))
+    parser.add_argument('--workers', type=int, default=None, help='processes to use, defaults to one per core')
+    args = parser.parse_args()
+    sys.exit(1 if run_job(args.tickers, connect(), args.workers) else 0)
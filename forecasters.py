@@ -0,0 +1,129 @@
+import numpy as np  # the fast model is solved with NumPy least squares
+import pandas as pd  # the forecasts are returned as a DataFrame, the same shape Prophet gives
+
+from memo import data_version  # fingerprints the training prices
+from singleflight import flights  # sessions asking for the same model at once share one fit
+
+# plotly and Prophet take seconds to import, so they are only loaded the first time a plot or model needs them
+
+DAILY_ORDER = 4  # number of sine/cosine pairs for the pattern within a day, Prophet's default
+WEEKLY_ORDER = 3  # number of sine/cosine pairs for the weekly pattern, Prophet's default
+YEARLY_ORDER = 10  # number of sine/cosine pairs for the yearly pattern, Prophet's default
+INTERVAL_Z = 1.2816  # 80% interval, the same width Prophet uses by default
+
+
+def _fourier(days, period, order):  # sine and cosine columns for a repeating pattern of 'period' days
+    angles = 2 * np.pi * np.outer(days, np.arange(1, order + 1)) / period
+    return np.hstack([np.sin(angles), np.cos(angles)])
+
+
+SEASONALITIES = {'weekly': (7, WEEKLY_ORDER), 'yearly': (365.25, YEARLY_ORDER), 'daily': (1, DAILY_ORDER)}  # days, order
+
+
+def _days(ds):  # days since 1970-01-01 as floats, so intraday times fall between whole days
+    return pd.to_datetime(ds).to_numpy(dtype='datetime64[s]').astype(np.int64) / 86400
+
+
+class FastForecaster:  # linear trend plus daily, weekly and yearly seasonality, fitted in milliseconds
+    def __init__(self):
+        self.history = None  # the prices the model was trained on
+        self.coef = None  # fitted weights of the trend and seasonality columns
+        self.sigma = None  # spread of the errors, used for the interval
+        self.seasonalities = ()  # the patterns the prices are long (or fine) enough to fit
+
+    def _design(self, ds):  # one row per date: trend columns, then each seasonality's sine/cosine columns
+        days = _days(ds)
+        t = (days - self.start) / self.scale  # 0 at the first price, 1 at the last one
+        return np.hstack([np.column_stack([np.ones_like(t), t])] +
+                         [_fourier(days, *SEASONALITIES[name]) for name in self.seasonalities])
+
+    def fit(self, df_train):  # trains the model on a frame with 'ds' and 'y' columns
+        self.history = df_train[['ds', 'y']].reset_index(drop=True)
+        days = _days(self.history['ds'])
+        self.start, self.scale = days[0], max(days[-1] - days[0], 1)
+        # weekly and yearly as before, except that weeks of intraday prices can't fit a yearly pattern (Prophet's
+        # rule of two years), and the pattern within a day only for prices with bars that aren't at midnight
+        intraday = bool((days != np.floor(days)).any())
+        self.seasonalities = ('weekly', 'yearly') if not intraday else \
+            ('weekly', 'yearly', 'daily') if days[-1] - days[0] >= 2 * 365.25 else ('weekly', 'daily')
+        X = self._design(self.history['ds'])
+        y = self.history['y'].to_numpy(dtype=float)
+        self.coef, *_ = np.linalg.lstsq(X, y, rcond=None)  # solves for every weight in one go
+        self.sigma = float(np.std(y - X @ self.coef))
+        return self
+
+    def make_future_dataframe(self, periods, freq='D'):  # the training dates followed by 'periods' more steps of 'freq'
+        last = pd.Timestamp(self.history['ds'].iloc[-1])
+        future = pd.date_range(last, periods=periods + 1, freq=freq)[1:]
+        return pd.DataFrame({'ds': pd.concat([pd.to_datetime(self.history['ds']), pd.Series(future)],
+                                             ignore_index=True)})
+
+    def predict(self, future):  # forecast for every date in 'future', in Prophet's column layout
+        X = self._design(future['ds'])
+        trend = X[:, :2] @ self.coef[:2]
+        parts, lo = {}, 2
+        for name in self.seasonalities:  # each pattern's share of the forecast
+            hi = lo + 2 * SEASONALITIES[name][1]
+            parts[name] = X[:, lo:hi] @ self.coef[lo:hi]
+            lo = hi
+        yhat = trend + sum(parts.values())
+        forecast = {'ds': pd.to_datetime(future['ds']).reset_index(drop=True), 'trend': trend,
+                    'yhat_lower': yhat - INTERVAL_Z * self.sigma, 'yhat_upper': yhat + INTERVAL_Z * self.sigma,
+                    'weekly': parts['weekly'], 'yearly': parts.get('yearly', np.zeros_like(yhat))}
+        if 'daily' in parts:
+            forecast['daily'] = parts['daily']
+        forecast['yhat'] = yhat
+        return pd.DataFrame(forecast)
+
+    def plot_components(self, forecast):  # trend, weekly, yearly and (for intraday prices) daily parts stacked together
+        from plotly import graph_objs as go  # the library is used to plot the graph
+        from plotly.subplots import make_subplots  # stacks the components of the fast model
+        names = ('trend', 'weekly', 'yearly', 'daily') if 'daily' in forecast else ('trend', 'weekly', 'yearly')
+        fig = make_subplots(rows=len(names), cols=1, subplot_titles=names)
+        for row, name in enumerate(names, start=1):
+            fig.add_trace(go.Scatter(x=forecast['ds'], y=forecast[name], name=name), row=row, col=1)
+        fig.layout.update(showlegend=False, height=200 * len(names))
+        return fig
+
+
+def fit_prophet(ticker, df_train):  # trains Prophet, or reuses the model if the prices haven't changed
+    from model_cache import fit_model  # keeps trained Prophet models so moving the slider doesn't retrain
+    return fit_model(ticker, df_train)
+
+
+def fit_fast(ticker, df_train):  # trains the fast model, quick enough that it doesn't need caching
+    return FastForecaster().fit(df_train)
+
+
+FORECASTERS = {'Prophet': fit_prophet, 'Fast': fit_fast}  # forecasting modes the user can pick from
+
+
+def fit_forecaster(mode, ticker, df_train):  # trains the model for the chosen mode, once for sessions asking together
+    key = ('fit', mode, ticker, data_version(df_train, ('ds', 'y')))
+    return flights.do(key, FORECASTERS[mode], ticker, df_train)
+
+
+def stored_forecaster(ticker, df_train):  # the Prophet model behind a precomputed forecast, never trained here
+    from model_cache import stored_model  # the forecast job leaves its models in the model cache
+    m = stored_model(ticker, df_train)
+    if m is None:  # the job ran on another machine or its model was removed, the charts only need the prices
+        m = FastForecaster()
+        m.history = df_train[['ds', 'y']].reset_index(drop=True)
+    return m
+
+
+def plot_forecast(m, forecast):  # forecast plot for either kind of model
+    from plotly import graph_objs as go  # the library is used to plot the graph
+    if not isinstance(m, FastForecaster):
+        from fbprophet.plot import plot_plotly  # the library is used to plot the graph
+        return plot_plotly(m, forecast)
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=m.history['ds'], y=m.history['y'], mode='markers', name='Actual',
+                             marker=dict(color='black', size=4)))
+    fig.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat_lower'], line=dict(width=0), showlegend=False,
+                             hoverinfo='skip'))
+    fig.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat_upper'], line=dict(width=0), fill='tonexty',
+                             fillcolor='rgba(0, 114, 178, 0.2)', name='Interval'))
+    fig.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat'], line=dict(color='#0072B2'), name='Predicted'))
+    fig.layout.update(yaxis_title='y', xaxis_title='ds', xaxis_rangeslider_visible=True)
+    return fig
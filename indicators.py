@@ -0,0 +1,160 @@
+import numpy as np  # every indicator is worked out on whole arrays at once, never one row at a time
+import pandas as pd  # the prices arrive as one DataFrame with a column per ticker
+
+TRADING_DAYS = 252  # used to turn daily volatility into yearly volatility
+# names shown on the Analytics page for each indicator IndicatorEngine works out (with its default windows)
+INDICATORS = {'Daily returns': 'returns', 'Volatility (21-day, yearly)': 'volatility',
+              '20-day moving average': 'sma_short', '50-day moving average': 'sma_long', '20-day EMA': 'ema',
+              'RSI (14-day)': 'rsi', 'Drawdown': 'drawdown', 'Beta to the market (63-day)': 'beta',
+              'Correlation with the market (63-day)': 'corr'}
+
+# Every function takes the aligned price frame from load_many(): dates down the side, one column per ticker,
+# and empty cells on days a ticker didn't trade (e.g. stocks at the weekend when crypto still trades)
+
+
+def returns(prices):  # daily returns, measured from the last day each ticker traded
+    filled = prices.ffill()
+    change = filled / filled.shift(1) - 1
+    return change.where(prices.notna())  # no return on days the ticker didn't trade
+
+
+def _rolling_sums(frame, window, powers=(1,)):  # rolling count and sums of x, x**2... with one cumulative sum each
+    values = frame.to_numpy(dtype=float)
+    present = ~np.isnan(values)
+
+    def rolling(values):  # total of the last 'window' rows (fewer for the first rows), every ticker at once
+        totals = np.cumsum(values, axis=0, dtype=float)
+        totals[window:] -= totals[:-window].copy()
+        return totals
+
+    return rolling(present), [rolling(np.where(present, values ** power, 0.0)) for power in powers]
+
+
+def _frame(values, like):  # wraps an array back up with the dates and tickers of 'like'
+    return pd.DataFrame(values, index=like.index, columns=like.columns)
+
+
+def volatility(daily_returns, window=21):  # rolling yearly volatility of the returns
+    count, (total, squares) = _rolling_sums(daily_returns, window, powers=(1, 2))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = (squares - total ** 2 / count) / (count - 1)
+    std = np.sqrt(np.clip(variance, 0, None))
+    return _frame(np.where(count >= max(2, window // 2), std, np.nan) * np.sqrt(TRADING_DAYS), daily_returns)
+
+
+def sma(prices, window):  # simple moving average over the last 'window' prices
+    count, (total,) = _rolling_sums(prices, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return _frame(np.where(count >= max(1, window // 2), total / count, np.nan), prices)
+
+
+def ema(prices, span, start=None):  # exponential moving average, carried on from 'start' (the last EMA) if given
+    alpha = 2 / (span + 1)
+    return _smooth(prices, alpha, start)
+
+
+def _smooth(values, alpha, start=None):  # y = (1 - alpha) * y_before + alpha * x, the recurrence behind EMA and RSI
+    if start is None:
+        return values.ewm(alpha=alpha, adjust=False, ignore_na=True).mean()
+    # the last smoothed row goes in front as the first value, so the recurrence carries on from where it stopped
+    seeded = pd.concat([start.to_frame().T, values])
+    return seeded.ewm(alpha=alpha, adjust=False, ignore_na=True).mean().iloc[1:]
+
+
+def _gains_losses(prices):  # size of each day's rise and fall, measured from the last day each ticker traded
+    change = prices.ffill().diff().where(prices.notna())
+    return change.clip(lower=0), (-change).clip(lower=0)
+
+
+def rsi(avg_gain, avg_loss):  # relative strength index from Wilder's smoothed gains and losses, 0 to 100
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+def drawdown(prices, peak=None):  # how far each price is below its highest price so far, 'peak' carries on from before
+    running = prices.cummax() if peak is None else prices.cummax().clip(lower=peak, axis=1)
+    return prices / running - 1
+
+
+def rolling_beta_corr(daily_returns, benchmark, window=63):  # rolling beta and correlation of every ticker against one
+    x = daily_returns.to_numpy(dtype=float)
+    y = np.broadcast_to(benchmark.to_numpy(dtype=float)[:, None], x.shape)
+    both = ~np.isnan(x) & ~np.isnan(y)  # only days both traded count
+    x, y = np.where(both, x, np.nan), np.where(both, y, np.nan)
+    count, (sum_x, sum_xx) = _rolling_sums(_frame(x, daily_returns), window, powers=(1, 2))
+    _, (sum_y, sum_yy) = _rolling_sums(_frame(y, daily_returns), window, powers=(1, 2))
+    _, (sum_xy,) = _rolling_sums(_frame(x * y, daily_returns), window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # the 1 / n factors cancel out in beta and correlation, so sums of deviations are enough
+        cov = sum_xy - sum_x * sum_y / count
+        var_x, var_y = sum_xx - sum_x ** 2 / count, sum_yy - sum_y ** 2 / count
+        enough = count >= max(2, window // 2)
+        beta = np.where(enough, cov / var_y, np.nan)
+        corr = np.where(enough, cov / np.sqrt(var_x * var_y), np.nan)
+    return _frame(beta, daily_returns), _frame(np.clip(corr, -1, 1), daily_returns)
+
+
+def correlation_matrix(daily_returns, window=63):  # ticker-by-ticker correlation of the returns over the last 'window' days
+    return daily_returns.iloc[-window:].corr(min_periods=max(2, window // 2))
+
+
+def latest(results):  # one row per ticker with the newest value of every indicator
+    return pd.DataFrame({name: frame.ffill().iloc[-1] for name, frame in results.items()})
+
+
+class IndicatorEngine:  # works out every indicator for the whole universe, then only the new rows as bars are added
+    def __init__(self, short=20, long=50, span=20, rsi_window=14, vol_window=21, beta_window=63, benchmark=None):
+        self.short, self.long, self.span = short, long, span  # moving average lengths
+        self.rsi_window, self.vol_window, self.beta_window = rsi_window, vol_window, beta_window
+        self.benchmark = benchmark  # ticker the betas are measured against, the average of all tickers if None
+        self.results = None  # dictionary of indicator name -> DataFrame, filled in by compute()
+
+    def _benchmark_returns(self, daily_returns):
+        if self.benchmark is not None:
+            return daily_returns[self.benchmark]
+        return daily_returns.mean(axis=1)  # equal-weighted market made of the whole universe
+
+    def _window(self):  # rows of history needed to work out the next row of every rolling indicator
+        return max(self.short, self.long, self.vol_window, self.beta_window) + 1
+
+    def _indicators(self, prices, state=None, rows=None):  # every indicator for the last 'rows' rows of 'prices'
+        state = state or {}  # smoothed values to carry on from, empty for a full recompute
+        daily = returns(prices)
+        beta, corr = rolling_beta_corr(daily, self._benchmark_returns(daily), self.beta_window)
+        results = {
+            'returns': daily,
+            'volatility': volatility(daily, self.vol_window),
+            'sma_short': sma(prices, self.short),
+            'sma_long': sma(prices, self.long),
+            'beta': beta,
+            'corr': corr,
+        }
+        gain, loss = _gains_losses(prices)
+        if rows is not None:  # the rows before are only there so the rolling windows are full
+            results = {name: frame.iloc[-rows:] for name, frame in results.items()}
+            prices, gain, loss = prices.iloc[-rows:], gain.iloc[-rows:], loss.iloc[-rows:]
+        alpha = 1 / self.rsi_window  # Wilder's smoothing
+        avg_gain, avg_loss = _smooth(gain, alpha, state.get('avg_gain')), _smooth(loss, alpha, state.get('avg_loss'))
+        results['ema'] = ema(prices, self.span, state.get('ema'))
+        results['rsi'] = rsi(avg_gain, avg_loss)
+        results['drawdown'] = drawdown(prices, state.get('peak'))
+        peak = prices.max() if 'peak' not in state else np.fmax(state['peak'], prices.max())
+        new_state = {'avg_gain': avg_gain.ffill().iloc[-1], 'avg_loss': avg_loss.ffill().iloc[-1],
+                     'ema': results['ema'].ffill().iloc[-1], 'peak': peak}
+        return results, new_state
+
+    def compute(self, prices):  # full recompute over every ticker and every day
+        self.results, self.state = self._indicators(prices)
+        self.tail = prices.iloc[-self._window():]  # just enough history to carry on when new bars arrive
+        return self.results
+
+    def append(self, new_prices):  # works out the indicators for bars added after the last compute() or append()
+        if self.results is None:
+            return self.compute(new_prices)
+        prices = pd.concat([self.tail, new_prices.reindex(columns=self.tail.columns)])
+        added, self.state = self._indicators(prices, self.state, rows=len(new_prices))
+        self.tail = prices.iloc[-self._window():]
+        self.results = {name: pd.concat([self.results[name], frame]) for name, frame in added.items()}
+        return added
+
+    def latest(self):  # one row per ticker with the newest value of every indicator
+        return latest(self.results)
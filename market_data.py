@@ -0,0 +1,139 @@
+import os  # the price provider can be chosen with the PRICE_PROVIDER environment variable
+import time  # used for the per-ticker deadlines and the pause between retries
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED  # runs the downloads side by side
+from datetime import date, datetime, timedelta, timezone  # the library allows dates to be used
+
+import numpy as np  # finds where the intraday window starts in the stored bars
+import pandas as pd  # the prices of every ticker are joined into one DataFrame
+
+from price_series import PriceSeries  # compact form of the prices for keeping in memory
+from price_store import DAILY, PriceStore, make_provider, series_key  # keeps downloaded prices on disk so only new days are fetched
+from resample import rollup  # hourly and 5 minute bars are rolled up from the stored minute bars
+from singleflight import flights  # sessions loading the same ticker at once share one download
+
+START = "2015-01-01"  # start date is set as most stocks started thereabouts
+FORECAST_STOCKS = ('AAPL', 'NKE')  # stocks / crypto that can be selected for prediction
+ANALYTICS_STOCKS = ('GOOG', 'AAPL', 'MSFT', 'GME', 'BTC-GBP', '^FTSE', '^FTMC', 'WMT')  # stocks / crypto to compare
+GRANULARITIES = ('1d', '1h', '15m', '5m', '1m')  # bar sizes the charts and forecasts can use
+INTRADAY = '1m'  # intraday prices are downloaded as minute bars, the other sizes are rolled up from them
+INTRADAY_DAYS = 30  # days of intraday bars shown, as far back as Yahoo keeps minute bars
+
+# on-disk store of prices shared by every page, PRICE_PROVIDER=synthetic or recorded:<folder> runs it offline
+price_store = PriceStore(provider=make_provider(os.environ.get('PRICE_PROVIDER', 'yahoo')))
+
+
+def today():  # end date is today's date
+    return date.today().strftime("%Y-%m-%d")
+
+
+def now():  # end time for intraday bars, to the minute, in UTC like the stored bars
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M")
+
+
+def _load(ticker, start, end):  # the stored prices, downloading only the missing days, once for callers asking together
+    return flights.do(('load', ticker, start, end), price_store.load, ticker, start, end)
+
+
+def _load_series(ticker, start, end, attempt=1):  # the same as a PriceSeries
+    # a retry gets its own key, so it doesn't just wait on the attempt that timed out
+    key = ('series', ticker, start, end) + ((attempt,) if attempt > 1 else ())
+    return flights.do(key, price_store.load_series, ticker, start, end)
+
+
+def load_data(ticker):  # function to load the data
+    return _load(ticker, START, today())  # reads the stored prices and downloads only the missing days
+
+
+def _load_intraday(ticker, interval, end):  # the last INTRADAY_DAYS of bars, rolling the new minutes up if needed
+    start = (datetime.fromisoformat(end) - timedelta(days=INTRADAY_DAYS)).strftime("%Y-%m-%d")
+    price_store.update(series_key(ticker, INTRADAY), start, end)  # downloads only the minutes since the last time
+    bars = price_store.read(series_key(ticker, INTRADAY)) if interval == INTRADAY else rollup(price_store, ticker, interval)
+    bars = bars[np.searchsorted(bars['Date'], np.datetime64(start, 's')):]
+    return PriceSeries.from_records(ticker, bars, unit='m')
+
+
+def load_series(ticker, interval=DAILY, attempt=1):  # the prices as a compact PriceSeries, about a seventh of the memory of load_data()
+    if interval == DAILY:
+        return _load_series(ticker, START, today(), attempt)
+    end = now()
+    key = ('intraday', ticker, interval, end) + ((attempt,) if attempt > 1 else ())
+    return flights.do(key, _load_intraday, ticker, interval, end)
+
+
+def _run_all(job, tickers, workers, timeout, retries):  # runs job(ticker, attempt) for every ticker on a bounded thread pool
+    results, errors = {}, {}
+    attempts = {ticker: 0 for ticker in tickers}
+    waiting = [(0.0, ticker) for ticker in tickers]  # (time it may start, ticker), retries wait out their back-off here
+    pending = {}  # future -> (ticker, deadline)
+    # a thread that timed out can't be stopped, so it keeps its place in the pool until it returns
+    hung = set()
+    pool = ThreadPoolExecutor(max_workers=workers)
+    # time for every ticker to wait its turn for a thread and use every attempt and back-off; nothing is waited on
+    # after this, so threads that never return can't hold up the page, even once they fill the pool
+    turns = -(-len(tickers) // workers)
+    deadline = time.monotonic() + turns * ((retries + 1) * timeout + 0.25 * retries * (retries + 1))
+
+    def retry_or_fail(ticker, error, now):
+        if attempts[ticker] <= retries:
+            waiting.append((now + 0.5 * attempts[ticker], ticker))  # short back-off before trying again
+        else:
+            errors[ticker] = error
+
+    now = time.monotonic()
+    while (waiting or pending) and now < deadline:
+        waiting.sort(key=lambda item: item[0])
+        while waiting and waiting[0][0] <= now and len(pending) + len(hung) < workers:
+            _, ticker = waiting.pop(0)
+            attempts[ticker] += 1
+            # the attempt's time starts once a thread is free, not while the ticker waits for one
+            pending[pool.submit(job, ticker, attempts[ticker])] = (ticker, min(now + timeout, deadline))
+        wake = [deadline] + [until for _, until in pending.values()]
+        if waiting and len(pending) + len(hung) < workers:
+            wake.append(waiting[0][0])
+        timeout_left = max(0, min(wake) - now)
+        if pending or hung:
+            done, _ = wait(list(pending) + list(hung), timeout=timeout_left, return_when=FIRST_COMPLETED)
+        else:  # only retries waiting out their back-off
+            time.sleep(timeout_left)
+            done = set()
+        hung -= done  # a timed-out thread has returned, so its place is free again
+        now = time.monotonic()
+        for future, (ticker, until) in list(pending.items()):
+            if future in done:
+                del pending[future]
+                try:
+                    results[ticker] = future.result()
+                except Exception as error:  # any failure from the provider is retried
+                    retry_or_fail(ticker, error, now)
+            elif now >= until:  # the attempt took too long, stop waiting for it
+                del pending[future]
+                hung.add(future)
+                retry_or_fail(ticker, TimeoutError(f'{ticker} took longer than {timeout}s'), now)
+    for _, ticker in waiting:  # still waiting for a thread or a retry when time ran out
+        errors[ticker] = TimeoutError(f'{ticker} did not get a working download in time')
+    pool.shutdown(wait=False)
+    return results, errors
+
+
+def warm(tickers, workers=8, timeout=30, retries=2):  # brings the store up to date for every ticker at once
+    end = today()
+    _, errors = _run_all(lambda ticker, attempt: price_store.update(ticker, START, end), list(dict.fromkeys(tickers)),
+                         workers, timeout, retries)
+    return errors  # dictionary of ticker -> error for the tickers that could not be loaded
+
+
+def load_many(tickers, field=None, workers=8, timeout=30, retries=2, interval=DAILY):  # loads several tickers together
+    end = today()
+    tickers = list(dict.fromkeys(tickers))  # the same ticker can be picked twice, only load it once
+    load = (lambda ticker, attempt: _load_series(ticker, START, end, attempt)) if interval == DAILY else \
+        (lambda ticker, attempt: load_series(ticker, interval, attempt))
+    series, errors = _run_all(load, tickers, workers, timeout, retries)
+    loaded = [ticker for ticker in tickers if ticker in series]
+    if not loaded:
+        return pd.DataFrame(), errors
+    fields = [field] if isinstance(field, str) else field  # one field, a list of them, or None for every field
+    # one frame indexed by date with a column per (ticker, field), dates missing for a ticker are left empty
+    wide = pd.concat({ticker: series[ticker].to_frame(fields).set_index('Date') for ticker in loaded}, axis=1, sort=True)
+    if isinstance(field, str):
+        wide = wide.xs(field, axis=1, level=1)  # just one column per ticker
+    return wide, errors
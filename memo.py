@@ -0,0 +1,95 @@
+import hashlib  # used to fingerprint the prices
+import io  # charts drawn as images are written to memory rather than a file
+import sys  # used to estimate how much memory a cached value takes
+import threading  # the cache is shared by every Streamlit session thread
+import time  # used to expire old entries
+from collections import OrderedDict  # keeps the entries in least-recently-used order
+
+import numpy as np  # arrays are sized from their buffers
+import pandas as pd  # the prices are fingerprinted with pandas' row hashes
+
+from price_series import PriceSeries  # the compact prices are fingerprinted from their arrays
+
+
+def data_version(data, columns=('Date', 'Close')):  # short fingerprint of a price frame, changes whenever a bar is added or revised
+    if isinstance(data, PriceSeries):
+        return hashlib.sha256(data.offsets.tobytes() + data.close.tobytes()).hexdigest()[:16]
+    hashes = pd.util.hash_pandas_object(data[list(columns)], index=False)
+    return hashlib.sha256(hashes.to_numpy().tobytes()).hexdigest()[:16]
+
+
+def figure_payload(fig):  # a chart in a form that can be cached: JSON for plotly, PNG bytes for matplotlib
+    if hasattr(fig, 'savefig'):
+        from matplotlib import pyplot as plt  # only needed for Prophet's component plots
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', bbox_inches='tight')
+        plt.close(fig)  # frees the figure now that it has been drawn
+        return buffer.getvalue()
+    return fig.to_json()
+
+
+def _size(value):  # rough size in bytes of a cached value
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(pd.Series(value.memory_usage(index=True, deep=True)).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_size(item) for item in value.values())
+    if isinstance(value, (tuple, list)):  # e.g. a namedtuple of frames, counted with what it holds
+        return sys.getsizeof(value) + sum(_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class MemoCache:  # least-recently-used cache bounded by total size, where every entry also expires after 'ttl' seconds
+    def __init__(self, max_bytes=64 * 2 ** 20, ttl=3600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (value, size, expiry time), most recently used last
+        self.bytes = 0  # total size of everything cached
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}  # counters for how well the cache is doing
+
+    def _drop(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.bytes -= size
+
+    def get(self, key):  # the cached value, or None if it is missing or too old
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[2] < time.monotonic():
+                self._drop(key)
+                self.stats['expired'] += 1
+                entry = None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[0]
+
+    def put(self, key, value):  # caches a value, dropping the least recently used entries if it is over the size limit
+        size = _size(value)
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            if size > self.max_bytes:  # bigger than the whole cache, not worth keeping
+                return value
+            self.entries[key] = (value, size, time.monotonic() + self.ttl)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self.entries)))
+                self.stats['evictions'] += 1
+        return value
+
+    def get_or_set(self, key, make):  # the cached value, working it out with make() only if needed
+        value = self.get(key)
+        return value if value is not None else self.put(key, make())
+
+    def summary(self):  # statistics shown in the debug sidebar
+        with self.lock:
+            return dict(self.stats, entries=len(self.entries), megabytes=round(self.bytes / 2 ** 20, 2))
+
+
+figures = MemoCache()  # rendered charts and tables shared by every page
@@ -0,0 +1,179 @@
+import hashlib  # used to fingerprint the training data
+import json  # used to put the model settings into the cache key
+import os  # used to build file paths and swap files in atomically
+import threading  # the cache is shared by every Streamlit session thread
+from collections import OrderedDict  # keeps the models in least-recently-used order
+
+import pandas as pd  # used to hash the training data
+
+# Prophet is loaded the first time a model is made or read, so the cache logic can be tested on its own
+
+
+def _new_model(config):  # a Prophet model with the given settings
+    from fbprophet import Prophet  # the library is used to produce the forecasted data
+    return Prophet(**config)
+
+
+def _to_json(m):  # saves a fitted model
+    from fbprophet.serialize import model_to_json
+    return model_to_json(m)
+
+
+def _from_json(serialised):  # restores a fitted model
+    from fbprophet.serialize import model_from_json
+    return model_from_json(serialised)
+
+
+def fingerprint(df_train):  # short hash of the 'ds' and 'y' columns, changes whenever the prices do
+    hashes = pd.util.hash_pandas_object(df_train[['ds', 'y']], index=False)
+    return hashlib.sha256(hashes.to_numpy().tobytes()).hexdigest()
+
+
+def cache_key(ticker, df_train, config):  # the same ticker, prices and settings always give the same key
+    settings = json.dumps(config, sort_keys=True)
+    return hashlib.sha256(f'{ticker}|{fingerprint(df_train)}|{settings}'.encode()).hexdigest()
+
+
+def lineage_key(ticker, config):  # names the chain of models trained for one ticker with the same settings
+    settings = json.dumps(config, sort_keys=True)
+    return hashlib.sha256(f'{ticker}|{settings}'.encode()).hexdigest()
+
+
+def stan_init(m):  # fitted parameters of a model, in the form Stan takes as starting values
+    init = {}
+    for pname in ['k', 'm', 'sigma_obs']:
+        init[pname] = m.params[pname][0][0]
+    for pname in ['delta', 'beta']:
+        init[pname] = m.params[pname][0]
+    return init
+
+
+class ModelCache:  # keeps fitted Prophet models as JSON in memory and on disk so they are only trained once
+    def __init__(self, root='model_cache', capacity=16, files=256):
+        self.root = root  # folder holding one JSON file per fitted model
+        self.capacity = capacity  # most models kept in memory at once
+        self.files = files  # most models kept on disk, the ones used longest ago are removed first
+        self.models = OrderedDict()  # key -> serialised model, most recently used last
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'warm_fits': 0}  # counters for how well the cache is doing
+
+    def _path(self, key):
+        return os.path.join(self.root, key + '.json')
+
+    def _remember(self, key, serialised):  # adds a model to memory, dropping the least recently used one if full
+        with self.lock:
+            self.models[key] = serialised
+            self.models.move_to_end(key)
+            while len(self.models) > self.capacity:
+                self.models.popitem(last=False)
+
+    def get(self, key):  # the fitted model for a key, or None if it has never been trained
+        with self.lock:
+            serialised = self.models.get(key)
+            if serialised is not None:
+                self.models.move_to_end(key)
+                self.stats['hits'] += 1
+        if serialised is not None:
+            self._touch(key)
+            return _from_json(serialised)
+        try:
+            with open(self._path(key)) as f:
+                serialised = f.read()
+        except FileNotFoundError:
+            return None
+        self._touch(key)
+        self.stats['disk_hits'] += 1
+        self._remember(key, serialised)
+        return _from_json(serialised)
+
+    def put(self, key, m):  # stores a fitted model in memory and on disk
+        serialised = _to_json(m)
+        self._remember(key, serialised)
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self._path(key) + '.%d-%d.tmp' % (os.getpid(), threading.get_ident())
+        with open(tmp, 'w') as f:
+            f.write(serialised)
+        os.replace(tmp, self._path(key))
+        self._prune()
+
+    def _touch(self, key):  # marks a model's file as just used
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _prune(self):  # removes the model files used longest ago once there are more than allowed
+        used = []
+        for entry in os.scandir(self.root):
+            if not entry.name.endswith('.json') or entry.name.endswith('.lineage.json'):
+                continue  # lineage files are kept, there is one per ticker and settings
+            try:
+                used.append((entry.stat().st_mtime_ns, entry.path))
+            except FileNotFoundError:  # removed by another session
+                pass
+        used.sort()
+        for _, path in used[:max(0, len(used) - self.files)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _read_lineage(self, ticker, config):  # the last model trained for this ticker and settings, if any
+        try:
+            with open(self._path(lineage_key(ticker, config) + '.lineage')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_lineage(self, ticker, config, key, df_train):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(lineage_key(ticker, config) + '.lineage')
+        tmp = path + '.%d-%d.tmp' % (os.getpid(), threading.get_ident())
+        with open(tmp, 'w') as f:
+            json.dump({'key': key, 'rows': len(df_train), 'fingerprint': fingerprint(df_train)}, f)
+        os.replace(tmp, path)
+
+    def warm_start(self, ticker, df_train, config):  # starting values from the last model, if the prices only grew at the end
+        previous = self._read_lineage(ticker, config)
+        if previous is None or previous['rows'] >= len(df_train):
+            return None
+        if fingerprint(df_train.iloc[:previous['rows']]) != previous['fingerprint']:  # history was revised
+            return None
+        m = self.get(previous['key'])
+        return stan_init(m) if m is not None else None
+
+    def get_or_fit(self, ticker, df_train, config=None, incremental=True, persist=True):  # returns a fitted model, training one only if needed
+        config = config or {}
+        key = cache_key(ticker, df_train, config)
+        m = self.get(key)
+        if m is not None:
+            return m
+        self.stats['misses'] += 1
+        init = self.warm_start(ticker, df_train, config) if incremental else None
+        m = _new_model(config)  # calls the forecasting library
+        if init is not None:  # only new days were added, so start from where the last model finished
+            self.stats['warm_fits'] += 1
+            m.fit(df_train, init=init)
+        else:
+            m.fit(df_train)  # trains the algorithm with previous data
+        if persist:
+            self.put(key, m)
+            self._write_lineage(ticker, config, key, df_train)
+        else:  # kept in memory only, with no lineage to start later fits from
+            self._remember(key, _to_json(m))
+        return m
+
+
+models = ModelCache()  # cache of fitted models shared by every page
+
+
+def fit_model(ticker, df_train, config=None):  # function to get a trained model for the prices
+    # intraday prices are a rolling window that starts a minute later every minute, so the history always looks
+    # revised and every fit would be cold and leave another file behind; those models are only kept in memory
+    ds = pd.to_datetime(df_train['ds'])
+    daily = bool((ds == ds.dt.normalize()).all())
+    return models.get_or_fit(ticker, df_train, config, incremental=daily, persist=daily)
+
+
+def stored_model(ticker, df_train, config=None):  # the model already trained on these prices, None rather than fitting one
+    return models.get(cache_key(ticker, df_train, config or {}))
@@ -0,0 +1,88 @@
+import numpy as np  # the prices are kept as small contiguous NumPy arrays
+import pandas as pd  # turned back into a DataFrame only when a table or Prophet needs one
+
+# A DataFrame of one ticker's prices takes 56 bytes a day (datetime64, five float64 columns and an int64 volume).
+# A PriceSeries keeps the dates as int32 offsets and the close as float32, 8 bytes a day, and only turns the
+# other fields into arrays the first time they are asked for: float32 for prices, int64 for the volume so it stays
+# exact. Until then they stay in the price store's memory-mapped file, which the operating system can drop from
+# memory whenever it likes.
+
+UNITS = ('D', 'm')  # day offsets for daily bars, minute offsets for intraday ones
+FIELD_DTYPES = {'Volume': np.int64}  # fields kept whole, rather than as float32 or float64 prices
+
+
+class PriceSeries:  # one ticker's bars as compact arrays, read like a frame: series['Date'], series['Close']
+    __slots__ = ('ticker', 'unit', 'offsets', 'close', '_fields', '_source')
+
+    def __init__(self, ticker, offsets, close, unit='D', fields=None, source=None):
+        self.ticker = ticker
+        self.unit = unit  # what one step of 'offsets' is, 'D' or 'm'
+        self.offsets = offsets  # int32 days (or minutes) since 1970-01-01
+        self.close = close  # float32 closing prices
+        self._fields = fields if fields is not None else {}  # other fields already turned into arrays
+        self._source = source  # the bars the other fields are read from when first asked for, e.g. a memory map
+
+    @classmethod
+    def from_records(cls, ticker, records, unit=None):  # wraps rows of the price store's table, without copying them
+        dates = np.asarray(records['Date'])
+        if unit is None:  # days unless a bar isn't at midnight
+            unit = 'D' if not len(dates) or (dates == dates.astype('datetime64[D]')).all() else 'm'
+        offsets = dates.astype(f'datetime64[{unit}]').astype(np.int64).astype(np.int32)
+        return cls(ticker, offsets, np.asarray(records['Close'], dtype=np.float32), unit, source=records)
+
+    @classmethod
+    def from_frame(cls, ticker, frame, unit=None):  # from a frame with a 'Date' column, as load_data() returns
+        records = {name: frame[name].to_numpy() for name in frame.columns}
+        records['Date'] = pd.to_datetime(frame['Date']).to_numpy(dtype='datetime64[s]')
+        return cls.from_records(ticker, records, unit)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, key):  # a field's array, or a slice of the bars as another PriceSeries, neither copied
+        if isinstance(key, slice):
+            fields = {name: values[key] for name, values in self._fields.items()}
+            source = self._source
+            if source is not None:
+                source = source[key] if not isinstance(source, dict) else {n: v[key] for n, v in source.items()}
+            return PriceSeries(self.ticker, self.offsets[key], self.close[key], self.unit, fields, source)
+        if key == 'Date':
+            return self.dates
+        if key == 'Close':
+            return self.close
+        values = self._fields.get(key)
+        if values is None:  # first time this field is asked for
+            if self._source is None or key not in self.fields:
+                raise KeyError(key)
+            values = self._fields[key] = np.asarray(self._source[key], dtype=FIELD_DTYPES.get(key, np.float32))
+        return values
+
+    @property
+    def dates(self):  # the bar times as datetime64, worked out from the offsets when asked for
+        return self.offsets.astype(f'datetime64[{self.unit}]')
+
+    @property
+    def fields(self):  # names of every price field the series can give, besides 'Date'
+        names = self._source.dtype.names if hasattr(self._source, 'dtype') else tuple(self._source or ())
+        return tuple(name for name in names if name != 'Date') or ('Close', *self._fields)
+
+    @property
+    def nbytes(self):  # memory the series holds itself, not counting the fields still in the memory map
+        return self.offsets.nbytes + self.close.nbytes + sum(values.nbytes for values in self._fields.values())
+
+    def to_numpy(self, field='Close'):  # the array of a field, shared rather than copied
+        return self[field]
+
+    def to_frame(self, fields=None):  # the frame load_data() returns, with only the chosen fields
+        fields = self.fields if fields is None else fields
+        frame = {'Date': self.dates.astype('datetime64[s]')}
+        frame.update((name, self[name].astype(FIELD_DTYPES.get(name, np.float64))) for name in fields)
+        return pd.DataFrame(frame)
+
+    def to_prophet_frame(self):  # the 'ds'/'y' frame the forecasters are trained on, by the app and the job alike
+        # the full float64 closes from the store, so the models and their cache keys don't depend on the float32 copy
+        close = self._source['Close'] if self._source is not None else self.close
+        return pd.DataFrame({'ds': self.dates.astype('datetime64[s]'), 'y': np.asarray(close, dtype=np.float64)})
+
+    def tail(self, n=5):  # the last few bars as a frame, for showing on a page
+        return self[len(self) - min(n, len(self)):].to_frame()
@@ -0,0 +1,314 @@
+import argparse  # used to read the options given on the command line when recording prices
+import json  # used to read and write the small metadata file kept next to each ticker
+import os  # used to build file paths and swap files in atomically
+import threading  # the store is written to from several download threads
+import zlib  # gives every ticker its own fixed seed for the synthetic prices
+from urllib.parse import quote  # turns tickers like '^FTSE' into safe file names
+
+import numpy as np  # the prices are kept on disk as memory-mapped NumPy arrays
+import pandas as pd  # the prices are handed back to the app as a DataFrame
+
+from price_series import PriceSeries  # compact form of the prices for keeping in memory
+from tracing import span, traced  # times the downloads for the performance panel
+
+PRICE_FIELDS = ('Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume')  # columns kept for every bar
+BAR_DTYPE = np.dtype([('Date', 'datetime64[s]'), ('Open', 'f8'), ('High', 'f8'), ('Low', 'f8'),
+                      ('Close', 'f8'), ('Adj Close', 'f8'), ('Volume', 'i8')])  # one row of the on-disk table
+CRYPTO_QUOTES = ('-USD', '-GBP', '-EUR')  # Yahoo's crypto tickers end in the currency they are priced in
+WRITE_ROWS = 1_000_000  # rows copied at a time when a file is written from another memory map
+DAILY = '1d'  # the interval the app has always used, stored under the plain ticker
+# Yahoo's intraday limits: (days per request, days of history it keeps)
+INTRADAY_LIMITS = {'1m': (7, 30), '2m': (60, 60), '5m': (60, 60), '15m': (60, 60), '30m': (60, 60), '1h': (730, 730)}
+_open_lock = threading.Lock()  # np.load parses each file's header with ast, which can fail when threads do it at once
+
+
+def series_key(ticker, interval=DAILY):  # the name a ticker's bars are stored under: 'AAPL', or 'AAPL@1m' for minutes
+    return ticker if interval == DAILY else f'{ticker}@{interval}'
+
+
+def split_key(key):  # 'AAPL@1m' -> ('AAPL', '1m'), 'AAPL' -> ('AAPL', '1d')
+    ticker, _, interval = key.partition('@')
+    return ticker, interval or DAILY
+
+
+# Providers
+
+class PriceProvider:  # interface every source of prices has to follow
+    def fetch(self, ticker, start, end, interval=DAILY):  # returns a frame with a 'Date' column for bars in [start, end)
+        raise NotImplementedError
+
+
+class YahooProvider(PriceProvider):  # the live provider used by the app
+    def _download(self, ticker, start, end, interval):
+        import yfinance as yf  # the library is used to get the prices, only loaded when something has to be downloaded
+        with span('yf.download'):
+            data = yf.download(ticker, start, end, interval=interval, progress=False, auto_adjust=False)  # downloads the prices
+        if isinstance(data.columns, pd.MultiIndex):  # newer yfinance versions add a ticker level
+            data.columns = data.columns.get_level_values(0)
+        data.reset_index(inplace=True)
+        return data.rename(columns={'Datetime': 'Date'})  # intraday prices come with a 'Datetime' column
+
+    def fetch(self, ticker, start, end, interval=DAILY):
+        if interval == DAILY:
+            return self._download(ticker, start, end, interval)  # returns the data
+        # intraday bars only go back so far and come a few days per request, times are kept in UTC
+        per_request, kept = INTRADAY_LIMITS[interval]
+        end = pd.Timestamp(end).tz_localize('UTC')
+        start = max(pd.Timestamp(start).tz_localize('UTC'), pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=kept - 1))
+        frames = []
+        while start < end:
+            stop = min(end, start + pd.Timedelta(days=per_request))
+            data = self._download(ticker, start, stop, interval)
+            if not data.empty:
+                data['Date'] = pd.to_datetime(data['Date'], utc=True)
+                frames.append(data)
+            start = stop
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+class FixtureProvider(PriceProvider):  # offline provider that serves prices from frames held in memory
+    def __init__(self, frames):
+        self.frames = frames  # dictionary of ticker (or 'ticker@interval') -> DataFrame with a 'Date' column
+        self.calls = []  # every (ticker, start, end) asked for, so tests can check what was fetched
+
+    def fetch(self, ticker, start, end, interval=DAILY):
+        self.calls.append((series_key(ticker, interval), start, end))
+        data = self.frames[series_key(ticker, interval)]
+        dates = pd.to_datetime(data['Date'])
+        mask = (dates >= pd.Timestamp(start)) & (dates < pd.Timestamp(end))  # only the bars asked for
+        return data[mask].reset_index(drop=True)
+
+
+class RecordedProvider(PriceProvider):  # offline provider that serves prices recorded to CSV files, one per ticker
+    def __init__(self, folder):
+        self.folder = folder  # holds <ticker>.csv files, e.g. '%5EFTSE.csv' for '^FTSE'
+        self.frames = {}  # files already read
+
+    def fetch(self, ticker, start, end, interval=DAILY):
+        key = series_key(ticker, interval)  # minute bars are recorded to '<ticker>%401m.csv'
+        if key not in self.frames:
+            path = os.path.join(self.folder, quote(key, safe='') + '.csv')
+            self.frames[key] = pd.read_csv(path, parse_dates=['Date']) if os.path.exists(path) else pd.DataFrame()
+        data = self.frames[key]
+        if data.empty:  # no recording for this ticker, like a download that found nothing
+            return data
+        mask = (data['Date'] >= pd.Timestamp(start)) & (data['Date'] < pd.Timestamp(end))  # only the bars asked for
+        return data[mask].reset_index(drop=True)
+
+
+class SyntheticProvider(PriceProvider):  # offline provider that makes up the same random-walk prices every time
+    def __init__(self, seed=0, first='2010-01-01', intraday_days=30):
+        self.seed = seed  # change it to get a different, but still repeatable, market
+        self.first = first  # the made-up history starts here
+        self.intraday_days = intraday_days  # like Yahoo, minute bars only go back this far
+
+    def history(self, ticker, end):  # every bar from 'first' up to 'end', the same for the same ticker and seed
+        freq = 'D' if ticker.endswith(CRYPTO_QUOTES) else 'B'  # crypto trades every day, everything else on weekdays
+        dates = pd.date_range(self.first, pd.Timestamp(end) - pd.Timedelta(days=1), freq=freq)
+        rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode())])
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, len(dates))))
+        open_ = close * np.exp(rng.normal(0, 0.005, len(dates)))
+        spread = np.abs(rng.normal(0, 0.01, len(dates)))
+        return pd.DataFrame({'Date': dates, 'Open': open_, 'High': np.maximum(open_, close) * (1 + spread),
+                             'Low': np.minimum(open_, close) * (1 - spread), 'Close': close, 'Adj Close': close,
+                             'Volume': rng.integers(1_000_000, 50_000_000, len(dates))})
+
+    def minutes(self, ticker, start, end):  # minute bars wandering from each day's open to its close, in UTC
+        end = pd.Timestamp(end)
+        start = max(pd.Timestamp(start), end.normalize() - pd.Timedelta(days=self.intraday_days))
+        days = self.history(ticker, end.normalize() + pd.Timedelta(days=1))
+        days = days[days['Date'] >= start.normalize()]
+        crypto = ticker.endswith(CRYPTO_QUOTES)
+        count, opens_at = (1440, 0) if crypto else (390, 14 * 60 + 30)  # all day, or 09:30-16:00 New York
+        frames = []
+        for day in days.itertuples():
+            rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode()), day.Date.toordinal()])
+            t = np.arange(1, count + 1) / count
+            walk = np.cumsum(rng.normal(0, 0.01 / np.sqrt(count), count))
+            close = day.Open * np.exp(np.log(day.Close / day.Open) * t + walk - t * walk[-1])  # ends at the day's close
+            open_ = np.append(day.Open, close[:-1])
+            spread = np.abs(rng.normal(0, 0.0005, count))
+            frames.append(pd.DataFrame({
+                'Date': day.Date + pd.to_timedelta(opens_at + np.arange(count), unit='min'), 'Open': open_,
+                'High': np.maximum(open_, close) * (1 + spread), 'Low': np.minimum(open_, close) * (1 - spread),
+                'Close': close, 'Adj Close': close, 'Volume': rng.integers(0, 2 * day.Volume // count + 1, count)}))
+        data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Date', *PRICE_FIELDS])
+        return data[(data['Date'] >= start) & (data['Date'] < end)].reset_index(drop=True)
+
+    def fetch(self, ticker, start, end, interval=DAILY):
+        if interval != DAILY:  # every intraday interval is made from the same minute bars
+            from resample import resample_frame  # only needed for the made-up intraday prices
+            return resample_frame(self.minutes(ticker, start, end), interval)
+        data = self.history(ticker, end)
+        return data[data['Date'] >= pd.Timestamp(start)].reset_index(drop=True)
+
+
+def make_provider(name):  # 'yahoo', 'synthetic' or 'recorded:<folder>', used to run the app and tests offline
+    if name == 'yahoo':
+        return YahooProvider()
+    if name == 'synthetic':
+        return SyntheticProvider()
+    if name.startswith('recorded:'):
+        return RecordedProvider(name.split(':', 1)[1])
+    raise ValueError(f'unknown price provider {name!r}')
+
+
+def record(provider, tickers, start, end, folder, interval=DAILY):  # saves each ticker's prices to <folder>/<ticker>.csv
+    os.makedirs(folder, exist_ok=True)
+    for ticker in tickers:
+        data = provider.fetch(ticker, start, end) if interval == DAILY else provider.fetch(ticker, start, end, interval)
+        if data.empty:
+            print(f'{ticker}: nothing to record')
+            continue
+        data = data[['Date', *[field for field in PRICE_FIELDS if field in data.columns]]]
+        path = os.path.join(folder, quote(series_key(ticker, interval), safe='') + '.csv')
+        data.to_csv(path, index=False, float_format='%.4f')
+        print(f'{ticker}: {len(data)} bars')
+
+
+# Conversion between frames and the on-disk table
+
+def _to_records(frame):  # converts a downloaded frame into rows of BAR_DTYPE
+    records = np.zeros(len(frame), dtype=BAR_DTYPE)
+    if frame.empty:  # nothing was downloaded, e.g. a weekend or a ticker Yahoo doesn't know
+        return records
+    dates = pd.to_datetime(frame['Date'])
+    if dates.dt.tz is not None:  # intraday prices come with a timezone, the store keeps naive times
+        dates = dates.dt.tz_localize(None)
+    records['Date'] = dates.to_numpy(dtype='datetime64[s]')
+    for field in PRICE_FIELDS:
+        if field in frame.columns:
+            records[field] = frame[field].to_numpy()
+        elif field == 'Adj Close':  # some sources only give the close price
+            records[field] = frame['Close'].to_numpy()
+    return records
+
+
+def _fetched_through(key, previous, end, received):  # how far the store holds every bar once 'received' is added
+    # yfinance gives back an empty frame rather than an error when a download fails, so days only count as fetched
+    # up to the last bar that came back, or when nothing between it and 'end' trades
+    ticker, interval = split_key(key)
+    if interval != DAILY:
+        if not len(received):
+            return previous
+        return str((received['Date'][-1] + np.timedelta64(1, 'm')).astype('datetime64[m]'))
+    after = received['Date'][-1].astype('datetime64[D]') + 1 if len(received) else np.datetime64(previous[:10], 'D')
+    last = np.datetime64(end[:10], 'D')
+    # crypto trades every day, everything else on weekdays (a holiday is simply asked for again)
+    trades = after < last if ticker.endswith(CRYPTO_QUOTES) else np.busday_count(after, last) > 0
+    return max(str(after), previous) if trades else end
+
+
+def _to_frame(records):  # converts rows of BAR_DTYPE back into the frame the app expects
+    return pd.DataFrame({name: np.asarray(records[name]) for name in BAR_DTYPE.names})
+
+
+# Store
+
+class PriceStore:  # keeps one memory-mapped file per ticker and only downloads the days it is missing
+    def __init__(self, root='price_store', provider=None):
+        self.root = root  # folder holding the files
+        self.provider = provider or YahooProvider()  # where missing prices come from
+        self.stats = {'hits': 0, 'misses': 0, 'bytes_fetched': 0}  # counters for how well the store is doing
+
+    def _path(self, ticker, suffix):  # file name for a ticker, e.g. price_store/%5EFTSE.npy or price_store/AAPL%401m.npy
+        return os.path.join(self.root, quote(ticker, safe='') + suffix)
+
+    def read_meta(self, ticker):  # the ticker's start and fetched_through, None if nothing is stored
+        try:
+            with open(self._path(ticker, '.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def read(self, ticker):  # memory-maps every bar stored for the ticker, empty if there are none
+        try:
+            with _open_lock:  # only opening is locked, reading the mapped prices is not
+                return np.load(self._path(ticker, '.npy'), mmap_mode='r')
+        except FileNotFoundError:
+            return np.zeros(0, dtype=BAR_DTYPE)
+
+    def write(self, ticker, records, meta, order=None):  # writes to a temporary file first so readers never see half a file
+        os.makedirs(self.root, exist_ok=True)
+        tmp = '.%d-%d.tmp' % (os.getpid(), threading.get_ident())  # unique per thread so parallel loads don't clash
+        path = self._path(ticker, '.npy')
+        if order is None:
+            np.save(path + tmp + '.npy', records)
+        else:  # records[order], e.g. from a memory map too big to hold, copied a slice at a time
+            out = np.lib.format.open_memmap(path + tmp + '.npy', mode='w+', dtype=BAR_DTYPE, shape=(len(order),))
+            for lo in range(0, len(order), WRITE_ROWS):
+                out[lo:lo + WRITE_ROWS] = records[order[lo:lo + WRITE_ROWS]]
+            out.flush()
+            del out
+        os.replace(path + tmp + '.npy', path)
+        with open(self._path(ticker, '.json' + tmp), 'w') as f:
+            json.dump(meta, f)
+        os.replace(self._path(ticker, '.json' + tmp), self._path(ticker, '.json'))
+
+    def _fetch(self, key, start, end):  # asks the provider and keeps count of what came over the network
+        ticker, interval = split_key(key)
+        frame = self.provider.fetch(ticker, start, end) if interval == DAILY else \
+            self.provider.fetch(ticker, start, end, interval=interval)
+        self.stats['bytes_fetched'] += int(frame.memory_usage(index=True, deep=True).sum())
+        return _to_records(frame)
+
+    def update(self, ticker, start, end):  # makes sure the store covers [start, end), returns True if it already did
+        meta = self.read_meta(ticker)
+        if meta is not None and meta['start'] <= start and meta['fetched_through'] >= end:
+            self.stats['hits'] += 1  # nothing new to download
+            return True
+
+        self.stats['misses'] += 1
+        if meta is None or meta['start'] > start:  # nothing stored yet, or an earlier start was asked for
+            records = new = self._fetch(ticker, start, end)
+            if not len(records):  # not stored, so the next load tries again rather than remembering nothing
+                raise ValueError(f'no prices found for {ticker}')
+            meta = {'start': start, 'fetched_through': start}
+        else:  # only download the days after the last time we fetched
+            stored = self.read(ticker)
+            since = meta['fetched_through']
+            intraday = split_key(ticker)[1] != DAILY
+            if intraday and len(stored):  # the last bar may have been fetched before it finished
+                since = str(stored['Date'][-1])[:16]
+            new = self._fetch(ticker, since, end)
+            if len(stored) and len(new):
+                if intraday:  # the bars fetched again replace the stored ones
+                    stored = stored[stored['Date'] < new['Date'][0]]
+                else:
+                    new = new[new['Date'] > stored['Date'][-1]]  # drops any bar we already have
+            records = np.concatenate([stored, new])
+        through = _fetched_through(ticker, meta['fetched_through'], end, new)
+        if not len(new) and through == meta['fetched_through']:
+            return False  # nothing came back for days that trade, so they are asked for again next time
+        meta['fetched_through'] = through
+        self.write(ticker, np.sort(records, order='Date'), meta)
+        return False
+
+    def _bars(self, ticker, start, end):  # the memory-mapped bars in [start, end), downloading only what is missing
+        self.update(ticker, start, end)
+        records = self.read(ticker)
+        dates = records['Date']
+        lo = np.searchsorted(dates, np.datetime64(start, 's'))
+        hi = np.searchsorted(dates, np.datetime64(end, 's'))
+        return records[lo:hi]
+
+    @traced('price_store.load')
+    def load(self, ticker, start, end):  # returns the bars in [start, end) as a DataFrame
+        return _to_frame(self._bars(ticker, start, end))
+
+    @traced('price_store.load_series')
+    def load_series(self, ticker, start, end):  # the same bars as a PriceSeries, other fields left in the memory map
+        return PriceSeries.from_records(ticker, self._bars(ticker, start, end))
+
+
+if __name__ == '__main__':  # python -m price_store AAPL NKE --out tests/fixtures/prices [--synthetic]
+    parser = argparse.ArgumentParser(description='Record prices to CSV files for running offline')
+    parser.add_argument('tickers', nargs='+')
+    parser.add_argument('--start', default='2015-01-01')
+    parser.add_argument('--end', default=pd.Timestamp.today().strftime('%Y-%m-%d'))
+    parser.add_argument('--out', default=os.path.join('tests', 'fixtures', 'prices'), help='folder to write to')
+    parser.add_argument('--synthetic', action='store_true', help='record made-up prices instead of downloading')
+    parser.add_argument('--interval', default=DAILY, help="bar size, e.g. '1m' for minute bars")
+    args = parser.parse_args()
+    record(SyntheticProvider() if args.synthetic else YahooProvider(), args.tickers, args.start, args.end, args.out,
+           args.interval)
@@ -0,0 +1,127 @@
+import os  # used to build the spill file's path and remove it once written
+import tempfile  # the rolled-up bars are spilled to a file inside the store while they are made
+
+import numpy as np  # the bars are grouped with NumPy's reduceat, a whole chunk at a time
+
+from price_store import BAR_DTYPE, series_key, _to_records, _to_frame
+
+# Rolls minute bars up into 5 minute, hourly or daily OHLCV bars. Each bar starts at a multiple of its length
+# since 1970-01-01 UTC, so an hourly bar covers 14:00-15:00 and a daily bar a UTC day. StreamingResampler takes the
+# minute bars a chunk at a time, as they are read or arrive, and keeps only the bar still being made between
+# chunks. rollup() uses it to keep '<ticker>@<rule>' files in the price store up to date with '<ticker>@1m',
+# only reading the minute bars added since the last time, so memory depends on the chunk size and not the history.
+
+RULES = {'1m': 60, '5m': 300, '15m': 900, '30m': 1800, '1h': 3600, '4h': 14400, '1d': 86400}  # seconds per bar
+CHUNK_ROWS = 1_000_000  # minute bars read from the store at a time
+
+
+def _seconds(rule):
+    try:
+        return RULES[rule]
+    except KeyError:
+        raise ValueError(f'unknown bar size {rule!r}, expected one of {", ".join(RULES)}') from None
+
+
+def resample(records, rule):  # rows of BAR_DTYPE, sorted by date, rolled up into bars of the rule's length
+    seconds = _seconds(rule)
+    dates = np.asarray(records['Date']).astype('datetime64[s]').astype(np.int64)
+    if not len(dates):
+        return np.zeros(0, dtype=BAR_DTYPE)
+    buckets = dates - dates % seconds  # the start of the bar each row falls in
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])  # first row of each bar
+    ends = np.r_[starts[1:], len(dates)] - 1  # last row of each bar
+    bars = np.zeros(len(starts), dtype=BAR_DTYPE)
+    bars['Date'] = buckets[starts].astype('datetime64[s]')
+    bars['Open'] = records['Open'][starts]
+    bars['High'] = np.maximum.reduceat(records['High'], starts)
+    bars['Low'] = np.minimum.reduceat(records['Low'], starts)
+    bars['Close'] = records['Close'][ends]
+    bars['Adj Close'] = records['Adj Close'][ends]
+    bars['Volume'] = np.add.reduceat(records['Volume'], starts)
+    return bars
+
+
+def resample_frame(frame, rule):  # the same for a frame with a 'Date' column, as the providers give
+    if frame.empty:
+        return frame
+    return _to_frame(resample(_to_records(frame), rule))
+
+
+class StreamingResampler:  # rolls bars up a chunk at a time, handing back each bar once it is complete
+    def __init__(self, rule):
+        self.rule = rule
+        self.seconds = _seconds(rule)
+        self.partial = None  # the bar still being made, as a one-row array
+        self.partial_rows = 0  # rows that went into it
+        self.stats = {'rows': 0, 'bars': 0, 'late': 0}  # rows taken, complete bars handed back, rows too late to use
+
+    def update(self, records):  # adds rows sorted by date, returns the bars they completed
+        records = np.asarray(records)
+        if self.partial is not None and len(records):
+            # a row from before the bar being made can't change a bar that was already handed back
+            late = np.searchsorted(records['Date'], self.partial['Date'][0])
+            self.stats['late'] += int(late)
+            records = records[late:]
+        self.stats['rows'] += len(records)
+        bars = resample(records, self.rule)
+        if not len(bars):
+            return bars
+        rows = len(records) - np.searchsorted(records['Date'], bars['Date'][-1])  # rows in the last bar
+        if self.partial is not None:
+            if bars['Date'][0] == self.partial['Date'][0]:  # the chunk carries on the bar being made
+                bars['Open'][0] = self.partial['Open'][0]
+                bars['High'][0] = max(bars['High'][0], self.partial['High'][0])
+                bars['Low'][0] = min(bars['Low'][0], self.partial['Low'][0])
+                bars['Volume'][0] += self.partial['Volume'][0]
+                if len(bars) == 1:
+                    rows += self.partial_rows
+            else:  # the chunk starts a new bar, so the one being made is complete
+                bars = np.concatenate([self.partial, bars])
+        self.partial, self.partial_rows = bars[-1:].copy(), int(rows)
+        done = bars[:-1]
+        self.stats['bars'] += len(done)
+        return done
+
+    def flush(self):  # the bar still being made, e.g. once there are no more rows, and starts again
+        bars = self.partial if self.partial is not None else np.zeros(0, dtype=BAR_DTYPE)
+        self.stats['bars'] += len(bars)
+        self.partial, self.partial_rows = None, 0
+        return bars
+
+
+def rollup(store, ticker, rule, source='1m', chunk_rows=CHUNK_ROWS):  # brings '<ticker>@<rule>' up to date, returns its bars
+    key, source_key = series_key(ticker, rule), series_key(ticker, source)
+    bars = store.read(source_key)  # memory-mapped, only the chunks being rolled up are read
+    source_meta = store.read_meta(source_key)
+    if source_meta is None:
+        raise ValueError(f'no {source} prices stored for {ticker}')
+    meta = store.read_meta(key)
+    used = meta['source_rows'] if meta else 0  # source rows already rolled into complete bars
+    # the complete bars are only kept if the source rows they came from are still there, unchanged in length
+    if not meta or used > len(bars) or (used and str(bars['Date'][used - 1]) != meta['source_last']):
+        meta, used = None, 0
+    elif meta['source_through'] == source_meta['fetched_through'] and meta['source_length'] == len(bars):
+        return store.read(key)  # nothing new since the last roll-up
+    complete = store.read(key)[:meta['complete']] if meta else np.zeros(0, dtype=BAR_DTYPE)
+
+    os.makedirs(store.root, exist_ok=True)
+    fd, spill = tempfile.mkstemp(prefix='.rollup-', suffix='.bars', dir=store.root)
+    try:
+        resampler = StreamingResampler(rule)
+        with os.fdopen(fd, 'wb') as f:  # the complete bars, then the new ones as they are made, then the last bar
+            for lo in range(0, len(complete), chunk_rows):
+                f.write(np.ascontiguousarray(complete[lo:lo + chunk_rows]).tobytes())
+            for lo in range(used, len(bars), chunk_rows):
+                f.write(resampler.update(bars[lo:lo + chunk_rows]).tobytes())
+            written = len(complete) + resampler.stats['bars']
+            used = len(bars) - resampler.partial_rows
+            f.write(resampler.flush().tobytes())  # the bar still being made is rolled up again next time
+        meta = {'start': source_meta['start'], 'fetched_through': source_meta['fetched_through'],
+                'source_through': source_meta['fetched_through'], 'source_length': len(bars), 'complete': written,
+                'source_rows': used, 'source_last': str(bars['Date'][used - 1]) if used else ''}
+        spilled = np.memmap(spill, dtype=BAR_DTYPE, mode='r') if os.path.getsize(spill) else np.zeros(0, BAR_DTYPE)
+        store.write(key, spilled, meta)  # copied from the memory map, not held in memory
+        del spilled
+    finally:
+        os.remove(spill)
+    return store.read(key)
@@ -0,0 +1,108 @@
+import argparse  # used to read the options given on the command line
+import random  # spreads the refreshes out a little so they don't all hit Yahoo at the same second
+import time  # used to time each refresh and to wait for the next one
+from datetime import datetime, timedelta, timezone  # used to work out when each market opens
+from datetime import time as clock_time  # opening times of the markets
+from zoneinfo import ZoneInfo  # each market opens in its own time zone
+
+from db import connect  # opens data.db set up for several readers
+from forecast_job import run_job  # trains the models and stores the forecasts the app reads
+from market_data import FORECAST_STOCKS, ANALYTICS_STOCKS, warm  # refreshes the on-disk price store
+from price_store import CRYPTO_QUOTES  # crypto tickers trade every day
+
+# when each market opens and on which days (0 = Monday), crypto trades all the time so it is refreshed after midnight
+MARKETS = {
+    'US': {'zone': ZoneInfo('America/New_York'), 'opens': clock_time(9, 30), 'days': range(0, 5)},
+    'LSE': {'zone': ZoneInfo('Europe/London'), 'opens': clock_time(8, 0), 'days': range(0, 5)},
+    'CRYPTO': {'zone': timezone.utc, 'opens': clock_time(0, 5), 'days': range(0, 7)},
+}
+LEAD = timedelta(minutes=30)  # how long before the open everything should be ready
+
+
+def market_for(ticker):  # which market's calendar a ticker follows
+    if ticker.endswith(CRYPTO_QUOTES):
+        return 'CRYPTO'
+    if ticker.startswith('^FT') or ticker.endswith('.L'):
+        return 'LSE'
+    return 'US'
+
+
+def next_refresh(market, now, lead=LEAD):  # the next time after 'now' to refresh a market (bank holidays aren't known)
+    calendar = MARKETS[market]
+    lead = timedelta(0) if market == 'CRYPTO' else lead  # crypto is refreshed once the day's bar has closed
+    local = now.astimezone(calendar['zone'])
+    for days_ahead in range(8):
+        day = local.date() + timedelta(days=days_ahead)
+        if day.weekday() not in calendar['days']:
+            continue
+        due = datetime.combine(day, calendar['opens'], tzinfo=calendar['zone']) - lead
+        if due > now:
+            return due.astimezone(timezone.utc)
+    raise ValueError(f'{market} has no trading days')
+
+
+# DB Functions
+
+def create_schedulertable(c):  # function creates a table for the run metrics if it doesn't exist
+    c.execute('CREATE TABLE IF NOT EXISTS schedulerruns(started TEXT NOT NULL, market TEXT NOT NULL, '
+              'tickers INTEGER NOT NULL, prices_failed TEXT, forecasts_failed TEXT, seconds REAL NOT NULL)')
+
+
+def record_run(conn, started, market, tickers, prices_failed, forecasts_failed, seconds):  # saves one run's metrics
+    c = conn.cursor()
+    create_schedulertable(c)
+    c.execute('INSERT INTO schedulerruns(started,market,tickers,prices_failed,forecasts_failed,seconds) '
+              'VALUES (?,?,?,?,?,?)', (started.isoformat(timespec='seconds'), market, len(tickers),
+                                       ','.join(prices_failed), ','.join(forecasts_failed), seconds))
+    conn.commit()
+
+
+# Scheduler
+
+def refresh(market, tickers, forecast_tickers, conn, workers=4):  # brings a market's prices and forecasts up to date
+    started = datetime.now(timezone.utc)
+    began = time.perf_counter()
+    prices_failed = sorted(warm(tickers, workers=workers))  # every price is downloaded side by side
+    forecasts_failed = run_job([t for t in forecast_tickers if t not in prices_failed], conn, workers) \
+        if forecast_tickers else []
+    seconds = time.perf_counter() - began
+    record_run(conn, started, market, tickers, prices_failed, forecasts_failed, seconds)
+    print(f'{started:%Y-%m-%d %H:%M} {market}: {len(tickers)} tickers in {seconds:.1f}s, '
+          f'failed prices {prices_failed or "none"}, failed forecasts {forecasts_failed or "none"}')
+    return prices_failed, forecasts_failed
+
+
+def group_by_market(tickers):  # dictionary of market -> its tickers
+    markets = {}
+    for ticker in dict.fromkeys(tickers):
+        markets.setdefault(market_for(ticker), []).append(ticker)
+    return markets
+
+
+def run(tickers, forecast_tickers, conn, workers=4, jitter=60, lead=LEAD, once=False):  # refreshes each market before it opens
+    markets = group_by_market(tickers)
+    forecasts = set(forecast_tickers)
+    if once:  # refresh everything straight away, e.g. from cron
+        for market, members in markets.items():
+            refresh(market, members, [t for t in members if t in forecasts], conn, workers)
+        return
+    while True:
+        now = datetime.now(timezone.utc)
+        due = {market: next_refresh(market, now, lead) for market in markets}
+        market = min(due, key=due.get)
+        wait = (due[market] - now).total_seconds() + random.uniform(0, jitter)
+        print(f'next refresh: {market} at {due[market]:%Y-%m-%d %H:%M} UTC')
+        time.sleep(max(0, wait))
+        members = markets[market]
+        refresh(market, members, [t for t in members if t in forecasts], conn, workers)
+
+
+if __name__ == '__main__':  # python -m scheduler [--once] [--workers N] [--jitter SECONDS] [--lead MINUTES]
+    parser = argparse.ArgumentParser(description='Refresh prices and forecasts before each market opens')
+    parser.add_argument('--once', action='store_true', help='refresh every market now and exit')
+    parser.add_argument('--workers', type=int, default=4, help='downloads and fits run at the same time')
+    parser.add_argument('--jitter', type=float, default=60, help='up to this many seconds of random delay')
+    parser.add_argument('--lead', type=int, default=30, help='minutes before the open to refresh')
+    args = parser.parse_args()
+    run(FORECAST_STOCKS + ANALYTICS_STOCKS, FORECAST_STOCKS, connect(), args.workers, args.jitter,
+        timedelta(minutes=args.lead), args.once)
@@ -0,0 +1,81 @@
+import asyncio  # the API waits on shared work without blocking its event loop
+import threading  # Streamlit runs every session on its own thread
+
+# When many sessions ask for the same prices or the same model at once, only the first does the work and the
+# rest wait for its result, so ten users opening AAPL at the open cost one download and one fit rather than ten
+
+
+class _Call:  # one piece of work in progress, and everyone waiting on it
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:  # runs work once per key at a time, sharing the result with callers who ask while it runs
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}  # key -> _Call still running
+        self.stats = {'calls': 0, 'executed': 0, 'coalesced': 0, 'errors': 0}  # counters shown in the debug sidebar
+
+    def do(self, key, function, *args, **kwargs):  # function(*args, **kwargs), or the result of the same call already running
+        with self.lock:
+            self.stats['calls'] += 1
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                self.stats['executed'] += 1
+            else:  # someone is already working this out, wait for them
+                self.stats['coalesced'] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function(*args, **kwargs)
+            return call.result
+        except BaseException as error:  # the waiting callers get the same error
+            call.error = error
+            with self.lock:
+                self.stats['errors'] += 1
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]  # later callers start afresh, the result is for caches to keep
+            call.done.set()
+
+    def summary(self):  # counters plus the number of keys being worked out right now
+        with self.lock:
+            return dict(self.stats, in_flight=len(self.calls))
+
+
+class AsyncSingleFlight:  # the same for coroutines sharing one event loop
+    def __init__(self):
+        self.calls = {}  # key -> task still running
+        self.stats = {'calls': 0, 'executed': 0, 'coalesced': 0, 'errors': 0}
+
+    async def do(self, key, make):  # awaits make(), or the same call already running
+        self.stats['calls'] += 1
+        task = self.calls.get(key)
+        if task is not None:
+            self.stats['coalesced'] += 1
+        else:
+            task = self.calls[key] = asyncio.ensure_future(make())
+            self.stats['executed'] += 1
+            task.add_done_callback(lambda finished: self._finish(key, finished))
+        return await asyncio.shield(task)  # one caller going away doesn't cancel the work for the rest
+
+    def _finish(self, key, task):
+        del self.calls[key]
+        if task.cancelled() or task.exception() is not None:
+            self.stats['errors'] += 1
+
+    def summary(self):
+        return dict(self.stats, in_flight=len(self.calls))
+
+
+flights = SingleFlight()  # shared by every session, for loading prices and fitting models
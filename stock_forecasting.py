@@ -1,161 +1,269 @@
 import streamlit as st  # the library used to display all the pages
-from datetime import date  # the library allows dates to be used
 import pandas as pd  # imports the library pandas to allow for graphs to be drawn
-import webbrowser  # imports the library webbrowser to allow web-based documents to be displayed
+import sys  # used to check which optional libraries have been loaded
+from itertools import combinations  # every pair of the chosen stocks / crypto
+import numpy as np  # used to order the pairs by how strongly they move together
+from uuid import uuid4  # gives each browser session an id for its timings
+
+from auth import make_hashes, check_hashes, hash_password, authenticate, is_admin  # hashes the passwords for added security
+from db import PAGE_SIZE, get_connection, create_usertable, insert_user, login_user, view_all_users, \
+    get_users_page, count_users  # talks to the database
+from market_data import FORECAST_STOCKS, ANALYTICS_STOCKS, GRANULARITIES, load_data, load_series, load_many  # loads prices through the shared on-disk store
+from resample import RULES  # seconds in each bar size
+from forecasters import FORECASTERS, fit_forecaster, plot_forecast, stored_forecaster  # Prophet or the fast NumPy model
+from forecast_job import read_forecast  # forecasts worked out in advance by the batch job
+from downsample import thin, downsample_figure, points_for_range  # keeps charts to the number of points the screen can show
+from memo import figures, figure_payload, data_version  # keeps rendered charts between reruns
+from indicators import INDICATORS, IndicatorEngine, latest, rolling_beta_corr  # returns, volatility, RSI... at once
+from correlation import compare, pair_returns  # correlation of every pair of tickers
+from tracing import tracer, span, traced, set_session  # times every stage for the performance panel
+from singleflight import flights  # counts the loads and fits shared between sessions
+import market_data  # gives the debug sidebar the price store's statistics
+
+# plotly, yfinance and Prophet are slow to import, so they are only loaded once a page that uses them is opened
 
-import yfinance as yf  # the library is used to get the prices
-from fbprophet import Prophet  # the library is used to produce the forecasted data
-from fbprophet.plot import plot_plotly  # the library is used to plot the graph
-from plotly import graph_objs as go  # the library is used to plot the graph
-
-import sqlite3  # imports the library sqlite3 for communicating with the database
-import hashlib  # imports the library hashlib to hash the passwords for added security
 
 def stock_forecast():  # for the sake of modularity, all forecasing function is under one function
-
-    START = "2015-01-01"  # start date is set as most stocks started thereabouts
-    TODAY = date.today().strftime("%Y-%m-%d")  # end date is today's date
+    from plotly import graph_objs as go  # the library is used to plot the graph
+    from plotly import io as pio  # turns cached charts back into figures
 
     st.title('Stock Market Prediction App')  # clear title
 
-    stocks = ('AAPL', 'NKE')  # stocks / crypto that can be selected
+    stocks = FORECAST_STOCKS  # stocks / crypto that can be selected
     selected_stock = st.selectbox('Select dataset for predicition', stocks)  # drop-down menu
-    n_years = st.slider('Years of prediction:', 1, 5)  # slider for numbers of years to predicit
-    period = n_years * 365  # sets the number of days in a year
-
-    def load_data(ticker):  # function to load the data
-        data = yf.download(ticker, START, TODAY)  # downloads/caches the prices
-        data.reset_index(inplace=True)
-        return data  # returns the data
+    granularity = st.selectbox('Granularity', GRANULARITIES)  # daily bars, or hourly / minute bars for recent weeks
+    if granularity == '1d':
+        n_years = st.slider('Years of prediction:', 1, 5)  # slider for numbers of years to predicit
+        period, freq, horizon = n_years * 365, 'D', f'{n_years} years'  # sets the number of days in a year
+    else:
+        n_days = st.slider('Days of prediction:', 1, 5)  # intraday bars are only kept for a few weeks
+        period, freq, horizon = n_days * 86400 // RULES[granularity], f'{RULES[granularity]}s', f'{n_days} days'
+    mode = st.radio('Forecasting mode:', list(FORECASTERS))  # 'Fast' gives a quick view without Prophet
 
     data_load_state = st.text('Loading data...')  # informs user the data is being loaded
-    data = load_data(selected_stock)  # loads the data
+    with span('forecast.load_data'):
+        data = load_series(selected_stock, granularity)  # loads the data, kept as compact arrays
     data_load_state.text('Loading data... done!')  # informs user the data is loaded
+    version = data_version(data)  # changes when new prices arrive, so cached charts are never out of date
 
     st.subheader('Raw data')  # clear sub-title
     st.write(data.tail())  # displays the last few records / prices
+    first, last = (pd.Timestamp(data['Date'][i]).to_pydatetime() for i in (0, -1))
+    start, end = st.slider('Dates shown', first, last, (first, last),
+                           format='YYYY-MM-DD' if granularity == '1d' else 'YYYY-MM-DD HH:mm')  # the chart's visible range
 
     # Plot raw data
+    @traced('forecast.plot_raw')
     def plot_raw_data():  # function to plot the data
         fig = go.Figure()  # sets the area for the graph
         # plots the open and close prices of the stock / crypto
-        fig.add_trace(go.Scatter(x=data['Date'], y=data['Open'], name="stock_open"))
-        fig.add_trace(go.Scatter(x=data['Date'], y=data['Close'], name="stock_close"))
+        # only the points that can be seen in the dates shown are sent, each bucket's low and high so spikes stay,
+        # drawn with WebGL so long histories stay quick
+        points = points_for_range(data['Date'], start, end)
+        x, y = thin(data['Date'], data['Open'], points, spikes=True)
+        fig.add_trace(go.Scattergl(x=x, y=y, name="stock_open"))
+        x, y = thin(data['Date'], data['Close'], points, spikes=True)
+        fig.add_trace(go.Scattergl(x=x, y=y, name="stock_close"))
         # gives functionality to the zoom function
-        fig.layout.update(title_text='Time Series data with Rangeslider', xaxis_rangeslider_visible=True)
-        st.plotly_chart(fig, use_container_width=True)  # plots with auto adjusting to the width
-
-    plot_raw_data()  # calls the function to plot the graph
-
-    # Predict forecast with Prophet.
-    df_train = data[['Date', 'Close']]  # gets the data for closed price and date respectively
-    df_train = df_train.rename(columns={"Date": "ds", "Close": "y"})
-
-    m = Prophet()  # calls the forecasting library
-    m.fit(df_train)  # trains the algorithm with previous data
-    future = m.make_future_dataframe(periods=period)  # forecasting the data
-    forecast = m.predict(future)  # forecasting using the data
+        fig.layout.update(title_text='Time Series data with Rangeslider', xaxis_rangeslider_visible=True,
+                          xaxis_range=[start, end])
+        return figure_payload(fig)  # kept as JSON so it can be cached
+
+    # the chart is only drawn again when the prices change, plots with auto adjusting to the width
+    st.plotly_chart(pio.from_json(figures.get_or_set(('raw', selected_stock, granularity, version, start, end), plot_raw_data)),
+                    use_container_width=True)
+
+    # Predict forecast with the chosen model.
+    @traced('forecast.predict_and_plot')
+    def predict():  # trains, forecasts and draws the charts, only run when nothing is cached for these inputs
+        df_train = data.to_prophet_frame()  # gets the data for closed price and date respectively, as 'ds' and 'y'
+
+        forecast = None
+        if mode == 'Prophet' and granularity == '1d':  # only daily Prophet forecasts are worked out in advance
+            with span('forecast.read_forecast'):
+                forecast = read_forecast(get_connection(), selected_stock, period, data['Date'][-1])  # made earlier by forecast_job.py
+        if forecast is not None:  # the charts are drawn from the job's model, nothing is trained
+            m = stored_forecaster(selected_stock, df_train)
+        else:  # no up-to-date forecast has been saved, so work it out now
+            with span('forecast.fit'):
+                m = fit_forecaster(mode, selected_stock, df_train)  # trains the algorithm, or reuses the model if the prices haven't changed
+            future = m.make_future_dataframe(periods=period, freq=freq)  # forecasting the data
+            with span('forecast.predict'):
+                forecast = m.predict(future)  # forecasting using the data
+
+        with span('forecast.plot_forecast'):
+            fig1 = figure_payload(downsample_figure(plot_forecast(m, forecast)))  # plots the forecasted data, thinned to what the chart can show
+        with span('forecast.plot_components'):
+            fig2 = figure_payload(m.plot_components(forecast))  # plots the trends and patterns to fig2
+        return {'tail': forecast.tail(), 'plot': fig1, 'components': fig2}
+
+    result = figures.get_or_set(('forecast', selected_stock, granularity, period, mode, version), predict)
 
     # Show and plot forecast
     st.subheader('Forecast data')  # clear sub-title
-    st.write(forecast.tail())  # displays last few records / prices
+    st.write(result['tail'])  # displays last few records / prices
 
-    st.write(f'Forecast plot for {n_years} years')  # clear sub-title
-    fig1 = plot_plotly(m, forecast)  # plots the forecasted data
-    st.plotly_chart(fig1, use_container_width=True)  # plots with auto adjusting to the width
+    st.write(f'Forecast plot for {horizon}')  # clear sub-title
+    st.plotly_chart(pio.from_json(result['plot']), use_container_width=True)  # plots with auto adjusting to the width
 
     st.write("Forecast components")  # clear sub-title
-    fig2 = m.plot_components(forecast)  # plots the trends and patterns to fig2
-    st.write(fig2)
-
-
-# Security
-
-def make_hashes(password):  # function to hash passwords from new user pages
-    return hashlib.sha256(str.encode(password)).hexdigest()
-
+    if isinstance(result['components'], bytes):  # Prophet draws its components as an image
+        st.image(result['components'])
+    else:
+        st.plotly_chart(pio.from_json(result['components']), use_container_width=True)
 
-def check_hashes(password, hashed_text):  # function to check whether the hashed passwords match with the database
-    if make_hashes(password) == hashed_text:
-        return hashed_text
-    return False
-
-
-# DB Management
-
-conn = sqlite3.connect('data.db')  # establishes a connection with the correct database
-c = conn.cursor()  # allows changes to be directed through the web app and its interactive features
+    if st.sidebar.checkbox('Show cache statistics'):  # debug view of how often the caches save work
+        st.sidebar.write('Charts', figures.summary())
+        st.sidebar.write('Prices', market_data.price_store.stats)
+        st.sidebar.write('Shared loads and fits', flights.summary())
+        if 'model_cache' in sys.modules:  # only once a Prophet model has been used
+            st.sidebar.write('Models', sys.modules['model_cache'].models.stats)
 
 
 # DB Functions
 
-def create_usertable():  # function creates a table for database if it doesn't exist
-    c.execute(
-        'CREATE TABLE IF NOT EXISTS userstable(username TEXT NOT NULL UNIQUE,password TEXT NOT NULL UNIQUE, name TEXT NOT NULL UNIQUE)')
-
-
-def add_userdata(username, password, name):  # function to add new user details to database
-    users = view_all_users()  # gets the list of the users
-    for i in range(0, len(users)):  # searches through the list of users
-        if username == " " or password == " " or name == " " or len(username) == 0 or len(password) == 0 or len(
-                name) == 0:  # validation
-            st.warning("Not a valid input")  # displays error message
-        elif username == users[i][0]:  # if the user already exists then do the following
-            st.warning("User already exists")  # displays an error to the user
-        else:
-            c.execute('INSERT INTO userstable(username,password,name) VALUES (?,?,?)',
-                      (username, password, make_hashes(name)))  # add the user to the table if requirements are met
-            st.success(
-                "You have successfully created a valid Account")  # message to inform new account created successfully
-            st.info("Go to Login Menu to login")  # instruction to where to go next
-
+def add_userdata(username, password, name, conn=None, c=None):  # function to add new user details to database
+    conn = conn or get_connection()  # this session's connection unless one is given (e.g. by the tests)
+    c = c or conn.cursor()
+    if username == " " or password == " " or name == " " or len(username) == 0 or len(password) == 0 or len(
+            name) == 0:  # validation
+        st.warning("Not a valid input")  # displays error message
+        return False
+    created = insert_user(username, hash_password(password), name, c)  # add the user to the table if requirements are met
     conn.commit()  # executes the instructions above through connection with database
-
-
-def login_user(username, password):  # function to login the user to their respective account
-    c.execute('SELECT * FROM userstable WHERE username =? AND password = ?', (username, password))
-    data = c.fetchall()
-    return data
-
-
-def view_all_users():  # function used to get all records in the database
-    c.execute('SELECT * FROM userstable')
-    data = c.fetchall()
-    return data
+    if created:
+        st.success(
+            "You have successfully created a valid Account")  # message to inform new account created successfully
+        st.info("Go to Login Menu to login")  # instruction to where to go next
+    else:  # if the user already exists then do the following
+        st.warning("User already exists")  # displays an error to the user
+    return created
 
 
 def analytics():  # function to display analysis section
+    from plotly import graph_objs as go  # the library is used to plot the graph
 
-    START = "2015-01-01"  # start data is set
-    TODAY = date.today().strftime("%Y-%m-%d")  # today's date is set
-
-    stocks = ('GOOG', 'AAPL', 'MSFT', 'GME', 'BTC-GBP', '^FTSE', '^FTMC', 'WMT')  # stock / crypto to choose
-    selected_stock1 = st.selectbox('Select dataset 1', stocks)  # first stock / crypto is chosen
-    selected_stock2 = st.selectbox('Select dataset 2', stocks)  # second stock / crypto is chosen
-
-    def load_data(ticker):  # function to load the data
-        data = yf.download(ticker, START, TODAY)  # downloads/caches the prices
-        data.reset_index(inplace=True)
-        return data  # returns the data
+    stocks = ANALYTICS_STOCKS  # stock / crypto to choose
+    chosen = st.multiselect('Select datasets', stocks, default=list(stocks[:2]))  # stocks / crypto to compare
+    granularity = st.selectbox('Granularity', GRANULARITIES)  # bar size of the raw price chart
 
     data_load_state = st.text('Loading data...')  # informs user the data is being loaded
-    data1 = load_data(selected_stock1)  # data for first stock / crypto is loaded
-    data2 = load_data(selected_stock2)  # data for second stock / crypto is loaded
+    with span('analytics.load_many'):
+        prices, errors = load_many(stocks, ['Open', 'Close'])  # every stock / crypto is loaded together in one go
     data_load_state.text('Loading data... done!')  # informs user the data is loaded
+    for ticker, error in errors.items():  # tells the user about any stock / crypto that could not be loaded
+        st.warning(f"Could not load {ticker}: {error}")
+    if prices.empty:  # nothing could be loaded, so there is nothing to show
+        return
+    opens = prices.xs('Open', axis=1, level=1)  # one column of opening prices per ticker
+    closes = prices.xs('Close', axis=1, level=1)  # one column of closing prices per ticker
+    selected = [ticker for ticker in chosen if ticker in opens.columns]  # the chosen ones that could be loaded
 
     # Plot raw data
+    @traced('analytics.plot_raw')
     def plot_raw_data():
+        raw = opens[selected]
+        if granularity != '1d':  # only the chosen ones are loaded at the finer bar size
+            raw, failed = load_many(selected, 'Open', interval=granularity)
+            for ticker, error in failed.items():
+                st.warning(f"Could not load {granularity} bars for {ticker}: {error}")
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=data1['Date'], y=data1['Open'], name=selected_stock1))
-        fig.add_trace(go.Scatter(x=data2['Date'], y=data2['Open'], name=selected_stock2))
+        for ticker in raw.columns:
+            x, y = thin(raw.index, raw[ticker], spikes=True)  # drops the days it didn't trade and thins the rest
+            fig.add_trace(go.Scattergl(x=x, y=y, name=ticker))
         fig.layout.update(title_text='Time Series data with Rangeslider', xaxis_rangeslider_visible=True)
         st.plotly_chart(fig, use_container_width=True)
 
     plot_raw_data()
 
+    # Indicators for every stock / crypto, worked out once per new day of prices
+    st.subheader('Indicators')
+    indicator = st.selectbox('Indicator', list(INDICATORS))  # indicator to plot for the chosen stocks / crypto
+    version = (tuple(closes.columns), str(closes.index[-1]), int(closes.count().sum()))  # changes with new prices
+    results = figures.get_or_set(('indicators', version),
+                                 lambda: traced('analytics.indicators')(IndicatorEngine().compute)(closes))
+    values = results[INDICATORS[indicator]]
+    fig = go.Figure()
+    for ticker in selected:
+        x, y = thin(values.index, values[ticker])
+        fig.add_trace(go.Scattergl(x=x, y=y, name=ticker))
+    fig.layout.update(title_text=indicator, xaxis_rangeslider_visible=True)
+    st.plotly_chart(fig, use_container_width=True)
+    st.write('Latest values')
+    st.dataframe(latest(results).rename(columns={key: name for name, key in INDICATORS.items()}))
+
+    # Correlation of every pair of the chosen stocks / crypto, each pair on the days both traded
+    st.subheader('Correlation')
+    if len(selected) < 2:
+        st.info('Select at least two datasets to compare them.')
+        return
+    k = st.slider('Pairs to list', 1, 20, 5)  # how many of the most and least correlated pairs to show
+    comparison = figures.get_or_set(('correlation', version, tuple(selected), k),
+                                    lambda: traced('analytics.correlation')(compare)(closes[selected], k=k))
+    matrix = comparison.matrix
+    fig = go.Figure(go.Heatmap(z=matrix.to_numpy(), x=list(matrix.columns), y=list(matrix.index),
+                               zmin=-1, zmax=1, colorscale='RdBu'))
+    fig.layout.update(title_text='Correlation of daily returns', yaxis_autorange='reversed')
+    st.plotly_chart(fig, use_container_width=True)
+    most_column, least_column = st.columns(2)
+    most_column.write('Most correlated')
+    most_column.dataframe(comparison.most)
+    least_column.write('Least correlated')
+    least_column.dataframe(comparison.least)
+
+    # Drill down into one pair
+    pairs = sorted(combinations(selected, 2), key=lambda pair: -abs(np.nan_to_num(matrix.loc[pair])))
+    first, second = st.selectbox('Pair', pairs, format_func=lambda pair: f'{pair[0]} / {pair[1]}')
+    with span('analytics.pair'):
+        daily = pair_returns(closes, first, second)
+        _, rolling = rolling_beta_corr(daily[[first]], daily[second])
+    st.write(f'Correlation {matrix.loc[first, second]:.2f} over {len(daily)} days both traded')
+    fig = go.Figure(go.Scattergl(x=rolling.index, y=rolling[first], name='63-day correlation'))
+    fig.layout.update(title_text=f'Rolling correlation of {first} and {second}')
+    st.plotly_chart(fig, use_container_width=True)
+    fig = go.Figure(go.Scattergl(x=daily[first], y=daily[second], mode='markers', marker_size=3))
+    fig.layout.update(title_text='Daily returns', xaxis_title=first, yaxis_title=second)
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def view_profiles():  # function to display the user profiles a page at a time
+    prefix = st.text_input("Search by username")  # only usernames starting with this are shown
+    if st.session_state.get("profile_prefix") != prefix:  # a new search starts again from the first page
+        st.session_state["profile_prefix"] = prefix
+        st.session_state["profile_pages"] = [""]
+    pages = st.session_state["profile_pages"]  # the username each page starts after
+
+    user_result = get_users_page(pages[-1], PAGE_SIZE, prefix)  # get this page's usernames, hashed passwords and names
+    total = count_users(prefix)
+    clean_db = pd.DataFrame(user_result, columns=["Username", "Password", "Name"])  # creating table
+    st.dataframe(clean_db)  # inserting the details into the table
+    st.write(f"Page {len(pages)} of {max(1, -(-total // PAGE_SIZE))} ({total} users)")
+
+    previous_page, next_page = st.columns(2)
+    if previous_page.button("Previous", disabled=len(pages) == 1):  # goes back to the page before
+        pages.pop()
+        st.rerun()
+    if next_page.button("Next", disabled=len(pages) * PAGE_SIZE >= total):  # carries on after the last user shown
+        pages.append(user_result[-1][0])
+        st.rerun()
+
+
+def performance_panel():  # admin-only sidebar view of where the time went, per stage and for this session
+    with st.sidebar.expander("Performance"):
+        stages = pd.DataFrame(tracer.summary(), columns=['stage', 'calls', 'total_ms', 'p50_ms', 'p95_ms', 'p99_ms'])
+        st.dataframe(stages.set_index('stage').round(1))  # slowest stages in total first
+        st.write("This session")
+        spans = pd.DataFrame(tracer.session_spans(st.session_state['trace_session']),
+                             columns=['name', 'parent', 'started', 'seconds'])
+        spans['ms'] = (spans.pop('seconds') * 1000).round(1)
+        st.dataframe(spans.drop(columns='started').tail(20).iloc[::-1])  # newest first
+        if st.button("Reset timings"):
+            tracer.reset()
+
 
 def main():
     st.set_page_config(layout="wide")  # automatically adjusts to the width of the screen
+    set_session(st.session_state.setdefault('trace_session', uuid4().hex[:8]))  # timings are kept per session
     st.title("STOCK FORECASTING")  # sub-title given to the page when selected from drop-down menu
 
     menu = ["Home", "Login", "Sign Up"]  # options that will be available in drop-down menu
@@ -179,30 +287,26 @@ def main():
 
         if st.sidebar.checkbox("Login"):  # if the login button is pressed
             create_usertable()  # calls the module to create a table
-            hashed_pswd = make_hashes(password)  # hashes the password
 
-            result = login_user(username,
-                                check_hashes(password, hashed_pswd))  # gets all inputs under one variable name
+            result = authenticate(username, password)  # checks the password against the stored salted hash
             if result:  # if login details match, then do the following
-                users = view_all_users()
-                for i in range(0, len(users)):
-                    if users[i][0] == username:
-                        st.success("Logged In as {}".format(
-                            users[i][2]))  # displays personalised message to inform they have successfully logged in
+                st.success("Logged In as {}".format(
+                    result[2]))  # displays personalised message to inform they have successfully logged in
                 task = st.selectbox("Task", ["Stock Prediction App", "Analytics",
                                              "Profiles"])  # the tasks drop-down menu displays after logging in
-                if task == "Stock Prediction App":  # if 'Stock Predicition App' is selected, do the following
-                    stock_forecast()  # run the module to display the stock forecasting app
-
-                elif task == "Analytics":  # if 'Analytics' is chosen, do the follwoing
-                    st.subheader("Analytics")  # clear sub-title
-                    analytics()
-
-                elif task == "Profiles":  # if 'Profiles' is chosen, do the follwoing
-                    st.subheader("User Profiles")  # clear sub-title
-                    user_result = view_all_users()  # get all the users' username, hashed passwords and names
-                    clean_db = pd.DataFrame(user_result, columns=["Username", "Password", "Name"])  # creating table
-                    st.dataframe(clean_db)  # inserting the details into the table
+                with span('page.' + task):  # the whole page, the stages inside it are timed too
+                    if task == "Stock Prediction App":  # if 'Stock Predicition App' is selected, do the following
+                        stock_forecast()  # run the module to display the stock forecasting app
+
+                    elif task == "Analytics":  # if 'Analytics' is chosen, do the follwoing
+                        st.subheader("Analytics")  # clear sub-title
+                        analytics()
+
+                    elif task == "Profiles":  # if 'Profiles' is chosen, do the follwoing
+                        st.subheader("User Profiles")  # clear sub-title
+                        view_profiles()  # shows the users one page at a time
+                if is_admin(result[0]):  # only admins see the timings
+                    performance_panel()
             else:
                 st.warning(
                     "Incorrect Username/Password")  # if username and password don't match/exist, an error message is displayed
@@ -218,4 +322,5 @@ def main():
             add_userdata(new_user, new_password, name)  # adding a new user to the table is run
 
 
-main()  # running the program
+if __name__ == '__main__':  # streamlit runs this file as the main script, importing it (e.g. from the tests) doesn't
+    main()  # running the program
@@ -0,0 +1,72 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+import market_data
+import model_cache
+from price_store import PriceStore, RecordedProvider
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "prices")  # recorded prices for AAPL, NKE, BTC-GBP, ^FTSE
+
+
+def make_prices(start="2015-01-01", periods=30, freq="D", close=None, tickers=None):  # prices made up for a test
+    # one OHLCV frame with a Date column, or with tickers a wide frame of closes, one column each; the close
+    # counts up from 0 unless given
+    dates = pd.date_range(start, periods=periods, freq=freq)
+    close = np.arange(periods) if close is None else close
+    if tickers is not None:
+        return pd.DataFrame(close, index=dates, columns=list(tickers))
+    return pd.DataFrame({"Date": dates, "Open": close, "High": close, "Low": close, "Close": close, "Adj Close": close,
+                         "Volume": np.arange(periods)})
+
+
+@pytest.fixture
+def recorded_prices(monkeypatch, tmp_path):  # the app's price store, reading recorded files instead of Yahoo
+    store = PriceStore(str(tmp_path / "price_store"), RecordedProvider(FIXTURES))
+    monkeypatch.setattr(market_data, "price_store", store)
+    return store
+
+
+class FakeProphet:  # stands in for Prophet so the code around it is tested without fitting anything
+    fitted = []  # every model fitted while the fake_prophet fixture is in use
+
+    def __init__(self, **config):
+        self.config = config
+        self.params = None
+        self.init = None  # the starting values it was fitted from, if warm
+
+    def fit(self, df, init=None):
+        self.init = init
+        self.params = {"k": [[0.1]], "m": [[float(df["y"].mean())]], "sigma_obs": [[1.0]], "delta": [[0.0, 0.0]],
+                       "beta": [[0.0]]}
+        FakeProphet.fitted.append(self)
+        return self
+
+    def predict(self, future):  # a flat forecast at the mean of the prices it was fitted on
+        yhat = np.full(len(future), self.params["m"][0][0])
+        return pd.DataFrame({"ds": future["ds"].to_numpy(), "yhat": yhat, "yhat_lower": yhat - 1, "yhat_upper": yhat + 1})
+
+
+def fake_to_json(m):
+    return json.dumps({"config": m.config, "params": m.params})
+
+
+def fake_from_json(serialised):
+    saved = json.loads(serialised)
+    m = FakeProphet(**saved["config"])
+    m.params = saved["params"]
+    return m
+
+
+@pytest.fixture
+def fake_prophet(monkeypatch):  # every Prophet model the app or the backtest makes is a FakeProphet
+    monkeypatch.setattr(FakeProphet, "fitted", [])
+    monkeypatch.setattr(model_cache, "_new_model", lambda config: FakeProphet(**config))
+    monkeypatch.setattr(model_cache, "_to_json", fake_to_json)
+    monkeypatch.setattr(model_cache, "_from_json", fake_from_json)
+    monkeypatch.setitem(backtest.NEW_MODELS, "Prophet", FakeProphet)
+    return FakeProphet
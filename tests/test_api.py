@@ -0,0 +1,83 @@
+import asyncio
+import gzip
+import json
+import multiprocessing
+
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+
+import api
+from memo import MemoCache
+
+
+async def get(port, path, **headers):  # (status, headers, body) of one GET against the local server
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    lines = [f'GET {path} HTTP/1.1', 'Host: localhost', 'Connection: close']
+    lines += [f'{name.replace("_", "-")}: {value}' for name, value in headers.items()]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    status_line, *header_lines = head.decode().split('\r\n')
+    headers = dict(line.split(': ', 1) for line in header_lines)
+    return int(status_line.split()[1]), {name.lower(): value for name, value in headers.items()}, body
+
+
+def run(*requests, together=False):  # starts the API on a free port and makes the requests, one after another or at once
+    async def session():
+        pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        server = await api.start(port=0, pool=pool)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            if together:
+                return await asyncio.gather(*(get(port, path, **headers) for path, headers in requests))
+            return [await get(port, path, **headers) for path, headers in requests]
+        finally:
+            server.close()
+            pool.shutdown()
+    return asyncio.run(session())
+
+
+def test_prices_and_forecast(recorded_prices, monkeypatch):
+    monkeypatch.setattr(api, 'responses', MemoCache())
+    (status, headers, body), (f_status, f_headers, f_body) = run(('/prices/AAPL', {}), ('/forecast/AAPL?years=1', {}))
+    assert status == 200 and headers['content-type'] == 'application/json'
+    prices = json.loads(body)
+    assert len(prices) > 1000 and {'Date', 'Close'} <= set(prices[0])
+    forecast = json.loads(f_body)
+    assert f_status == 200 and 360 <= len(forecast) <= 366
+    assert set(forecast[0]) == set(api.FORECAST_COLUMNS)
+    assert forecast[0]['ds'] > prices[-1]['Date']  # only the days after the prices
+
+
+def test_conditional_get_and_gzip(recorded_prices, monkeypatch):
+    monkeypatch.setattr(api, 'responses', MemoCache())
+    (_, headers, body), = run(('/forecast/NKE?years=2', {'Accept_Encoding': 'gzip'}))
+    assert headers['content-encoding'] == 'gzip'
+    assert len(json.loads(gzip.decompress(body))) > 700
+    (status, again, body), = run(('/forecast/NKE?years=2', {'If_None_Match': headers['etag']}))
+    assert status == 304 and body == b'' and again['etag'] == headers['etag']
+
+
+def test_concurrent_requests_share_one_fit(recorded_prices, monkeypatch):
+    monkeypatch.setattr(api, 'responses', MemoCache())
+    monkeypatch.setattr(api, 'in_flight', api.AsyncSingleFlight())
+    responses = run(*[('/forecast/AAPL?years=3', {})] * 8, together=True)
+    assert [status for status, _, _ in responses] == [200] * 8
+    assert len({body for _, _, body in responses}) == 1
+    assert api.in_flight.stats['executed'] == 1 and api.in_flight.stats['coalesced'] == 7
+
+
+def test_arrow(recorded_prices):
+    pyarrow = pytest.importorskip('pyarrow')
+    (status, headers, body), = run(('/prices/NKE', {'Accept': api.ARROW}))
+    assert status == 200 and headers['content-type'] == api.ARROW
+    table = pyarrow.ipc.open_stream(body).read_all()
+    assert table.num_rows > 1000 and 'Close' in table.column_names
+
+
+def test_errors(recorded_prices):
+    responses = run(('/forecast/AAPL?years=9', {}), ('/forecast/AAPL?years=x', {}), ('/prices/$$$', {}),
+                    ('/nothing', {}), ('/prices/UNKNOWN', {}))
+    assert [status for status, _, _ in responses] == [400, 400, 400, 404, 404]
+    assert 'error' in json.loads(responses[0][2])
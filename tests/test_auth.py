@@ -1,4 +1,7 @@
 import hashlib
+import sqlite3
+from auth import PBKDF2Hasher, ScryptHasher, authenticate, hash_password, needs_rehash, verify_password
+from db import create_usertable, get_user
 from stock_forecasting import (make_hashes, check_hashes)
 
 def test_make_hashes():
@@ -11,3 +14,37 @@ def test_check_hashes():
     hashed_password = make_hashes(password)
     assert check_hashes(password, hashed_password) == hashed_password
     assert check_hashes("wrongpassword", hashed_password) is False
+
+
+def test_hashers_verify_their_own_hashes():
+    for hasher in (PBKDF2Hasher(iterations=1000), ScryptHasher(n=2 ** 10)):
+        encoded = hash_password("testpassword", hasher)
+        assert encoded.startswith(hasher.name + "$")
+        assert verify_password("testpassword", encoded)
+        assert not verify_password("wrongpassword", encoded)
+
+
+def test_hashes_are_salted():
+    assert hash_password("testpassword") != hash_password("testpassword")
+
+
+def test_old_hashes_still_verify_and_need_rehash():
+    old = make_hashes("testpassword")
+    assert verify_password("testpassword", old)
+    assert needs_rehash(old)
+    assert not needs_rehash(hash_password("testpassword"))
+    assert needs_rehash(hash_password("testpassword", PBKDF2Hasher(iterations=1000)))
+
+
+def test_login_upgrades_old_hash():
+    conn = sqlite3.connect(':memory:')
+    c = conn.cursor()
+    create_usertable(c)
+    c.execute("INSERT INTO userstable(username,password,name) VALUES (?,?,?)",
+              ("testuser", make_hashes("testpassword"), "Test User"))
+
+    assert authenticate("testuser", "wrongpassword", conn, c) is None
+    assert authenticate("testuser", "testpassword", conn, c)[2] == "Test User"
+    assert get_user("testuser", c)[1].startswith("scrypt$")
+    assert authenticate("testuser", "testpassword", conn, c) is not None
+    assert authenticate("nobody", "testpassword", conn, c) is None
@@ -0,0 +1,58 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import backtest
+import model_cache
+from backtest import cutoffs, backtest as run_backtest, evaluate_cutoff, summary
+from tests.conftest import make_prices
+
+
+def history(days=5 * 365, seed=0):  # recorded-style history: weekdays only, a trend plus a weekly pattern
+    rng = np.random.default_rng(seed)
+    close = 100 + 0.05 * np.arange(days) + 2 * np.sin(np.arange(days) * 2 * np.pi / 5) + rng.normal(0, 1, days)
+    return make_prices("2015-01-01", days, freq="B", close=close)
+
+
+def test_cutoffs_leave_room_for_the_horizon():
+    dates = pd.bdate_range("2015-01-01", "2020-01-01")
+
+    found = cutoffs(dates, horizon_days=30, initial_days=365, count=5)
+
+    assert len(found) == 5
+    assert found[-1] <= dates[-1] - pd.Timedelta(days=30)
+    assert all(cutoff in dates for cutoff in found)  # always a day that traded
+    assert np.all(np.diff(found) >= pd.Timedelta(days=29))
+
+
+def test_backtest_scores_each_cutoff_and_caches_it(monkeypatch):
+    data = history()
+    conn = sqlite3.connect(':memory:')
+
+    results = run_backtest("AAPL", data, "Fast", horizon_days=30, count=4, conn=conn, workers=2)
+
+    assert list(results["ticker"].unique()) == ["AAPL"]
+    assert len(results) == 4
+    assert (results["mape"] < 5).all() and results["coverage"].between(0, 1).all()
+    assert (results["fit_seconds"] > 0).all()
+    assert summary(results).loc["AAPL", "cutoffs"] == 4
+
+    monkeypatch.setattr(backtest, "ProcessPoolExecutor", None)  # every cutoff is cached, so nothing is fitted
+    assert run_backtest("AAPL", data, "Fast", horizon_days=30, count=4, conn=conn).equals(results)
+    monkeypatch.undo()
+
+    more = run_backtest("AAPL", data, "Fast", horizon_days=30, count=5, conn=conn, workers=1)
+
+    assert len(more) == 5 and more.iloc[1:].reset_index(drop=True).equals(results)  # only the earliest one is new
+    assert conn.execute("SELECT COUNT(*) FROM backtestresults").fetchone()[0] == 5
+
+
+def test_prophet_cutoffs_are_fitted_from_scratch(tmp_path, monkeypatch, fake_prophet):
+    monkeypatch.setattr(model_cache, "models", model_cache.ModelCache(str(tmp_path)))
+    prices = history(400).rename(columns={"Date": "ds", "Close": "y"})[["ds", "y"]]
+
+    for cutoff in (360, 370):  # the second cutoff only adds ten days, which the app's cache would warm-start
+        row = evaluate_cutoff("Prophet", "AAPL", prices.head(cutoff), prices.iloc[cutoff:cutoff + 30])
+        assert row[-1] == 30 and row[3] > 0
+
+    assert len(fake_prophet.fitted) == 2 and all(m.init is None for m in fake_prophet.fitted)  # two new, cold fits
+    assert not list(tmp_path.iterdir()) and model_cache.models.stats["misses"] == 0  # the app's cache is left alone
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bulk_import import bulk_import
+from price_store import FixtureProvider, PriceStore
+
+
+def write_dump(path, rows):  # a vendor-style long file: one row per ticker per day, lower-case headers
+    pd.DataFrame(rows, columns=['symbol', 'date', 'open', 'high', 'low', 'close', 'adj_close', 'volume']).to_csv(
+        path, index=False)
+
+
+def bars(ticker, start, days, price=10.0):
+    return [(ticker, str(day.date()), price, price + 1 + i * 0.1, price - 1, price + i * 0.1, price, 1000)
+            for i, day in enumerate(pd.bdate_range(start, periods=days))]
+
+
+def test_import_validates_dedupes_and_fills_the_store(tmp_path):
+    rows = bars('AAPL', '2020-01-01', 300) + bars('NKE', '2020-01-01', 200)
+    rows += [('AAPL', '2020-01-01', 10, 100, 9, 99.0, 10, 1000)]  # a later correction of the first day
+    rows += [('AAPL', 'not a date', 10, 11, 9, 10, 10, 5), ('NKE', '2021-01-04', 10, 11, 9, -1, 10, 5),
+             ('NKE', '2021-01-05', 10, 9, 8, 10, 10, 5)]  # bad date, negative close, high below the open
+    write_dump(tmp_path / 'dump.csv', rows)
+    store = PriceStore(str(tmp_path / 'store'), FixtureProvider({}))
+
+    stats = bulk_import([str(tmp_path / 'dump.csv')], store, chunk_rows=64)
+
+    assert stats['rows'] == 504 and stats['invalid'] == 3 and stats['duplicates'] == 1
+    assert stats['written'] == 500 and stats['tickers'] == 2 and stats['rows_per_s'] > 0
+    aapl = store.read('AAPL')
+    assert len(aapl) == 300 and (np.diff(aapl['Date'].astype(np.int64)) > 0).all()
+    assert aapl['Close'][0] == 99.0  # the last row given for a day wins
+    assert not list((tmp_path / 'store').glob('.import-*'))  # spill files are cleaned up
+
+
+def test_imported_prices_are_not_downloaded_again(tmp_path):
+    write_dump(tmp_path / 'dump.csv', bars('AAPL', '2015-01-01', 500))
+    provider = FixtureProvider({'AAPL': pd.DataFrame({'Date': pd.to_datetime([]), 'Close': []})})
+    store = PriceStore(str(tmp_path / 'store'), provider)
+    bulk_import([str(tmp_path / 'dump.csv')], store)
+
+    series = store.load_series('AAPL', '2015-01-01', '2017-01-01')
+    assert len(series) == 500
+    assert provider.calls == [('AAPL', '2016-12-01', '2017-01-01')]  # only the days after the dump
+
+
+def test_import_merges_with_what_is_stored(tmp_path):
+    provider = FixtureProvider({'AAPL': pd.DataFrame({'Date': pd.to_datetime(['2020-08-14']), 'Close': [20.0]})})
+    store = PriceStore(str(tmp_path / 'store'), provider)
+    write_dump(tmp_path / 'old.csv', bars('AAPL', '2020-01-01', 100, price=10))
+    write_dump(tmp_path / 'new.csv', bars('AAPL', '2020-04-01', 98, price=20))  # up to Friday 2020-08-14
+    bulk_import([str(tmp_path / 'old.csv')], store)
+    bulk_import([str(tmp_path / 'new.csv')], store)
+
+    stored = store.read('AAPL')
+    dates = pd.to_datetime(stored['Date'])
+    assert dates.min() == pd.Timestamp('2020-01-01') and dates.is_unique
+    assert stored['Open'][dates == pd.Timestamp('2020-04-01')][0] == 20  # the newer file wins the overlap
+
+    store.update('AAPL', '2020-01-01', '2020-08-17')  # a load on Monday morning finds nothing traded at the weekend
+    assert store.read_meta('AAPL')['fetched_through'] == '2020-08-17'
+    bulk_import([str(tmp_path / 'old.csv')], store)  # an older dump after the newer one
+
+    assert store.read_meta('AAPL')['fetched_through'] == '2020-08-17'  # still known to be fetched, not asked for again
+    assert len(store.read('AAPL')) == len(stored)
+
+
+def test_parquet_and_single_ticker_files(tmp_path):
+    pytest.importorskip('pyarrow')
+    frame = pd.DataFrame({'Date': pd.bdate_range('2022-01-03', periods=50), 'Close': np.linspace(100, 110, 50)})
+    frame.to_parquet(tmp_path / 'BTC-GBP.parquet')
+    store = PriceStore(str(tmp_path / 'store'), FixtureProvider({}))
+
+    stats = bulk_import([str(tmp_path / 'BTC-GBP.parquet')], store, ticker='BTC-GBP', chunk_rows=16)
+
+    assert stats['written'] == 50
+    series = store.load_series('BTC-GBP', '2022-01-01', '2022-03-12')
+    assert np.allclose(series['Close'], frame['Close']) and np.allclose(series['High'], frame['Close'])
+
+
+def test_minute_dumps_go_to_the_intraday_store(tmp_path):
+    dates = pd.date_range('2024-03-01 14:30', periods=390, freq='min', tz='America/New_York')
+    frame = pd.DataFrame({'timestamp': dates.astype(str), 'close': np.linspace(100, 101, 390), 'volume': 10})
+    frame.to_csv(tmp_path / 'AAPL.csv', index=False)
+    store = PriceStore(str(tmp_path / 'store'), FixtureProvider({}))
+
+    stats = bulk_import([str(tmp_path / 'AAPL.csv')], store, ticker='AAPL', chunk_rows=100, interval='1m')
+
+    assert stats['written'] == 390 and not len(store.read('AAPL'))
+    stored = store.read('AAPL@1m')
+    assert stored['Date'][0] == np.datetime64('2024-03-01T19:30')  # kept in UTC
+    assert store.read_meta('AAPL@1m')['fetched_through'] == '2024-03-02T02:00'
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+from correlation import compare, pair_returns
+from tests.conftest import make_prices
+
+
+def random_walks(tickers=12, days=500, seed=0):
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0, 0.01, (days, 1))
+    steps = market * rng.uniform(-1, 1, tickers) + rng.normal(0, 0.01, (days, tickers))
+    prices = make_prices("2020-01-01", days, close=100 * np.exp(np.cumsum(steps, axis=0)),
+                         tickers=[f"T{i}" for i in range(tickers)])
+    prices.iloc[5::7, 1:] = np.nan  # only T0 (crypto) trades at the weekend
+    prices.iloc[6::7, 1:] = np.nan
+    prices.iloc[:300, 2] = np.nan  # listed later than the rest
+    return prices
+
+
+def pairwise(prices):  # each pair's correlation worked out one at a time, on the days both traded
+    expected = pd.DataFrame(np.nan, index=prices.columns, columns=prices.columns)
+    for first in prices.columns:
+        for second in prices.columns:
+            both = prices[[first, second]].dropna().pct_change().dropna()
+            if len(both) >= 20:
+                expected.loc[first, second] = both[first].corr(both[second]) if first != second else 1.0
+    return expected
+
+
+def test_blocked_matrix_matches_pairwise_correlation():
+    prices = random_walks()
+    expected = pairwise(prices)
+
+    result = compare(prices, k=5, block=5)  # blocks that don't divide the tickers evenly
+
+    assert np.allclose(result.matrix, expected, equal_nan=False)
+    pairs = expected.where(np.triu(np.ones(expected.shape, dtype=bool), 1)).stack().dropna()
+    assert np.allclose(result.most["corr"], pairs.nlargest(5))
+    assert np.allclose(result.least["corr"], pairs.nsmallest(5))
+    assert result.most["days"].min() > 0
+
+
+def test_the_same_prices_are_perfectly_correlated_whatever_else_is_selected():
+    prices = random_walks(tickers=3)
+    prices["T1"] = prices["T0"].where(prices["T1"].notna())  # the crypto's prices, but only on the days stocks trade
+
+    assert np.isclose(compare(prices[["T0", "T1"]]).matrix.loc["T0", "T1"], 1.0)
+    assert np.isclose(compare(prices).matrix.loc["T0", "T1"], 1.0)
+    assert compare(prices).matrix.loc["T0", "T2"] == compare(prices[["T0", "T2"]]).matrix.loc["T0", "T2"]
+
+
+def test_top_pairs_without_the_matrix():
+    prices = random_walks()
+
+    blocked = compare(prices, k=3, block=4, matrix=False)
+    whole = compare(prices, k=3)
+
+    assert blocked.matrix is None
+    assert blocked.most[["ticker_1", "ticker_2"]].equals(whole.most[["ticker_1", "ticker_2"]])
+    daily = pair_returns(prices, "T0", "T2")
+    assert daily.index.min() > prices["T2"].first_valid_index()  # only days after both had started trading
+    assert daily.notna().all().all()
+
+
+def test_drill_down_agrees_with_the_matrix():
+    prices = random_walks()
+    pair = compare(prices[["T0", "T3"]])
+
+    daily = pair_returns(prices, "T0", "T3")  # from every ticker, as the page passes them
+
+    assert np.isclose(daily["T0"].corr(daily["T3"]), pair.matrix.loc["T0", "T3"])
+    assert len(daily) == pair.most["days"].iloc[0]
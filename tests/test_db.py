@@ -1,4 +1,6 @@
 import sqlite3
+import threading
+from db import connect, get_connection, get_user, user_exists, get_users_page, count_users, iter_users
 from stock_forecasting import create_usertable, add_userdata, view_all_users
 
 
@@ -32,3 +34,81 @@ def test_view_all_users():
 
     users = view_all_users(c)
     assert isinstance(users, list)
+
+
+def test_each_thread_gets_its_own_connection(tmp_path):
+    path = str(tmp_path / "data.db")
+    seen = []
+
+    def worker():
+        seen.append(get_connection(path))
+        seen.append(get_connection(path))
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen[0] is seen[1]
+    assert seen[2] is seen[3]
+    assert seen[0] is not seen[2]
+
+
+def test_database_file_uses_wal(tmp_path):
+    conn = connect(str(tmp_path / "data.db"))
+
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_add_userdata_rejects_existing_username():
+    conn = sqlite3.connect(':memory:')
+    c = conn.cursor()
+    create_usertable(c)
+
+    assert add_userdata("testuser", "testpassword", "Test User", conn, c)
+    assert not add_userdata("testuser", "otherpassword", "Other User", conn, c)
+    assert len(view_all_users(c)) == 1
+
+
+def test_get_user_and_user_exists():
+    conn = sqlite3.connect(':memory:')
+    c = conn.cursor()
+    create_usertable(c)
+    add_userdata("testuser", "testpassword", "Test User", conn, c)
+
+    assert user_exists("testuser", c)
+    assert not user_exists("nobody", c)
+    assert get_user("testuser", c)[2] == "Test User"
+    assert get_user("nobody", c) is None
+
+
+def make_users(count):
+    conn = sqlite3.connect(':memory:')
+    c = conn.cursor()
+    create_usertable(c)
+    for i in range(count):
+        c.execute("INSERT INTO userstable(username,password,name) VALUES (?,?,?)", (f"user{i:03}", f"hash{i}", f"name{i}"))
+    return c
+
+
+def test_users_are_paged_by_username():
+    c = make_users(25)
+
+    first = get_users_page("", 10, c=c)
+    second = get_users_page(first[-1][0], 10, c=c)
+
+    assert [row[0] for row in first] == [f"user{i:03}" for i in range(10)]
+    assert [row[0] for row in second] == [f"user{i:03}" for i in range(10, 20)]
+    assert count_users(c=c) == 25
+    assert [row[0] for row in iter_users(10, c=c)] == [f"user{i:03}" for i in range(25)]
+
+
+def test_users_can_be_searched_by_prefix():
+    c = make_users(25)
+
+    page = get_users_page("", 10, prefix="user01", c=c)
+
+    assert [row[0] for row in page] == [f"user{i:03}" for i in range(10, 20)]
+    assert count_users("user02", c) == 5
+    assert get_users_page("", 10, prefix="nobody", c=c) == []
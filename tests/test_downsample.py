@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+from downsample import lttb, minmax, thin, downsample_figure, points_for_range, points_for_width
+
+
+def test_lttb_keeps_ends_and_spikes():
+    y = np.sin(np.linspace(0, 20, 10_000))
+    y[5_000] = 50  # a one-day spike
+    keep = lttb(np.arange(len(y)), y, 500)
+
+    assert len(keep) == 500
+    assert keep[0] == 0 and keep[-1] == len(y) - 1
+    assert np.all(np.diff(keep) > 0)
+    assert 5_000 in keep
+
+
+def test_lttb_works_on_dates():
+    dates = pd.date_range("2015-01-01", periods=3_000)
+    keep = lttb(dates.to_numpy(), np.arange(3_000.0), 100)
+
+    assert len(keep) == 100
+
+
+def test_short_series_are_left_alone():
+    assert list(lttb(np.arange(10), np.arange(10.0), 100)) == list(range(10))
+
+
+def test_minmax_keeps_every_bucket_extreme():
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=10_000)
+    keep = minmax(y, 100)
+
+    assert len(keep) <= 200
+    assert y.argmax() in keep and y.argmin() in keep
+
+
+def test_zooming_in_keeps_more_points():
+    dates = pd.date_range("2015-01-01", periods=4_000)
+
+    assert points_for_range(dates, dates[0], dates[-1]) == points_for_width()
+    assert points_for_range(dates, dates[-400], dates[-1]) == 4_000  # a tenth shown, so every day is worth sending
+    dates = pd.date_range("1970-01-01", periods=20_000)
+    assert points_for_range(dates, dates[-10_000], dates[-1]) == 2 * points_for_width()  # half shown, twice the points
+
+
+def test_thinned_prices_keep_their_spikes():
+    rng = np.random.default_rng(0)
+    y = 100 + rng.normal(size=20_000).cumsum()
+    y[12_345] = 10_000
+
+    x, kept = thin(np.arange(20_000), y, 300, spikes=True)
+
+    assert len(kept) <= 300 and kept.max() == 10_000 and kept.min() == y.min()
+
+
+def test_thin_drops_gaps():
+    x, y = thin(np.arange(6), [1, np.nan, 3, 4, np.nan, 6])
+
+    assert list(x) == [0, 2, 3, 5]
+
+
+def test_downsample_figure_keeps_bands_aligned():
+    from plotly import graph_objs as go
+    dates = pd.date_range("2015-01-01", periods=5_000)
+    fig = go.Figure([go.Scatter(x=dates, y=np.arange(5_000.0) - 1), go.Scatter(x=dates, y=np.arange(5_000.0) + 1),
+                     go.Scatter(x=dates[:10], y=np.arange(10.0))])
+
+    downsample_figure(fig, 300)
+
+    assert len(fig.data[0].x) == len(fig.data[1].x) == 300
+    assert list(fig.data[0].x) == list(fig.data[1].x)
+    assert len(fig.data[2].x) == 10
+
+
+def test_downsample_figure_only_shares_points_between_the_same_dates():
+    from plotly import graph_objs as go
+    y = np.sin(np.linspace(0, 20, 5_000))
+    y[1_234] = 50
+    fig = go.Figure([go.Scatter(x=pd.date_range("2015-01-01", periods=5_000), y=np.zeros(5_000)),
+                     go.Scatter(x=pd.date_range("2016-01-01", periods=5_000), y=y)])  # same length, other dates
+
+    downsample_figure(fig, 300)
+
+    assert fig.data[1].x[0] == np.datetime64("2016-01-01") and 50 in fig.data[1].y
@@ -0,0 +1,56 @@
+import time
+
+import market_data
+import model_cache
+from forecast_engine import forecast_many, forecast_ticker
+from forecasters import FastForecaster
+from price_store import PriceStore, SyntheticProvider
+
+
+def fake_forecast(ticker, horizon_days):  # stands in for Prophet, module-level so it can be sent to the workers
+    if ticker == "BAD":
+        raise ValueError("no prices")
+    time.sleep(0.3)
+    return [ticker] * horizon_days, "2020-01-10"
+
+
+def test_results_and_failures_are_reported_per_ticker():
+    results = {result.ticker: result for result in forecast_many(["AAPL", "BAD", "NKE"], 3, workers=2, job=fake_forecast)}
+
+    assert results["AAPL"].forecast == ["AAPL"] * 3
+    assert results["AAPL"].error is None
+    assert results["AAPL"].seconds >= 0.3
+    assert "no prices" in results["BAD"].error
+    assert results["BAD"].forecast is None
+
+
+def test_fits_run_in_parallel():
+    began = time.monotonic()
+    results = list(forecast_many(["A", "B", "C", "D"], 1, workers=4, job=fake_forecast))
+
+    assert len(results) == 4
+    assert time.monotonic() - began < 4 * 0.3
+
+
+def test_failures_stream_back_before_slow_fits():
+    results = forecast_many(["AAPL", "BAD"], 1, workers=2, job=fake_forecast)
+
+    assert next(results).ticker == "BAD"
+
+
+def test_the_job_and_the_app_train_on_the_same_prices(tmp_path, monkeypatch):
+    monkeypatch.setattr(market_data, "price_store", PriceStore(str(tmp_path), SyntheticProvider()))
+    monkeypatch.setattr(market_data, "today", lambda: "2020-01-01")
+    trained = []
+
+    def fit_model(ticker, df_train, config=None):  # stands in for Prophet, keeping what it was trained on
+        trained.append(df_train)
+        return FastForecaster().fit(df_train)
+
+    monkeypatch.setattr(model_cache, "fit_model", fit_model)
+
+    forecast_ticker("WMT", 30)
+    app = market_data.load_series("WMT").to_prophet_frame()  # as the prediction page builds it
+
+    assert model_cache.cache_key("WMT", trained[0], {}) == model_cache.cache_key("WMT", app, {})
+    assert app["y"].equals(market_data.load_data("WMT")["Close"])  # the full float64 closes, not the float32 copy
@@ -0,0 +1,32 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+from forecast_job import save_forecast, read_forecast, forecast_run
+
+
+def make_forecast(last_bar, history, horizon):
+    ds = pd.date_range(end=last_bar, periods=history).append(
+        pd.date_range(pd.Timestamp(last_bar) + pd.Timedelta(days=1), periods=horizon))
+    values = np.arange(len(ds), dtype=float)
+    return pd.DataFrame({"ds": ds, "yhat": values, "yhat_lower": values - 1, "yhat_upper": values + 1,
+                         "trend": values, "weekly": 0.0})
+
+
+def test_forecast_is_sliced_by_horizon():
+    conn = sqlite3.connect(':memory:')
+    save_forecast(conn, "AAPL", make_forecast("2020-01-10", 10, 5 * 365), "2020-01-10")
+
+    forecast = read_forecast(conn, "AAPL", 365, "2020-01-10")
+
+    assert len(forecast) == 10 + 365
+    assert forecast["ds"].iloc[-1] == pd.Timestamp("2021-01-09")
+    assert forecast["yearly"].isna().all()
+    assert forecast_run(conn, "AAPL")["last_bar"] == "2020-01-10"
+
+
+def test_stale_or_missing_forecast_is_not_used():
+    conn = sqlite3.connect(':memory:')
+    save_forecast(conn, "AAPL", make_forecast("2020-01-10", 10, 5 * 365), "2020-01-10")
+
+    assert read_forecast(conn, "AAPL", 365, "2020-01-13") is None
+    assert read_forecast(conn, "NKE", 365, "2020-01-10") is None
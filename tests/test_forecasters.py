@@ -0,0 +1,87 @@
+import time
+import numpy as np
+import pandas as pd
+import pytest
+
+import model_cache
+from forecast_job import FORECAST_COLUMNS
+from forecasters import FastForecaster, fit_forecaster, plot_forecast, stored_forecaster
+
+
+def make_train(days):
+    ds = pd.date_range("2015-01-01", periods=days)
+    t = np.arange(days)
+    y = 100 + 0.05 * t + 2 * np.sin(2 * np.pi * t / 7) + 5 * np.sin(2 * np.pi * t / 365.25)
+    return pd.DataFrame({"ds": ds, "y": y})
+
+
+def test_fast_forecast_has_prophet_columns():
+    m = fit_forecaster("Fast", "AAPL", make_train(800))
+    forecast = m.predict(m.make_future_dataframe(periods=365))
+
+    assert len(forecast) == 800 + 365
+    assert all(col in forecast.columns for col in ["ds", "yhat", "yhat_lower", "yhat_upper", "trend"])
+    assert forecast["ds"].iloc[-1] == pd.Timestamp("2015-01-01") + pd.Timedelta(days=800 + 364)
+    assert (forecast["yhat_lower"] <= forecast["yhat"]).all()
+    assert (forecast["yhat"] <= forecast["yhat_upper"]).all()
+
+
+def test_fast_forecast_follows_trend_and_seasonality():
+    df_train = make_train(1200)
+    m = FastForecaster().fit(df_train.head(1000))
+    forecast = m.predict(df_train[["ds"]])
+
+    assert np.abs(forecast["yhat"] - df_train["y"]).max() < 0.5
+
+
+def test_fast_model_fits_a_decade_in_milliseconds():
+    df_train = make_train(3650)
+    began = time.perf_counter()
+    FastForecaster().fit(df_train)
+
+    assert time.perf_counter() - began < 0.1
+
+
+def test_fast_forecast_of_hourly_prices_has_a_daily_pattern():
+    ds = pd.date_range("2024-01-01", periods=30 * 24, freq="h")
+    hours = np.arange(len(ds))
+    df_train = pd.DataFrame({"ds": ds, "y": 100 + 0.01 * hours + 3 * np.sin(2 * np.pi * hours / 24)})
+    m = FastForecaster().fit(df_train)
+
+    future = m.make_future_dataframe(periods=48, freq="h")
+    forecast = m.predict(future)
+
+    assert len(forecast) == 30 * 24 + 48 and forecast["ds"].iloc[-1] == ds[-1] + pd.Timedelta(hours=48)
+    assert "daily" in forecast.columns and (forecast["yearly"] == 0).all()  # weeks of prices can't fit a year
+    expected = 100 + 0.01 * np.arange(len(forecast)) + 3 * np.sin(2 * np.pi * np.arange(len(forecast)) / 24)
+    assert np.abs(forecast["yhat"] - expected).max() < 0.1
+
+
+@pytest.fixture
+def no_training(tmp_path, monkeypatch):  # an empty model cache that fails the test if anything is trained
+    def train(config):
+        raise AssertionError("a model was trained")
+
+    cache = model_cache.ModelCache(str(tmp_path))
+    monkeypatch.setattr(model_cache, "models", cache)
+    monkeypatch.setattr(model_cache, "_new_model", train)
+    return cache
+
+
+def test_stored_forecast_is_drawn_without_training(no_training):
+    df_train = make_train(800)
+    forecast = FastForecaster().fit(df_train).predict(make_train(900)[["ds"]]).reindex(columns=list(FORECAST_COLUMNS))
+
+    m = stored_forecaster("AAPL", df_train)  # the job's model isn't on this machine
+    plot_forecast(m, forecast)
+    m.plot_components(forecast)
+
+    assert m.history["y"].equals(df_train["y"])
+
+
+def test_stored_forecaster_uses_the_jobs_model(no_training, monkeypatch):
+    df_train = make_train(800)
+    monkeypatch.setattr(model_cache, "_from_json", lambda serialised: serialised)
+    no_training._remember(model_cache.cache_key("AAPL", df_train, {}), "the job's model")
+
+    assert stored_forecaster("AAPL", df_train) == "the job's model"
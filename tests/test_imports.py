@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("yfinance", "fbprophet", "prophet", "cmdstanpy", "pystan", "matplotlib")
+
+
+def imported_modules(module):  # every module loaded by 'import module', read from python -X importtime
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    names = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            names.add(line.rsplit("|", 1)[1].strip())
+    return names
+
+
+def top_level(names):
+    return {name.split(".")[0] for name in names}
+
+
+def test_auth_path_stays_light():
+    loaded = top_level(imported_modules("auth"))
+
+    assert not loaded & set(HEAVY + ("streamlit", "pandas", "numpy", "plotly"))
+
+
+def test_app_import_does_not_load_forecasting_libraries():
+    loaded = top_level(imported_modules("stock_forecasting"))
+
+    assert "stock_forecasting" in loaded
+    assert not loaded & set(HEAVY)
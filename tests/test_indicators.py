@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+from indicators import IndicatorEngine, returns, sma, volatility, drawdown, rolling_beta_corr
+from tests.conftest import make_prices
+
+
+def random_walks(days=400, seed=0):
+    rng = np.random.default_rng(seed)
+    prices = make_prices("2020-01-01", days, close=100 * np.exp(np.cumsum(rng.normal(0, 0.02, (days, 4)), axis=0)),
+                         tickers=["AAPL", "NKE", "GME", "BTC-GBP"])
+    prices.iloc[5::7, :3] = np.nan  # stocks don't trade at the weekend, crypto does
+    return prices
+
+
+def test_rolling_indicators_match_pandas():
+    prices = random_walks()
+    daily = returns(prices)
+
+    assert np.allclose(sma(prices, 20), prices.rolling(20, min_periods=10).mean(), equal_nan=True)
+    assert np.allclose(volatility(daily, 21), daily.rolling(21, min_periods=10).std() * np.sqrt(252), equal_nan=True)
+    market = daily.mean(axis=1)
+    _, corr = rolling_beta_corr(daily, market, 63)
+    assert np.allclose(corr, daily.rolling(63, min_periods=31).corr(market), equal_nan=True)
+
+
+def test_returns_skip_days_without_trading():
+    prices = pd.DataFrame({"AAPL": [100.0, np.nan, 110.0]})
+
+    daily = returns(prices)["AAPL"]
+
+    assert daily.isna().tolist() == [True, True, False]  # no return on the day it didn't trade
+    assert np.isclose(daily[2], 0.1)  # measured from the last day it did
+    assert drawdown(pd.DataFrame({"AAPL": [100.0, 50.0, 75.0]}))["AAPL"].tolist() == [0.0, -0.5, -0.25]
+
+
+def test_appending_bars_matches_full_recompute():
+    prices = random_walks()
+    full = IndicatorEngine().compute(prices)
+
+    engine = IndicatorEngine()
+    engine.compute(prices.iloc[:300])
+    engine.append(prices.iloc[300:390])
+    added = engine.append(prices.iloc[390:])
+
+    assert len(added["rsi"]) == 10
+    for name, frame in full.items():
+        assert np.allclose(engine.results[name], frame, equal_nan=True), name
+    rsi = engine.latest()["rsi"]
+    assert ((rsi >= 0) & (rsi <= 100)).all()
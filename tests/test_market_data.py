@@ -0,0 +1,155 @@
+import threading
+import time
+import numpy as np
+import market_data
+from price_store import PriceStore, FixtureProvider
+from tests.conftest import make_prices
+
+STOCKS = ('GOOG', 'AAPL', 'MSFT', 'GME', 'BTC-GBP', '^FTSE', '^FTMC', 'WMT')
+
+
+class SlowProvider(FixtureProvider):  # every fetch takes one simulated round trip
+    def __init__(self, frames, delay, failures=0):
+        super().__init__(frames)
+        self.delay = delay
+        self.failures = failures
+
+    def fetch(self, ticker, start, end):
+        time.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("network down")
+        return super().fetch(ticker, start, end)
+
+
+def use_store(monkeypatch, tmp_path, provider):
+    monkeypatch.setattr(market_data, "price_store", PriceStore(str(tmp_path), provider))
+    monkeypatch.setattr(market_data, "START", "2015-01-01")
+    monkeypatch.setattr(market_data, "today", lambda: "2015-02-01")
+
+
+def test_load_many_returns_aligned_wide_frame(monkeypatch, tmp_path):
+    frames = {"AAPL": make_prices("2015-01-01", 40, freq='B'), "BTC-GBP": make_prices("2015-01-01", 40)}
+    use_store(monkeypatch, tmp_path, FixtureProvider(frames))
+
+    prices, errors = market_data.load_many(["AAPL", "BTC-GBP", "AAPL"], field="Open")
+
+    assert errors == {}
+    assert list(prices.columns) == ["AAPL", "BTC-GBP"]
+    assert len(prices) == 31  # every calendar day in January, weekends only have the crypto price
+    assert prices["AAPL"].isna().sum() == 31 - 22
+
+
+def test_warming_the_universe_costs_about_one_round_trip(monkeypatch, tmp_path):
+    frames = {ticker: make_prices("2015-01-01", 40) for ticker in STOCKS}
+    use_store(monkeypatch, tmp_path, SlowProvider(frames, delay=0.2))
+
+    began = time.monotonic()
+    errors = market_data.warm(STOCKS)
+
+    assert errors == {}
+    assert time.monotonic() - began < 2 * 0.2
+
+
+def test_failed_downloads_are_retried(monkeypatch, tmp_path):
+    use_store(monkeypatch, tmp_path, SlowProvider({"AAPL": make_prices("2015-01-01", 40)}, delay=0, failures=1))
+
+    prices, errors = market_data.load_many(["AAPL"], field="Close", retries=1)
+
+    assert errors == {}
+    assert len(prices) == 31
+
+
+def test_slow_tickers_time_out(monkeypatch, tmp_path):
+    use_store(monkeypatch, tmp_path, SlowProvider({"AAPL": make_prices("2015-01-01", 40)}, delay=0.5))
+
+    prices, errors = market_data.load_many(["AAPL"], timeout=0.1, retries=0)
+
+    assert prices.empty
+    assert isinstance(errors["AAPL"], TimeoutError)
+
+
+def test_intraday_bars_are_rolled_up_from_minutes(monkeypatch, tmp_path):
+    from price_store import SyntheticProvider
+    provider = SyntheticProvider()
+    use_store(monkeypatch, tmp_path, provider)
+    monkeypatch.setattr(market_data, "now", lambda: "2024-03-06T18:00")
+
+    minutes = market_data.load_series("BTC-GBP", "1m")
+    hourly = market_data.load_series("BTC-GBP", "1h")
+
+    assert minutes.unit == "m" and minutes["Date"][-1] == np.datetime64("2024-03-06T17:59")
+    assert len(minutes) == 30 * 1440 + 18 * 60  # the last 30 days of minutes, up to now
+    assert len(hourly) == 30 * 24 + 18 and hourly["Date"][-1] == np.datetime64("2024-03-06T17:00")
+    assert np.isclose(hourly["Close"][-1], minutes["Close"][-1])
+    assert (tmp_path / "BTC-GBP%401h.npy").exists()  # kept so the next load only rolls up the new minutes
+
+
+class HangingProvider(FixtureProvider):  # the first fetch of each ticker hangs, later ones are quick
+    def __init__(self, frames, hang):
+        super().__init__(frames)
+        self.hang = hang
+        self.lock = threading.Lock()
+        self.running = self.most = 0
+
+    def fetch(self, ticker, start, end):
+        with self.lock:
+            first = all(call[0] != ticker for call in self.calls)
+            self.running += 1
+            self.most = max(self.most, self.running)
+            self.calls.append((ticker, start, end))
+        time.sleep(self.hang if first else 0)
+        with self.lock:
+            self.running -= 1
+        data = self.frames[ticker]
+        return data[(data["Date"] >= start) & (data["Date"] < end)].reset_index(drop=True)
+
+
+def test_a_retry_does_not_wait_for_the_attempt_that_timed_out(monkeypatch, tmp_path):
+    provider = HangingProvider({"NKE": make_prices("2015-01-01", 40)}, hang=1.5)  # a ticker no other test loads
+    use_store(monkeypatch, tmp_path, provider)
+
+    began = time.monotonic()
+    prices, errors = market_data.load_many(["NKE"], field="Close", timeout=0.2, retries=1)
+
+    assert errors == {} and len(prices) == 31
+    assert time.monotonic() - began < 1.2  # the retry downloaded again rather than joining the hung call
+    assert len(provider.calls) == 2
+
+
+def test_timed_out_threads_still_count_against_the_pool(monkeypatch, tmp_path):
+    provider = HangingProvider({ticker: make_prices("2015-01-01", 40) for ticker in STOCKS}, hang=0.3)
+    use_store(monkeypatch, tmp_path, provider)
+
+    prices, errors = market_data.load_many(STOCKS, field="Close", workers=2, timeout=0.1, retries=3)
+
+    assert errors == {} and list(prices.columns) == list(STOCKS)
+    assert provider.most <= 2  # never more downloads at once than workers, hung ones included
+
+
+def test_tickers_waiting_for_a_thread_do_not_time_out(monkeypatch, tmp_path):
+    frames = {ticker: make_prices("2015-01-01", 40) for ticker in ("GOOG", "MSFT", "WMT")}
+    use_store(monkeypatch, tmp_path, SlowProvider(frames, delay=0.15))
+
+    prices, errors = market_data.load_many(list(frames), workers=1, timeout=0.25, retries=0)
+
+    assert errors == {}  # the third ticker only starts after 0.3s, its deadline starts then too
+
+
+def test_threads_that_never_return_cannot_hold_up_the_page():
+    release = threading.Event()
+
+    def job(ticker, attempt):  # the first download never comes back, the retry would work
+        if attempt == 1:
+            release.wait(5)
+        return ticker
+
+    began = time.monotonic()
+    try:
+        results, errors = market_data._run_all(job, ["AAPL", "MSFT"], workers=1, timeout=0.2, retries=1)
+    finally:
+        release.set()
+
+    assert time.monotonic() - began < 2.5  # two turns of two attempts and a back-off each
+    assert results == {} and set(errors) == {"AAPL", "MSFT"}
+    assert all(isinstance(error, TimeoutError) for error in errors.values())
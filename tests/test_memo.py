@@ -0,0 +1,61 @@
+import time
+import numpy as np
+import pandas as pd
+from correlation import Correlations
+from memo import MemoCache, data_version
+
+
+def test_value_is_only_made_once():
+    cache = MemoCache()
+    calls = []
+
+    def make():
+        calls.append(1)
+        return "figure json"
+
+    assert cache.get_or_set(("forecast", "AAPL", 1, "v1"), make) == "figure json"
+    assert cache.get_or_set(("forecast", "AAPL", 1, "v1"), make) == "figure json"
+    assert len(calls) == 1
+    assert cache.stats["hits"] == 1
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache = MemoCache(max_bytes=10)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    cache.get("a")
+    cache.put("c", b"12345")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"12345"
+    assert cache.bytes == 10
+    assert cache.stats["evictions"] == 1
+
+
+def test_records_of_frames_count_what_they_hold():
+    matrix = pd.DataFrame(np.ones((500, 500)))
+    cache = MemoCache(max_bytes=3 * matrix.memory_usage().sum())
+    cache.put("a", Correlations(matrix, matrix.head(5), matrix.tail(5)))
+    cache.put("b", (np.ones((500, 500)), "figure json"))
+
+    assert cache.bytes > 2 * 500 * 500 * 8  # not just the size of two small tuples
+    cache.put("c", Correlations(matrix, None, None))
+
+    assert cache.get("a") is None and cache.stats["evictions"] == 1  # the budget holds
+
+
+def test_entries_expire():
+    cache = MemoCache(ttl=0.05)
+    cache.put("a", "value")
+    time.sleep(0.1)
+
+    assert cache.get("a") is None
+    assert cache.stats["expired"] == 1
+    assert cache.summary()["entries"] == 0
+
+
+def test_data_version_changes_with_new_prices():
+    data = pd.DataFrame({"Date": pd.date_range("2015-01-01", periods=10), "Close": range(10)})
+
+    assert data_version(data) == data_version(data.copy())
+    assert data_version(data) != data_version(data.head(9))
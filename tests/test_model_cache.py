@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import model_cache
+from model_cache import ModelCache, cache_key
+
+pytestmark = pytest.mark.usefixtures("fake_prophet")  # the stand-in from conftest.py, so nothing is really fitted
+
+
+def make_train(periods, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"ds": pd.date_range("2015-01-01", periods=periods), "y": 100 + rng.normal(size=periods).cumsum()})
+
+
+def test_cache_key_depends_on_data_and_config():
+    df_train = make_train(100)
+
+    assert cache_key("AAPL", df_train, {}) == cache_key("AAPL", df_train.copy(), {})
+    assert cache_key("AAPL", df_train, {}) != cache_key("NKE", df_train, {})
+    assert cache_key("AAPL", df_train, {}) != cache_key("AAPL", make_train(101), {})
+    assert cache_key("AAPL", df_train, {}) != cache_key("AAPL", df_train, {"growth": "flat"})
+
+
+def test_model_is_only_fitted_once(tmp_path):
+    cache = ModelCache(str(tmp_path))
+    df_train = make_train(200)
+
+    m1 = cache.get_or_fit("AAPL", df_train)
+    m2 = cache.get_or_fit("AAPL", df_train)
+
+    assert cache.stats["misses"] == 1
+    assert cache.stats["hits"] == 1
+    assert m1.params == m2.params
+
+
+def test_models_survive_a_restart(tmp_path):
+    df_train = make_train(200)
+    ModelCache(str(tmp_path)).get_or_fit("AAPL", df_train)
+
+    cache = ModelCache(str(tmp_path))
+    cache.get_or_fit("AAPL", df_train)
+
+    assert cache.stats == {"hits": 0, "disk_hits": 1, "misses": 0, "warm_fits": 0}
+
+
+def test_least_recently_used_model_is_evicted(tmp_path):
+    cache = ModelCache(str(tmp_path), capacity=1)
+
+    cache.get_or_fit("AAPL", make_train(100))
+    cache.get_or_fit("NKE", make_train(100, seed=1))
+
+    assert len(cache.models) == 1
+    assert cache.get(cache_key("NKE", make_train(100, seed=1), {})) is not None
+
+
+def test_model_files_used_longest_ago_are_removed(tmp_path):
+    cache = ModelCache(str(tmp_path), files=3)
+    trains = {ticker: make_train(100, seed=seed) for seed, ticker in enumerate(["AAPL", "NKE", "TSLA", "MSFT"])}
+
+    cache.get_or_fit("AAPL", trains["AAPL"])
+    cache.get_or_fit("NKE", trains["NKE"])
+    cache.get_or_fit("AAPL", trains["AAPL"])  # used again, so NKE is now the oldest
+    cache.get_or_fit("TSLA", trains["TSLA"])
+    cache.get_or_fit("MSFT", trains["MSFT"])
+
+    kept = {p.name for p in tmp_path.glob("*.json") if not p.name.endswith(".lineage.json")}
+    assert kept == {cache_key(ticker, trains[ticker], {}) + ".json" for ticker in ["AAPL", "TSLA", "MSFT"]}
+    assert len(list(tmp_path.glob("*.lineage.json"))) == 4
+
+
+def test_new_days_are_fitted_from_the_last_model(tmp_path):
+    cache = ModelCache(str(tmp_path))
+    df_train = make_train(200)
+
+    first = cache.get_or_fit("AAPL", df_train.head(190))
+    m = cache.get_or_fit("AAPL", df_train)
+
+    assert cache.stats["warm_fits"] == 1
+    assert m.init["m"] == first.params["m"][0][0]
+
+
+def test_revised_history_is_fitted_from_scratch(tmp_path):
+    cache = ModelCache(str(tmp_path))
+    df_train = make_train(200)
+    revised = df_train.copy()
+    revised.loc[5, "y"] += 1
+
+    cache.get_or_fit("AAPL", df_train.head(190))
+    cache.get_or_fit("AAPL", revised)
+    cache.get_or_fit("AAPL", df_train.head(195), incremental=False)
+
+    assert cache.stats["misses"] == 3
+    assert cache.stats["warm_fits"] == 0
+
+
+def test_intraday_models_are_only_kept_in_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_cache, "models", ModelCache(str(tmp_path)))
+    minutes = make_train(600).assign(ds=pd.date_range("2024-03-01 14:30", periods=600, freq="min"))
+
+    model_cache.fit_model("AAPL", minutes.head(590))
+    model_cache.fit_model("AAPL", minutes.iloc[1:591])  # the window a minute later
+    model_cache.fit_model("AAPL", minutes.iloc[1:591])
+
+    assert not list(tmp_path.iterdir())
+    assert model_cache.models.stats == {"hits": 1, "disk_hits": 0, "misses": 2, "warm_fits": 0}
+
+
+def test_daily_models_are_kept_on_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_cache, "models", ModelCache(str(tmp_path)))
+
+    model_cache.fit_model("AAPL", make_train(190))
+    model_cache.fit_model("AAPL", make_train(200))
+
+    assert len(list(tmp_path.glob("*.lineage.json"))) == 1 and model_cache.models.stats["warm_fits"] == 1
+
+
+def test_with_prophet(tmp_path, monkeypatch):  # the real library, where it is installed; the tests above run without it
+    pytest.importorskip("fbprophet")
+    monkeypatch.undo()
+    cache = ModelCache(str(tmp_path))
+    df_train = make_train(200)
+
+    cache.get_or_fit("AAPL", df_train.head(190))
+    m = cache.get_or_fit("AAPL", df_train)
+    restored = ModelCache(str(tmp_path)).get(cache_key("AAPL", df_train, {}))
+
+    assert cache.stats["warm_fits"] == 1
+    forecast = m.predict(m.make_future_dataframe(periods=30))
+    assert np.allclose(forecast["yhat"], restored.predict(restored.make_future_dataframe(periods=30))["yhat"])
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from memo import data_version
+from price_series import PriceSeries
+from price_store import PriceStore, SyntheticProvider
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceStore(str(tmp_path), SyntheticProvider())
+
+
+def test_series_matches_the_frame(store):
+    frame = store.load('AAPL', '2015-01-01', '2020-01-01')
+    series = store.load_series('AAPL', '2015-01-01', '2020-01-01')
+
+    assert len(series) == len(frame) and series.unit == 'D'
+    assert series.offsets.dtype == np.int32 and series.close.dtype == np.float32
+    back = series.to_frame()
+    assert list(back.columns) == list(frame.columns)
+    assert (back['Date'] == frame['Date']).all()
+    np.testing.assert_allclose(back[['Open', 'Close', 'Volume']], frame[['Open', 'Close', 'Volume']], rtol=1e-6)
+
+
+def test_other_fields_are_loaded_when_first_asked_for(store):
+    series = store.load_series('NKE', '2015-01-01', '2020-01-01')
+    close_only = series.nbytes
+    assert close_only == 8 * len(series)  # int32 day plus float32 close
+
+    opens = series['Open']
+    assert opens.dtype == np.float32 and series['Open'] is opens  # turned into an array once, then kept
+    assert series.nbytes == close_only + 4 * len(series)
+    with pytest.raises(KeyError):
+        series['Dividends']
+
+
+def test_volume_stays_exact():
+    frame = pd.DataFrame({'Date': pd.date_range('2024-01-02', periods=3), 'Close': [1.5, 2.5, 3.5],
+                          'Volume': [33648531, 1, 2 ** 40 + 1]})
+    series = PriceSeries.from_frame('AAPL', frame)
+
+    assert series['Volume'].dtype == np.int64
+    assert series.to_frame()['Volume'].equals(frame['Volume'])
+
+
+def test_arrays_and_slices_are_not_copied(store):
+    series = store.load_series('AAPL', '2015-01-01', '2020-01-01')
+    assert series.to_numpy() is series.close
+    recent = series[-10:]
+    assert np.shares_memory(recent.close, series.close) and len(recent) == 10
+    assert recent['Date'][-1] == series['Date'][-1]
+
+
+def test_prophet_frame(store):
+    series = store.load_series('AAPL', '2015-01-01', '2016-01-01')
+    df_train = series.to_prophet_frame()
+    assert list(df_train.columns) == ['ds', 'y'] and df_train['y'].dtype == np.float64
+    assert df_train['ds'].iloc[0] == pd.Timestamp(series['Date'][0])
+
+
+def test_intraday_bars_use_minutes():
+    dates = pd.date_range('2024-01-02 09:30', periods=90, freq='min')
+    series = PriceSeries.from_frame('BTC-GBP', pd.DataFrame({'Date': dates, 'Close': np.arange(90.0)}))
+    assert series.unit == 'm'
+    assert (pd.to_datetime(series['Date']) == dates).all()
+
+
+def test_version_changes_with_a_new_bar(store):
+    series = store.load_series('AAPL', '2015-01-01', '2020-01-01')
+    assert data_version(series) == data_version(store.load_series('AAPL', '2015-01-01', '2020-01-01'))
+    assert data_version(series[:-1]) != data_version(series)
+
+
+def test_series_is_several_times_smaller_than_the_frame(store):
+    frame = store.load('AAPL', '2015-01-01', '2025-01-01')
+    series = store.load_series('AAPL', '2015-01-01', '2025-01-01')
+    series['Open']  # the raw data chart also draws the opening prices
+    assert frame.memory_usage(index=True, deep=True).sum() / series.nbytes >= 4
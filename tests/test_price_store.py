@@ -0,0 +1,94 @@
+import pytest
+from price_store import PriceStore, FixtureProvider, RecordedProvider, SyntheticProvider
+from tests.conftest import FIXTURES, make_prices
+
+
+def test_load_data_from_fixture(tmp_path):
+    provider = FixtureProvider({"AAPL": make_prices("2015-01-01", 30)})
+    store = PriceStore(str(tmp_path), provider)
+
+    data = store.load("AAPL", "2015-01-01", "2015-01-11")
+
+    assert len(data) == 10
+    assert all(col in data.columns for col in ["Date", "Open", "Close", "High", "Low", "Volume"])
+    assert store.stats["misses"] == 1
+
+
+def test_second_load_is_a_hit(tmp_path):
+    provider = FixtureProvider({"AAPL": make_prices("2015-01-01", 30)})
+    store = PriceStore(str(tmp_path), provider)
+
+    store.load("AAPL", "2015-01-01", "2015-01-11")
+    fetched = store.stats["bytes_fetched"]
+    data = store.load("AAPL", "2015-01-01", "2015-01-11")
+
+    assert len(data) == 10
+    assert store.stats["hits"] == 1
+    assert store.stats["bytes_fetched"] == fetched
+    assert len(provider.calls) == 1
+
+
+def test_only_missing_days_are_fetched(tmp_path):
+    provider = FixtureProvider({"^FTSE": make_prices("2015-01-01", 30)})
+    store = PriceStore(str(tmp_path), provider)
+
+    store.load("^FTSE", "2015-01-01", "2015-01-11")
+    data = PriceStore(str(tmp_path), provider).load("^FTSE", "2015-01-01", "2015-01-21")
+
+    assert provider.calls[-1] == ("^FTSE", "2015-01-11", "2015-01-21")
+    assert len(data) == 20
+    assert list(data["Close"]) == list(range(20))
+
+
+def test_recorded_and_synthetic_providers_work_offline(tmp_path):
+    recorded = PriceStore(str(tmp_path / "recorded"), RecordedProvider(FIXTURES))
+    synthetic = SyntheticProvider()
+
+    data = recorded.load("^FTSE", "2020-01-01", "2020-02-01")
+    first = synthetic.fetch("BTC-GBP", "2020-01-01", "2020-02-01")
+
+    assert len(data) == 23 and data["Date"].dt.dayofweek.max() < 5  # weekdays only
+    assert len(first) == 31  # crypto trades every day
+    assert first.equals(SyntheticProvider().fetch("BTC-GBP", "2020-01-01", "2020-02-01"))  # the same every time
+
+
+def test_empty_download_is_not_stored(tmp_path):
+    store = PriceStore(str(tmp_path), RecordedProvider(FIXTURES))
+
+    with pytest.raises(ValueError):
+        store.load("DELISTED", "2020-01-01", "2020-02-01")
+    assert store.read("DELISTED").size == 0
+
+    store.load("AAPL", "2020-01-01", "2020-01-04")
+    data = store.load("AAPL", "2020-01-01", "2020-01-06")  # only a weekend is new, so nothing comes back
+    assert len(data) == 3
+
+
+def test_days_that_come_back_empty_are_fetched_again(tmp_path):
+    prices = make_prices("2015-01-01", 30)
+    provider = FixtureProvider({"AAPL": prices[prices["Date"] < "2015-01-09"]})  # Yahoo failing from the 9th
+    store = PriceStore(str(tmp_path), provider)
+
+    store.load("AAPL", "2015-01-01", "2015-01-13")
+    assert store.read_meta("AAPL")["fetched_through"] == "2015-01-09"  # the day after the last bar that came
+    store.load("AAPL", "2015-01-01", "2015-01-14")
+    assert store.read_meta("AAPL")["fetched_through"] == "2015-01-09"  # weekdays came back empty, so not skipped
+
+    provider.frames["AAPL"] = prices  # the download works again
+    data = store.load("AAPL", "2015-01-01", "2015-01-14")
+
+    assert provider.calls[-1] == ("AAPL", "2015-01-09", "2015-01-14")
+    assert len(data) == 13 and store.read_meta("AAPL")["fetched_through"] == "2015-01-14"
+
+
+def test_an_empty_weekend_counts_as_fetched(tmp_path):
+    provider = FixtureProvider({"AAPL": make_prices("2015-01-01", 30).query("Date.dt.dayofweek < 5")})
+    store = PriceStore(str(tmp_path), provider)
+
+    store.load("AAPL", "2015-01-01", "2015-01-10")  # up to Friday the 9th
+    store.load("AAPL", "2015-01-01", "2015-01-12")  # Saturday and Sunday have no bars
+
+    store.load("AAPL", "2015-01-01", "2015-01-12")
+
+    assert store.read_meta("AAPL")["fetched_through"] == "2015-01-12"
+    assert store.stats["hits"] == 1 and len(provider.calls) == 2  # the weekend isn't asked for again
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from price_store import FixtureProvider, PriceStore, SyntheticProvider, _to_frame, _to_records
+from resample import StreamingResampler, resample, rollup
+
+
+def minutes(start, count, seed=0):  # a random walk of minute bars with gaps, like a market that closes
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=count * 2, freq='min')
+    dates = dates[rng.random(len(dates)) < 0.5][:count]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, len(dates))))
+    open_ = np.append(100, close[:-1])
+    return _to_records(pd.DataFrame({'Date': dates, 'Open': open_, 'High': np.maximum(open_, close) + 0.01,
+                                     'Low': np.minimum(open_, close) - 0.01, 'Close': close, 'Adj Close': close,
+                                     'Volume': rng.integers(0, 1000, len(dates))}))
+
+
+def test_resample_matches_pandas():
+    records = minutes('2024-03-01 13:57', 5000)
+    frame = _to_frame(records).set_index('Date')
+    expected = frame.resample('1h').agg({'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last',
+                                         'Volume': 'sum'}).dropna()
+
+    bars = _to_frame(resample(records, '1h')).set_index('Date')
+
+    assert list(bars.index) == list(expected.index)
+    for field in ('Open', 'High', 'Low', 'Close', 'Volume'):
+        assert np.allclose(bars[field], expected[field])
+
+
+@pytest.mark.parametrize('rule', ['5m', '1h', '1d'])
+def test_streaming_in_chunks_gives_the_same_bars(rule):
+    records = minutes('2024-03-01', 20000, seed=1)
+    resampler = StreamingResampler(rule)
+    edges = np.sort(np.random.default_rng(2).choice(len(records), 30, replace=False))
+    chunks = [resampler.update(part) for part in np.split(records, edges)]
+
+    streamed = np.concatenate(chunks + [resampler.flush()])
+
+    assert np.array_equal(streamed, resample(records, rule))
+
+
+def test_late_rows_are_dropped():
+    records = minutes('2024-03-01', 600)
+    resampler = StreamingResampler('1h')
+    done = resampler.update(records[300:])
+
+    assert len(resampler.update(records[:10])) == 0  # from an hour already handed back
+    assert resampler.stats['late'] == 10
+    assert np.array_equal(np.concatenate([done, resampler.flush()]), resample(records[300:], '1h'))
+
+
+def test_unknown_bar_size():
+    with pytest.raises(ValueError):
+        StreamingResampler('7m')
+
+
+def test_rollup_only_reads_new_minutes(tmp_path):
+    frame = _to_frame(minutes('2024-03-01', 20000, seed=3))
+    provider = FixtureProvider({'BTC-GBP@1m': frame})
+    store = PriceStore(str(tmp_path), provider)
+    middle = frame['Date'][12000].strftime('%Y-%m-%dT%H:%M')
+
+    store.update('BTC-GBP@1m', '2024-03-01', middle)
+    first = np.array(rollup(store, 'BTC-GBP', '1h', chunk_rows=1000))
+    store.update('BTC-GBP@1m', '2024-03-01', '2024-04-01')
+    meta = store.read_meta('BTC-GBP@1h')
+    second = rollup(store, 'BTC-GBP', '1h', chunk_rows=1000)
+
+    source = store.read('BTC-GBP@1m')
+    assert np.array_equal(second, resample(source, '1h'))
+    assert np.array_equal(second[:len(first) - 1], first[:-1])  # only the last hour was still being made
+    assert 0 < meta['source_rows'] < 12000 and store.read_meta('BTC-GBP@1h')['source_rows'] > 19900
+    assert rollup(store, 'BTC-GBP', '1h') is not None and not list(tmp_path.glob('.rollup-*'))
+
+
+def test_rollup_starts_again_when_the_minutes_change(tmp_path):
+    store = PriceStore(str(tmp_path), FixtureProvider({}))
+    store.write('AAPL@1m', minutes('2024-03-01', 3000, seed=4), {'start': '2024-03-01', 'fetched_through': 'a'})
+    rollup(store, 'AAPL', '5m')
+    replaced = minutes('2024-03-01', 2000, seed=5)
+    store.write('AAPL@1m', replaced, {'start': '2024-03-01', 'fetched_through': 'b'})
+
+    assert np.array_equal(rollup(store, 'AAPL', '5m'), resample(replaced, '5m'))
+
+
+def test_the_last_minute_is_fetched_again(tmp_path):
+    frame = _to_frame(minutes('2024-03-01', 100))
+    store = PriceStore(str(tmp_path), FixtureProvider({'AAPL@1m': frame}))
+    store.update('AAPL@1m', '2024-03-01', frame['Date'].iloc[-1].strftime('%Y-%m-%dT%H:%M'))  # the last bar isn't there yet
+    frame.loc[len(frame) - 2, 'Close'] = 1.0  # the bar before it was still being made when it was fetched
+
+    store.update('AAPL@1m', '2024-03-01', '2024-03-02')
+
+    stored = store.read('AAPL@1m')
+    assert len(stored) == len(frame) and stored['Close'][-2] == 1.0
+    assert store.read_meta('AAPL@1m')['fetched_through'] == (frame['Date'].iloc[-1] + pd.Timedelta(minutes=1)).strftime('%Y-%m-%dT%H:%M')
+
+
+def test_synthetic_minutes_end_at_the_daily_close():
+    provider = SyntheticProvider()
+    daily = provider.fetch('AAPL', '2024-03-04', '2024-03-05')
+    bars = provider.fetch('AAPL', '2024-03-04', '2024-03-05', interval='1m')
+    hourly = provider.fetch('AAPL', '2024-03-04', '2024-03-05', interval='1h')
+
+    assert len(bars) == 390 and bars['Date'].iloc[0] == pd.Timestamp('2024-03-04 14:30')
+    assert np.isclose(bars['Close'].iloc[-1], daily['Close'].iloc[0])
+    assert len(hourly) == 7 and hourly['Volume'].sum() == bars['Volume'].sum()
+    assert bars.equals(SyntheticProvider().fetch('AAPL', '2024-03-04', '2024-03-05', interval='1m'))
@@ -0,0 +1,35 @@
+import sqlite3
+from datetime import datetime, timezone
+import scheduler
+from scheduler import market_for, next_refresh, group_by_market
+
+
+def test_tickers_follow_their_market():
+    assert market_for("AAPL") == "US"
+    assert market_for("^FTSE") == "LSE"
+    assert market_for("^FTMC") == "LSE"
+    assert market_for("BTC-GBP") == "CRYPTO"
+    assert group_by_market(["AAPL", "^FTSE", "NKE", "AAPL"]) == {"US": ["AAPL", "NKE"], "LSE": ["^FTSE"]}
+
+
+def test_refresh_is_before_the_next_open():
+    friday_evening = datetime(2024, 3, 8, 22, 0, tzinfo=timezone.utc)
+    # US opens 09:30 New York (UTC-4 after the clocks changed on the Sunday), ready 30 minutes earlier
+    assert next_refresh("US", friday_evening) == datetime(2024, 3, 11, 13, 0, tzinfo=timezone.utc)
+    # London opens 08:00 GMT on Monday
+    assert next_refresh("LSE", friday_evening) == datetime(2024, 3, 11, 7, 30, tzinfo=timezone.utc)
+    # crypto is refreshed every day, weekends included
+    assert next_refresh("CRYPTO", friday_evening) == datetime(2024, 3, 9, 0, 5, tzinfo=timezone.utc)
+
+
+def test_refresh_records_metrics(monkeypatch):
+    monkeypatch.setattr(scheduler, "warm", lambda tickers, workers: {"NKE": "timed out"})
+    fitted = []
+    monkeypatch.setattr(scheduler, "run_job", lambda tickers, conn, workers: fitted.extend(tickers) or [])
+    conn = sqlite3.connect(':memory:')
+
+    scheduler.refresh("US", ["AAPL", "NKE"], ["AAPL", "NKE"], conn)
+
+    assert fitted == ["AAPL"]  # no point fitting on prices that failed to update
+    row = conn.execute("SELECT market, tickers, prices_failed, forecasts_failed FROM schedulerruns").fetchone()
+    assert row == ("US", 2, "NKE", "")
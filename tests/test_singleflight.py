@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pandas as pd
+
+import forecasters
+import market_data
+from singleflight import SingleFlight, flights
+
+
+def run_together(n, function):  # calls function() from n threads released at the same moment
+    barrier = threading.Barrier(n)
+    results, errors = [None] * n, [None] * n
+
+    def session(i):
+        barrier.wait()
+        try:
+            results[i] = function()
+        except Exception as error:
+            errors[i] = error
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_sessions_share_one_fit(monkeypatch):
+    fits = []
+
+    def slow_fit(ticker, df_train):  # long enough for every session to arrive while it runs
+        fits.append(ticker)
+        time.sleep(0.3)
+        return object()
+
+    monkeypatch.setitem(forecasters.FORECASTERS, 'Fast', slow_fit)
+    df_train = pd.DataFrame({'ds': pd.date_range('2020-01-01', periods=50), 'y': range(50)})
+    before = flights.summary()
+    models, errors = run_together(20, lambda: forecasters.fit_forecaster('Fast', 'AAPL', df_train))
+    after = flights.summary()
+
+    assert fits == ['AAPL']
+    assert errors == [None] * 20 and all(m is models[0] for m in models)  # every session got the same model
+    assert after['coalesced'] - before['coalesced'] == 19
+    assert after['in_flight'] == 0
+
+
+def test_concurrent_loads_share_one_download(recorded_prices, monkeypatch):
+    fetches = []
+    fetch = recorded_prices.provider.fetch
+
+    def slow_fetch(ticker, start, end):
+        fetches.append(ticker)
+        time.sleep(0.3)
+        return fetch(ticker, start, end)
+
+    monkeypatch.setattr(recorded_prices.provider, 'fetch', slow_fetch)
+    frames, errors = run_together(10, lambda: market_data.load_data('NKE'))
+    assert fetches == ['NKE'] and errors == [None] * 10
+    assert all(frame is frames[0] for frame in frames)
+
+
+def test_different_inputs_are_not_shared():
+    flight = SingleFlight()
+    run_together(4, lambda: flight.do(threading.get_ident(), time.sleep, 0.05))
+    assert flight.stats['executed'] == 4 and flight.stats['coalesced'] == 0
+
+
+def test_error_reaches_every_waiter_and_is_not_kept():
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.2)
+        raise ValueError('no prices found for XYZ')
+
+    _, errors = run_together(5, lambda: flight.do('XYZ', fail))
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert flight.stats['errors'] == 1 and flight.stats['coalesced'] == 4
+    assert flight.do('XYZ', lambda: 'retried') == 'retried'  # the next call runs again
@@ -1,9 +1,12 @@
+import numpy as np
 import pandas as pd
 from stock_forecasting import load_data
+from forecasters import fit_forecaster
+from backtest import backtest
 
 
-def test_load_data():
-    # Test loading data for a specific stock
+def test_load_data(recorded_prices):
+    # Test loading data for a specific stock, from recorded prices so no network is needed
     ticker = "AAPL"
     data = load_data(ticker)
 
@@ -15,5 +18,19 @@ def test_load_data():
 
 
 def test_forecast_output():
-    # Assuming you have a separate function for the forecasting, you can test it here
-    pass  # Replace with actual forecast test
+    # Forecast recorded-style prices offline and check the forecast has the shape the pages expect
+    dates = pd.bdate_range("2015-01-01", periods=3 * 365)
+    close = 100 + 0.05 * np.arange(len(dates)) + np.random.default_rng(0).normal(0, 1, len(dates))
+    data = pd.DataFrame({"Date": dates, "Close": close})
+    df_train = data[["Date", "Close"]].rename(columns={"Date": "ds", "Close": "y"})
+
+    m = fit_forecaster("Fast", "AAPL", df_train)
+    forecast = m.predict(m.make_future_dataframe(periods=365))
+
+    assert len(forecast) == len(data) + 365
+    assert all(col in forecast.columns for col in ["ds", "yhat", "yhat_lower", "yhat_upper", "trend"])
+    assert (forecast["yhat_lower"] <= forecast["yhat"]).all() and (forecast["yhat"] <= forecast["yhat_upper"]).all()
+
+    # Ensure the forecast is accurate when checked against the prices that came after each cutoff
+    results = backtest("AAPL", data, "Fast", horizon_days=30, count=3, workers=1)
+    assert (results["mape"] < 5).all()
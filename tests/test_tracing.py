@@ -0,0 +1,64 @@
+import json
+import sqlite3
+import threading
+from tracing import Tracer, JsonlSink, SQLiteSink, percentile, set_session
+
+
+def test_spans_nest_and_are_kept_per_session():
+    tracer = Tracer()
+
+    def session(name):
+        set_session(name)
+        with tracer.span("page"):
+            with tracer.span("fit"):
+                pass
+
+    threads = [threading.Thread(target=session, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    spans = tracer.session_spans("a")
+    assert [(span["name"], span["parent"]) for span in spans] == [("fit", "page"), ("page", None)]
+    assert {row["stage"]: row["calls"] for row in tracer.summary()} == {"page": 2, "fit": 2}
+
+
+def test_percentiles_and_decorator():
+    tracer = Tracer()
+
+    @tracer.traced("db.lookup")
+    def lookup(x):
+        return x * 2
+
+    assert lookup(21) == 42
+    for ms in range(1, 101):
+        tracer.record("stage", None, 0.0, ms / 1000)
+
+    row = next(row for row in tracer.summary() if row["stage"] == "stage")
+    assert (row["p50_ms"], row["p95_ms"], row["p99_ms"]) == (50, 95, 99)
+    assert percentile([1.0], 99) == 1.0
+    assert any(row["stage"] == "db.lookup" for row in tracer.summary())
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer(enabled=False)
+
+    with tracer.span("page"):
+        pass
+    tracer.traced("db.lookup")(lambda: None)()
+
+    assert tracer.summary() == []
+
+
+def test_spans_are_written_to_the_sinks(tmp_path):
+    for sink in (JsonlSink(str(tmp_path / "traces.jsonl")), SQLiteSink(str(tmp_path / "traces.db"))):
+        tracer = Tracer(sink=sink)
+        with tracer.span("page"):
+            pass
+        tracer.flush()
+
+    lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+    assert json.loads(lines[0])["name"] == "page"
+    rows = sqlite3.connect(str(tmp_path / "traces.db")).execute("SELECT name, parent FROM tracespans").fetchall()
+    assert rows == [("page", None)]
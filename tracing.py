@@ -0,0 +1,175 @@
+import atexit  # buffered spans are written out when the app stops
+import contextvars  # each Streamlit session's spans are kept apart, and nested spans know their parent
+import functools  # keeps the name and docstring of traced functions
+import json  # the JSON-lines sink writes one span per line
+import os  # TRACING and TRACE_SINK choose whether and where spans are recorded
+import sqlite3  # the SQLite sink writes spans to a table
+import threading  # spans are recorded from every session thread
+import time  # used to time each span
+from collections import OrderedDict, deque  # bounded buffers, so tracing never grows without limit
+
+# Only the standard library is used, so the login path can be traced without loading anything heavy
+
+RECENT = 1000  # timings kept per stage for the percentiles
+SESSION_SPANS = 200  # spans kept per session for the live view
+SESSIONS = 100  # sessions kept, the least recently active are dropped first
+FLUSH_EVERY = 256  # spans buffered before they are written to the sink
+SPAN_FIELDS = ('session', 'name', 'parent', 'started', 'seconds')  # what is written for every span
+
+_session = contextvars.ContextVar('trace_session', default='-')  # the session the current code is running for
+_parent = contextvars.ContextVar('trace_parent', default=None)  # the span the current code is running inside
+_EPOCH = time.time() - time.perf_counter()  # turns perf_counter() readings into wall-clock times
+
+
+def set_session(session_id):  # marks everything that runs from now on in this thread as part of a session
+    _session.set(session_id)
+
+
+def percentile(ordered, q):  # the q-th percentile of an already sorted list, by nearest rank
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+# Sinks
+
+class JsonlSink:  # appends each span as a line of JSON
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, spans):
+        with open(self.path, 'a') as f:
+            f.writelines(json.dumps(dict(zip(SPAN_FIELDS, row))) + '\n' for row in spans)
+
+
+class SQLiteSink:  # inserts the spans into a 'tracespans' table
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, spans):
+        conn = sqlite3.connect(self.path, timeout=10)
+        with conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS tracespans(session TEXT, name TEXT, parent TEXT, '
+                         'started REAL, seconds REAL)')
+            conn.executemany('INSERT INTO tracespans VALUES (?,?,?,?,?)', spans)
+        conn.close()
+
+
+def make_sink(name):  # 'jsonl:<path>' or 'sqlite:<path>', None for no sink
+    if not name:
+        return None
+    kind, _, path = name.partition(':')
+    if kind == 'jsonl':
+        return JsonlSink(path or 'traces.jsonl')
+    if kind == 'sqlite':
+        return SQLiteSink(path or 'data.db')
+    raise ValueError(f'unknown trace sink {name!r}')
+
+
+# Tracer
+
+class Tracer:  # times named stages, keeping recent timings per stage and per session
+    def __init__(self, enabled=True, sink=None):
+        self.enabled = enabled  # when False, span() and traced() cost one attribute check
+        self.sink = sink  # where finished spans are written, None keeps them in memory only
+        self.lock = threading.Lock()
+        self.stages = {}  # stage name -> [count, total seconds, deque of recent seconds]
+        self.sessions = OrderedDict()  # session id -> deque of its recent spans, most recently active last
+        self.pending = []  # spans waiting to be written to the sink
+
+    def record(self, name, parent, started, seconds):  # adds a finished span
+        session = _session.get()
+        with self.lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = [0, 0.0, deque(maxlen=RECENT)]
+            stage[0] += 1
+            stage[1] += seconds
+            stage[2].append(seconds)
+            spans = self.sessions.get(session)
+            if spans is None:
+                spans = self.sessions[session] = deque(maxlen=SESSION_SPANS)
+                if len(self.sessions) > SESSIONS:
+                    self.sessions.popitem(last=False)
+            else:
+                self.sessions.move_to_end(session)  # the most recently active session goes last
+            spans.append((name, parent, started, seconds))
+            pending = None
+            if self.sink is not None:
+                self.pending.append((session, name, parent, started, seconds))
+                if len(self.pending) >= FLUSH_EVERY:
+                    pending, self.pending = self.pending, []
+        if pending:
+            self.sink.write(pending)  # written outside the lock so other sessions don't wait on the disk
+
+    def flush(self):  # writes any buffered spans to the sink
+        with self.lock:
+            pending, self.pending = self.pending, []
+        if pending and self.sink is not None:
+            self.sink.write(pending)
+
+    def span(self, name):  # context manager timing the code inside it as stage 'name'
+        return _Span(self, name) if self.enabled else _NOT_TRACED
+
+    def traced(self, name=None):  # decorator timing every call of a function
+        def decorate(function):
+            stage = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with _Span(self, stage):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def summary(self):  # one row per stage: calls, total and p50/p95/p99 in milliseconds, slowest in total first
+        with self.lock:
+            stages = [(name, count, total, sorted(recent)) for name, (count, total, recent) in self.stages.items()]
+        rows = [{'stage': name, 'calls': count, 'total_ms': total * 1000,
+                 'p50_ms': percentile(recent, 50) * 1000, 'p95_ms': percentile(recent, 95) * 1000,
+                 'p99_ms': percentile(recent, 99) * 1000} for name, count, total, recent in stages]
+        return sorted(rows, key=lambda row: -row['total_ms'])
+
+    def session_spans(self, session_id):  # the recent spans of one session, oldest first
+        with self.lock:
+            return [dict(zip(('name', 'parent', 'started', 'seconds'), row)) for row in self.sessions.get(session_id, ())]
+
+    def reset(self):  # forgets every timing, e.g. from the panel
+        with self.lock:
+            self.stages.clear()
+            self.sessions.clear()
+
+
+class _Span:  # one timed stage, nested spans record it as their parent
+    __slots__ = ('tracer', 'name', 'token', 'began')
+
+    def __init__(self, tracer, name):
+        self.tracer, self.name = tracer, name
+
+    def __enter__(self):
+        self.token = _parent.set(self.name)
+        self.began = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.began
+        _parent.reset(self.token)
+        self.tracer.record(self.name, _parent.get(), _EPOCH + self.began, seconds)
+        return False
+
+
+class _NotTraced:  # stands in for a span when tracing is off
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOT_TRACED = _NotTraced()
+
+# the tracer used by the app, TRACING=0 turns it off and TRACE_SINK=jsonl:<path> or sqlite:<path> saves the spans
+tracer = Tracer(enabled=os.environ.get('TRACING', '1') != '0', sink=make_sink(os.environ.get('TRACE_SINK')))
+span = tracer.span
+traced = tracer.traced
+atexit.register(tracer.flush)